@@ -0,0 +1,87 @@
+import argparse
+import os
+import sys
+
+from .runner import (compare_to_baseline, default_branch_counts, default_chain_lengths,
+                     default_import_time_budget, default_scaling_exponent_budget,
+                     default_sizes, default_tolerance, import_time, load_baseline,
+                     run_benchmarks, run_scaling_benchmarks, save_baseline)
+
+
+default_baseline_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                     'baseline.json')
+
+table_columns = ['query', 'events', 'branches', 'translation_time', 'generation_time',
+                 'execution_time', 'events_per_second', 'megabytes_per_second', 'peak_rss']
+
+
+def format_value(value):
+    if isinstance(value, float):
+        return '%.4g' % value
+    return str(value)
+
+
+def print_table(results):
+    rows = [table_columns] + [[format_value(result[column]) for column in table_columns]
+                              for result in results]
+    widths = [max(len(row[index]) for row in rows) for index in range(len(table_columns))]
+    for row in rows:
+        print('  '.join(value.rjust(width) for value, width in zip(row, widths)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description='Benchmark func_adl_uproot queries on'
+                                                 + ' synthetic ntuples')
+    parser.add_argument('--directory', default='benchmark_ntuples',
+                        help='directory for the generated ntuples')
+    parser.add_argument('--sizes', type=int, nargs='+', default=default_sizes)
+    parser.add_argument('--branches', type=int, nargs='+', default=default_branch_counts)
+    parser.add_argument('--queries', nargs='+', default=None)
+    parser.add_argument('--chain-lengths', type=int, nargs='+', default=default_chain_lengths)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--baseline', default=default_baseline_path)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=default_tolerance)
+    args = parser.parse_args(argv)
+    results = run_benchmarks(args.directory, args.sizes, args.branches, args.queries,
+                             args.repeat)
+    print_table(results)
+    scaling_results = run_scaling_benchmarks(args.chain_lengths, args.queries)
+    for scaling_result in scaling_results:
+        print('Translation scaling ' + scaling_result['query'] + ': '
+              + ', '.join(str(length) + ' terms ' + format_value(elapsed_time) + ' s'
+                          for length, elapsed_time
+                          in zip(scaling_result['lengths'],
+                                 scaling_result['translation_times']))
+              + ' (exponent ' + format_value(scaling_result['exponent']) + ')')
+    elapsed_time = import_time(repeat=args.repeat)
+    print('Import time: ' + format_value(elapsed_time) + ' s')
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        return 0
+    scaling_regressions = [scaling_result for scaling_result in scaling_results
+                           if scaling_result['exponent'] is not None
+                           and scaling_result['exponent'] > default_scaling_exponent_budget]
+    for scaling_result in scaling_regressions:
+        print('Regression: translation of ' + scaling_result['query'] + ' scales with exponent '
+              + repr(scaling_result['exponent']) + ', budget '
+              + repr(default_scaling_exponent_budget))
+    if len(scaling_regressions) > 0:
+        return 1
+    if elapsed_time > default_import_time_budget:
+        print('Regression: import_time ' + repr(elapsed_time) + ' exceeds budget '
+              + repr(default_import_time_budget))
+        return 1
+    if os.path.exists(args.baseline):
+        regressions = compare_to_baseline(results, load_baseline(args.baseline),
+                                          args.tolerance)
+        for regression in regressions:
+            print('Regression: ' + regression)
+        if len(regressions) > 0:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+
+import awkward as ak
+
+import uproot
+
+
+default_chunk_size = 1000000
+
+flat_branch_prefix = 'flat_'
+jagged_collection_name = 'jagged'
+
+
+def flat_branch_name(index):
+    return flat_branch_prefix + str(index)
+
+
+def jagged_branch_name(index):
+    return jagged_collection_name + '_b' + str(index)
+
+
+def ntuple_path(directory, kind, n_events, n_branches):
+    return os.path.join(directory, (kind + '_' + str(n_events) + '_events_'
+                                    + str(n_branches) + '_branches.root'))
+
+
+def _flat_chunk(random_state, n_events, n_branches):
+    return dict((flat_branch_name(index), random_state.normal(size=n_events))
+                for index in range(n_branches))
+
+
+def _jagged_chunk(random_state, n_events, n_branches, mean_multiplicity):
+    counts = random_state.poisson(mean_multiplicity, size=n_events)
+    n_values = int(counts.sum())
+    fields = dict(('b' + str(index), ak.unflatten(random_state.normal(size=n_values), counts))
+                  for index in range(n_branches))
+    chunk = {flat_branch_name(0): random_state.normal(size=n_events)}
+    chunk[jagged_collection_name] = ak.zip(fields)
+    return chunk
+
+
+def _chunk_type(chunk):
+    return dict((name, array.dtype if isinstance(array, np.ndarray) else ak.type(array))
+                for name, array in chunk.items())
+
+
+def generate_ntuple(path, kind, n_events, n_branches, chunk_size=default_chunk_size,
+                    mean_multiplicity=4, seed=0):
+    if kind not in ('flat', 'jagged'):
+        raise ValueError('Unknown ntuple kind: ' + repr(kind))
+    random_state = np.random.RandomState(seed)
+    tree = None
+    with uproot.recreate(path) as root_file:
+        for chunk_start in range(0, n_events, chunk_size):
+            chunk_events = min(chunk_size, n_events - chunk_start)
+            if kind == 'flat':
+                chunk = _flat_chunk(random_state, chunk_events, n_branches)
+            else:
+                chunk = _jagged_chunk(random_state, chunk_events, n_branches,
+                                      mean_multiplicity)
+            if tree is None:
+                tree = root_file.mktree('tree', _chunk_type(chunk))
+            tree.extend(chunk)
+    return path
+
+
+def ensure_ntuple(directory, kind, n_events, n_branches, chunk_size=default_chunk_size):
+    path = ntuple_path(directory, kind, n_events, n_branches)
+    if not os.path.exists(path):
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        generate_ntuple(path, kind, n_events, n_branches, chunk_size)
+    return path
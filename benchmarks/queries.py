@@ -0,0 +1,52 @@
+import collections
+
+
+BenchmarkQuery = collections.namedtuple('BenchmarkQuery', ['name', 'kind', 'min_branches',
+                                                           'source'])
+
+queries = [BenchmarkQuery('select_flat', 'flat', 1,
+                          "Select(EventDataset('{path}', 'tree'), lambda e: e.flat_0)"),
+           BenchmarkQuery('select_record', 'flat', 3,
+                          "Select(EventDataset('{path}', 'tree'),"
+                          + " lambda e: {{'a': e.flat_0, 'b': e.flat_1 + e.flat_2}})"),
+           BenchmarkQuery('where_chain', 'flat', 3,
+                          "EventDataset('{path}', 'tree')"
+                          + '.Where(lambda e: e.flat_0 > 0)'
+                          + '.Where(lambda e: e.flat_1 < 0.5)'
+                          + '.Select(lambda e: e.flat_2)'),
+           BenchmarkQuery('select_jagged', 'jagged', 1,
+                          "Select(EventDataset('{path}', 'tree'),"
+                          + ' lambda e: e.jagged_b0.Where(lambda x: x > 0).Count())'),
+           BenchmarkQuery('nested_select_many', 'jagged', 2,
+                          "SelectMany(EventDataset('{path}', 'tree'),"
+                          + ' lambda e: e.jagged_b0.Select('
+                          + 'lambda x: e.jagged_b1.Select(lambda y: x * y)))'),
+           BenchmarkQuery('zip', 'jagged', 2,
+                          "SelectMany(EventDataset('{path}', 'tree'),"
+                          + ' lambda e: Zip([e.jagged_b0, e.jagged_b1]))'),
+           BenchmarkQuery('sum_flat', 'flat', 1,
+                          "EventDataset('{path}', 'tree').Select(lambda e: e.flat_0).Sum()")]
+
+
+ChainQuery = collections.namedtuple('ChainQuery', ['name', 'prefix', 'term', 'separator',
+                                                   'suffix'])
+
+chain_queries = [ChainQuery('where_chain', "EventDataset('chain.root', 'tree')",
+                            '.Where(lambda e: e.flat_0 > {0})', '', '.Select(lambda e: e.flat_1)'),
+                 ChainQuery('select_chain',
+                            "EventDataset('chain.root', 'tree').Select(lambda e: e.flat_0)",
+                            '.Select(lambda x: x + {0})', '', ''),
+                 ChainQuery('select_repeated_terms',
+                            "EventDataset('chain.root', 'tree').Select(lambda e: ",
+                            'abs(e.flat_0 * {0}) * abs(e.flat_0 * {0})', ' + ', ')')]
+
+
+def chain_source(chain_query, length):
+    return (chain_query.prefix
+            + chain_query.separator.join(chain_query.term.format(index)
+                                         for index in range(length))
+            + chain_query.suffix)
+
+
+def query_source(query, path):
+    return query.source.format(path=path.replace('\\', '/'))
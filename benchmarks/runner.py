@@ -0,0 +1,176 @@
+import ast
+import concurrent.futures
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from func_adl_uproot import ast_executor, generate_function, generate_python_source
+
+from .ntuples import ensure_ntuple
+from .queries import chain_queries, chain_source, queries, query_source
+
+
+default_sizes = [10**3, 10**4, 10**5]
+default_branch_counts = [10, 100]
+default_tolerance = 0.2
+default_import_time_budget = 0.1
+default_chain_lengths = [100, 200, 400, 800]
+default_scaling_exponent_budget = 1.5
+
+compared_metrics = ('execution_time', 'peak_rss')
+
+project_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+import_script = ('import sys, time\n'
+                 + 'start_time = time.time()\n'
+                 + 'import {0}\n'
+                 + 'print(time.time() - start_time)\n'
+                 + "print(' '.join(sorted(sys.modules)))\n")
+
+
+def peak_rss():
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return max_rss
+    return max_rss * 1024
+
+
+def best_time(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start_time = time.time()
+        function()
+        elapsed_time = time.time() - start_time
+        if best is None or elapsed_time < best:
+            best = elapsed_time
+    return best
+
+
+def _execution_time(source, repeat):
+    python_ast = ast.parse(source)
+    elapsed_time = best_time(lambda: ast_executor(python_ast), repeat)
+    return elapsed_time, peak_rss()
+
+
+def execution_time(source, repeat):
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(_execution_time, source, repeat).result()
+
+
+def _import_profile(module_name):
+    output = subprocess.check_output([sys.executable, '-c', import_script.format(module_name)],
+                                     cwd=project_directory, universal_newlines=True)
+    elapsed_time, module_names = output.splitlines()[-2:]
+    return float(elapsed_time), module_names.split()
+
+
+def import_time(module_name='func_adl_uproot', repeat=3):
+    return min(_import_profile(module_name)[0] for _ in range(repeat))
+
+
+def imported_modules(module_name='func_adl_uproot'):
+    return _import_profile(module_name)[1]
+
+
+def benchmark_query(query, path, n_events, n_branches, repeat):
+    source = query_source(query, path)
+    translation_time = best_time(lambda: generate_python_source(ast.parse(source)), repeat)
+    generation_time = best_time(lambda: generate_function(ast.parse(source), use_cache=False),
+                                repeat)
+    elapsed_time, max_rss = execution_time(source, repeat)
+    file_size = os.path.getsize(path)
+    return {'query': query.name,
+            'kind': query.kind,
+            'events': n_events,
+            'branches': n_branches,
+            'file_bytes': file_size,
+            'translation_time': translation_time,
+            'generation_time': generation_time,
+            'execution_time': elapsed_time,
+            'events_per_second': n_events / elapsed_time if elapsed_time > 0 else None,
+            'megabytes_per_second': (file_size / 1e6 / elapsed_time
+                                     if elapsed_time > 0 else None),
+            'peak_rss': max_rss}
+
+
+def scaling_exponent(lengths, times):
+    if times[0] <= 0 or times[-1] <= 0:
+        return None
+    return math.log(times[-1] / times[0]) / math.log(float(lengths[-1]) / lengths[0])
+
+
+def translation_scaling(chain_query, lengths=None, repeat=1):
+    if lengths is None:
+        lengths = default_chain_lengths
+    times = []
+    for length in lengths:
+        source = chain_source(chain_query, length)
+        times.append(best_time(lambda: generate_python_source(ast.parse(source)), repeat))
+    return {'query': chain_query.name,
+            'lengths': lengths,
+            'translation_times': times,
+            'exponent': scaling_exponent(lengths, times)}
+
+
+def run_scaling_benchmarks(lengths=None, query_names=None, repeat=1):
+    return [translation_scaling(chain_query, lengths, repeat) for chain_query in chain_queries
+            if query_names is None or chain_query.name in query_names]
+
+
+def run_benchmarks(directory, sizes=None, branch_counts=None, query_names=None, repeat=3):
+    if sizes is None:
+        sizes = default_sizes
+    if branch_counts is None:
+        branch_counts = default_branch_counts
+    results = []
+    for query in queries:
+        if query_names is not None and query.name not in query_names:
+            continue
+        for n_branches in branch_counts:
+            if n_branches < query.min_branches:
+                continue
+            for n_events in sizes:
+                path = ensure_ntuple(directory, query.kind, n_events, n_branches)
+                results.append(benchmark_query(query, path, n_events, n_branches, repeat))
+    return results
+
+
+def result_key(result):
+    return result['query'] + '/' + str(result['events']) + '/' + str(result['branches'])
+
+
+def load_baseline(path):
+    with open(path) as baseline_file:
+        return dict((result_key(result), result) for result in json.load(baseline_file))
+
+
+def save_baseline(results, path):
+    with open(path, 'w') as baseline_file:
+        json.dump(results, baseline_file, indent=2, sort_keys=True)
+
+
+def compare_to_baseline(results, baseline, tolerance=default_tolerance):
+    regressions = []
+    for result in results:
+        baseline_result = baseline.get(result_key(result))
+        if baseline_result is None:
+            continue
+        for metric in compared_metrics:
+            value = result.get(metric)
+            baseline_value = baseline_result.get(metric)
+            if value is None or baseline_value is None:
+                continue
+            if value > baseline_value * (1 + tolerance):
+                regressions.append(result_key(result) + ': ' + metric + ' ' + repr(value)
+                                   + ' exceeds baseline ' + repr(baseline_value))
+    return regressions
@@ -1,3 +1,66 @@
-from .transformer import *
-from .translation import *
-from .executor import *
+import importlib
+import sys
+
+_submodule_names = ('transformer',
+                    'translation',
+                    'executor',
+                    'planning',
+                    'batch_executor')
+
+if sys.version_info >= (3, 6):
+    _submodule_names += ('async_executor',)
+
+_exported_members = (('profiling', ('QueryProfiler',)),
+                     ('results', ('ResultCache',)))
+
+_exported_member_modules = dict((member_name, submodule_name)
+                                for submodule_name, member_names in _exported_members
+                                for member_name in member_names)
+
+
+def _public_names(module):
+    return [name for name in vars(module) if not name.startswith('_')]
+
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        if name == '__all__':
+            names = []
+            for submodule_name in _submodule_names:
+                submodule = importlib.import_module('.' + submodule_name, __name__)
+                names.extend(public_name for public_name in _public_names(submodule)
+                             if public_name not in names)
+            for submodule_name, member_names in _exported_members:
+                names.extend(member_name for member_name in member_names
+                             if member_name not in names)
+            globals()['__all__'] = names
+            return names
+        if name in _exported_member_modules:
+            submodule = importlib.import_module('.' + _exported_member_modules[name], __name__)
+            value = getattr(submodule, name)
+            globals()[name] = value
+            return value
+        if not name.startswith('_'):
+            for submodule_name in _submodule_names:
+                submodule = importlib.import_module('.' + submodule_name, __name__)
+                if name in _public_names(submodule):
+                    value = getattr(submodule, name)
+                    globals()[name] = value
+                    return value
+            module_name = __name__ + '.' + name
+            try:
+                return importlib.import_module(module_name)
+            except ImportError as error:
+                if error.name != module_name:
+                    raise
+        raise AttributeError('module ' + repr(__name__) + ' has no attribute ' + repr(name))
+else:
+    from .transformer import *
+    from .translation import *
+    from .executor import *
+    from .planning import *
+    from .batch_executor import *
+    if sys.version_info >= (3, 6):
+        from .async_executor import *
+    from .profiling import QueryProfiler
+    from .results import ResultCache
@@ -0,0 +1,109 @@
+import asyncio
+import functools
+
+from .branches import query_node
+from .executor import (_chunk_paths, _chunk_tasks, _combine_file_results, _execute,
+                       _file_step_size, _run_query_on_chunk, _run_query_on_file, _split_paths)
+from .reading import source_options
+from .transformer import top_level_reduction
+from .translation import linq_ast, portable_query, resolve_schema
+
+
+default_prefetch = 2
+
+
+async def _produce_queries(loop, executor, function, arguments, queue):
+    try:
+        for args in arguments:
+            await queue.put(loop.run_in_executor(executor, functools.partial(function, *args)))
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        await queue.put(None)
+        raise
+    await queue.put(None)
+
+
+async def _stream_queries(loop, executor, function, arguments, prefetch):
+    queue = asyncio.Queue(maxsize=prefetch)
+    producer = asyncio.ensure_future(_produce_queries(loop, executor, function, arguments,
+                                                      queue))
+    try:
+        while True:
+            future = await queue.get()
+            if future is None:
+                break
+            yield await future
+        await producer
+    finally:
+        producer.cancel()
+        while not queue.empty():
+            future = queue.get_nowait()
+            if future is not None:
+                future.cancel()
+        await asyncio.wait([producer])
+
+
+async def _async_chunks(loop, executor, ast, python_ast, step_size, prefetch, entry_start,
+                        entry_stop, schema, result_cache, backend, uproot_options):
+    paths = _chunk_paths(python_ast)
+    if paths is None:
+        chunks = await loop.run_in_executor(executor,
+                                            functools.partial(_execute, ast, python_ast, None,
+                                                              step_size, None, False,
+                                                              entry_start, entry_stop, schema,
+                                                              None, result_cache, backend,
+                                                              uproot_options))
+        while True:
+            chunk = await loop.run_in_executor(executor, next, chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+    text_ast = portable_query(ast)
+    tasks = await loop.run_in_executor(executor, list,
+                                       _chunk_tasks(python_ast, paths, step_size,
+                                                    uproot_options, entry_start, entry_stop))
+    chunks = _stream_queries(loop, executor, _run_query_on_chunk,
+                             [(text_ast, path, chunk_start, chunk_stop, schema, result_cache,
+                               backend, uproot_options)
+                              for path, chunk_start, chunk_stop in tasks],
+                             prefetch)
+    try:
+        async for chunk in chunks:
+            yield chunk
+    finally:
+        await chunks.aclose()
+
+
+async def async_ast_executor(ast, step_size=None, prefetch=default_prefetch, executor=None,
+                             entry_start=None, entry_stop=None, schema=None, result_cache=None,
+                             backend='awkward', file_source=None, read_options=None):
+    if prefetch < 1:
+        raise ValueError('prefetch must be at least 1, found ' + repr(prefetch))
+    uproot_options = source_options(file_source, read_options)
+    loop = asyncio.get_event_loop()
+    python_ast = linq_ast(ast)
+    schema = await loop.run_in_executor(executor, resolve_schema, python_ast, schema,
+                                        uproot_options)
+    reduction = top_level_reduction(query_node(python_ast))
+    if reduction is None and step_size is not None:
+        return _async_chunks(loop, executor, ast, python_ast, step_size, prefetch, entry_start,
+                             entry_stop, schema, result_cache, backend, uproot_options)
+    paths = _split_paths(python_ast, entry_start, entry_stop)
+    if paths is None:
+        return await loop.run_in_executor(executor,
+                                          functools.partial(_execute, ast, python_ast,
+                                                            reduction, step_size, None, False,
+                                                            entry_start, entry_stop, schema,
+                                                            None, result_cache, backend,
+                                                            uproot_options))
+    text_ast = portable_query(ast)
+    file_step_size = _file_step_size(reduction, step_size)
+    operation = reduction[0] if reduction is not None else None
+    results = [result async for result in
+               _stream_queries(loop, executor, _run_query_on_file,
+                               [(text_ast, path, file_step_size, schema, result_cache,
+                                 backend, uproot_options, operation)
+                                for path in paths],
+                               prefetch)]
+    return _combine_file_results(reduction, results)
@@ -0,0 +1,122 @@
+import collections
+
+from .branches import annotate_branches, find_event_dataset, query_node
+from .executor import (_dataset_tree_name, _query_slices_events, ast_executor,
+                       reduce_partial_results)
+from .optimization import optimize
+from .reading import iterate_events, read_events, source_options
+from .transformer import event_dataset_paths, top_level_reduction
+from .translation import generate_function, linq_ast, resolve_schema
+
+
+SharedQuery = collections.namedtuple('SharedQuery',
+                                     ['index', 'function', 'branches', 'reduction'])
+
+
+def _scan_key(python_ast, uproot_options):
+    if _query_slices_events(python_ast):
+        return None
+    dataset = find_event_dataset(python_ast)
+    paths = event_dataset_paths(dataset) if dataset is not None else None
+    if paths is None or len(paths) == 0:
+        return None
+    return tuple(paths), _dataset_tree_name(dataset, paths[0], uproot_options)
+
+
+def _query_branches(python_ast):
+    python_ast = optimize(python_ast)
+    annotate_branches(python_ast)
+    return find_event_dataset(python_ast).branches
+
+
+def _union_branches(shared_queries):
+    if any(shared_query.branches is None for shared_query in shared_queries):
+        return None
+    branches = sorted(set(branch
+                          for shared_query in shared_queries
+                          for branch in shared_query.branches))
+    return branches
+
+
+def _evaluate(shared_query, events):
+    if shared_query.branches:
+        events = events[shared_query.branches]
+    return shared_query.function(shared_events=events)
+
+
+def _combine_chunk_results(shared_query, chunk_results):
+    if shared_query.reduction is not None:
+        return reduce_partial_results(shared_query.reduction, chunk_results)
+    if len(chunk_results) == 1:
+        return chunk_results[0]
+    import awkward as ak
+    return ak.concatenate(chunk_results)
+
+
+def _shared_scan(paths, tree_name, shared_queries, step_size, entry_start, entry_stop,
+                 uproot_options):
+    filter_name = _union_branches(shared_queries)
+    if step_size is None:
+        chunks = [read_events(list(paths), tree_name, filter_name, entry_start, entry_stop,
+                              uproot_options=uproot_options)]
+    else:
+        chunks = iterate_events(list(paths), tree_name, step_size, filter_name, entry_start,
+                                entry_stop, uproot_options=uproot_options)
+    chunk_results = [[] for _ in shared_queries]
+    for events in chunks:
+        for query_results, shared_query in zip(chunk_results, shared_queries):
+            query_results.append(_evaluate(shared_query, events))
+    if len(chunk_results[0]) == 0:
+        events = read_events(list(paths), tree_name, filter_name, entry_start=0, entry_stop=0,
+                             uproot_options=uproot_options)
+        for query_results, shared_query in zip(chunk_results, shared_queries):
+            query_results.append(_evaluate(shared_query, events))
+    return [_combine_chunk_results(shared_query, query_results)
+            for shared_query, query_results in zip(shared_queries, chunk_results)]
+
+
+def _separate_query(ast, python_ast, step_size, entry_start, entry_stop, schema, backend,
+                    file_source, read_options):
+    options = dict(entry_start=entry_start, entry_stop=entry_stop, schema=schema,
+                   backend=backend, file_source=file_source, read_options=read_options)
+    result = ast_executor(ast, step_size=step_size, **options)
+    if step_size is None or top_level_reduction(query_node(python_ast)) is not None:
+        return result
+    chunk_results = list(result)
+    if len(chunk_results) == 0:
+        return ast_executor(ast, **options)
+    if len(chunk_results) == 1:
+        return chunk_results[0]
+    import awkward as ak
+    return ak.concatenate(chunk_results)
+
+
+def batch_ast_executor(asts, step_size=None, entry_start=None, entry_stop=None, schema=None,
+                       backend='awkward', file_source=None, read_options=None):
+    uproot_options = source_options(file_source, read_options)
+    results = [None] * len(asts)
+    scans = collections.OrderedDict()
+    for index, ast in enumerate(asts):
+        python_ast = linq_ast(ast)
+        scan_key = _scan_key(python_ast, uproot_options)
+        if scan_key is None:
+            results[index] = _separate_query(ast, python_ast, step_size, entry_start,
+                                             entry_stop, schema, backend, file_source,
+                                             read_options)
+            continue
+        reduction = top_level_reduction(query_node(python_ast))
+        shared_query = SharedQuery(index,
+                                   generate_function(ast,
+                                                     schema=resolve_schema(python_ast, schema,
+                                                                           uproot_options),
+                                                     backend=backend),
+                                   _query_branches(python_ast),
+                                   reduction)
+        scans.setdefault(scan_key, []).append(shared_query)
+    for (paths, tree_name), shared_queries in scans.items():
+        for shared_query, result in zip(shared_queries,
+                                        _shared_scan(paths, tree_name, shared_queries,
+                                                     step_size, entry_start, entry_stop,
+                                                     uproot_options)):
+            results[shared_query.index] = result
+    return results
@@ -0,0 +1,145 @@
+import ast
+import sys
+
+
+def is_event_dataset(node):
+    return (isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Name)
+            and node.func.id == 'EventDataset')
+
+
+def query_node(python_ast):
+    if isinstance(python_ast, ast.Module):
+        if len(python_ast.body) < 1:
+            return None
+        python_ast = python_ast.body[0]
+    if isinstance(python_ast, ast.Expr):
+        python_ast = python_ast.value
+    return python_ast
+
+
+def find_event_dataset(python_ast):
+    for node in ast.walk(python_ast):
+        if is_event_dataset(node):
+            return node
+    return None
+
+
+def lambda_argument_names(lambda_node):
+    if sys.version_info[0] < 3:
+        return [arg.id for arg in lambda_node.args.args]
+    else:
+        return [arg.arg for arg in lambda_node.args.args]
+
+
+class RowReferenceCollector(ast.NodeVisitor):
+    def __init__(self, row_name):
+        self.row_name = row_name
+        self.fields = set()
+        self.complete = True
+
+    def visit_Name(self, node):
+        if node.id == self.row_name:
+            self.complete = False
+
+    def visit_Attribute(self, node):
+        if isinstance(node.value, ast.Name) and node.value.id == self.row_name:
+            self.fields.add(node.attr)
+        else:
+            self.generic_visit(node)
+
+    def visit_Subscript(self, node):
+        if isinstance(node.value, ast.Name) and node.value.id == self.row_name:
+            if ((sys.version_info[0] < 3
+                 or (sys.version_info[0] == 3 and sys.version_info[1] < 9))
+                    and isinstance(node.slice, ast.Index)):
+                slice_value = node.slice.value
+            else:
+                slice_value = node.slice
+            try:
+                field = ast.literal_eval(slice_value)
+            except ValueError:
+                field = None
+            if isinstance(field, str):
+                self.fields.add(field)
+                return
+        self.generic_visit(node)
+
+    def visit_Lambda(self, node):
+        if self.row_name not in lambda_argument_names(node):
+            self.visit(node.body)
+
+
+def referenced_fields(lambda_node):
+    if len(lambda_node.args.args) != 1:
+        return None
+    collector = RowReferenceCollector(lambda_argument_names(lambda_node)[0])
+    collector.visit(lambda_node.body)
+    if collector.complete:
+        return collector.fields
+    else:
+        return None
+
+
+def union_fields(fields, other_fields):
+    if fields is None or other_fields is None:
+        return None
+    else:
+        return fields | other_fields
+
+
+def annotate_branches(node, fields=None):
+    if is_event_dataset(node):
+        node.branches = sorted(fields) if fields is not None else None
+    elif type(node).__name__ == 'Where' and isinstance(node.predicate, ast.Lambda):
+        annotate_branches(node.source, union_fields(fields, referenced_fields(node.predicate)))
+        annotate_branches(node.predicate)
+    elif (type(node).__name__ in ('Select', 'SelectMany')
+          and isinstance(node.selector, ast.Lambda)):
+        annotate_branches(node.source, referenced_fields(node.selector))
+        annotate_branches(node.selector)
+    elif (type(node).__name__ in ('OrderBy', 'OrderByDescending')
+          and isinstance(node.key_selector, ast.Lambda)):
+        annotate_branches(node.source,
+                          union_fields(fields, referenced_fields(node.key_selector)))
+        annotate_branches(node.key_selector)
+    elif (type(node).__name__ == 'Histogram' and isinstance(node.selector, ast.Lambda)
+          and (node.weights is None or isinstance(node.weights, ast.Lambda))):
+        fields = referenced_fields(node.selector)
+        if node.weights is not None:
+            fields = union_fields(fields, referenced_fields(node.weights))
+        annotate_branches(node.source, fields)
+        for child in (node.selector, node.bins, node.low, node.high, node.weights):
+            if child is not None:
+                annotate_branches(child)
+    elif type(node).__name__ in ('Take', 'Skip', 'First'):
+        annotate_branches(node.source, fields)
+    elif type(node).__name__ == 'Count':
+        annotate_branches(node.source, set())
+    elif type(node).__name__ in ('Sum', 'Min', 'Max', 'Aggregate'):
+        annotate_branches(node.source, fields)
+        for child in ast.iter_child_nodes(node):
+            if child is not node.source:
+                annotate_branches(child)
+    else:
+        for child in ast.iter_child_nodes(node):
+            annotate_branches(child)
+    return node
+
+
+def pushdown_predicate(python_ast):
+    dataset = find_event_dataset(python_ast)
+    if dataset is None:
+        return None
+    for node in ast.walk(python_ast):
+        if (type(node).__name__ == 'Where'
+                and node.source is dataset
+                and isinstance(node.predicate, ast.Lambda)):
+            predicate_fields = referenced_fields(node.predicate)
+            if predicate_fields is None or len(predicate_fields) == 0:
+                return None
+            if dataset.branches is None or set(dataset.branches) <= predicate_fields:
+                return None
+            node.predicate_branches = sorted(predicate_fields)
+            return node
+    return None
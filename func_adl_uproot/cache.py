@@ -0,0 +1,161 @@
+import collections
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
+import threading
+
+
+CacheInfo = collections.namedtuple('CacheInfo',
+                                   ['hits', 'disk_hits', 'misses', 'maxsize', 'currsize'])
+
+code_filename = '<func_adl_uproot>'
+code_module_name = 'func_adl_uproot.translation'
+
+
+def _cache_tag():
+    implementation = getattr(sys, 'implementation', None)
+    cache_tag = getattr(implementation, 'cache_tag', None)
+    if cache_tag is None:
+        cache_tag = 'py' + ''.join(str(part) for part in sys.version_info[:2])
+    return cache_tag
+
+
+generator_digest_state = {'digest': None}
+
+
+def generator_digest():
+    if generator_digest_state['digest'] is None:
+        digest = hashlib.sha256()
+        package_directory = os.path.dirname(os.path.abspath(__file__))
+        for filename in sorted(os.listdir(package_directory)):
+            if filename.endswith('.py'):
+                digest.update(filename.encode('utf-8'))
+                with open(os.path.join(package_directory, filename), 'rb') as source_file:
+                    digest.update(source_file.read())
+        generator_digest_state['digest'] = digest.hexdigest()
+    return generator_digest_state['digest']
+
+
+def _write_atomically(path, data):
+    directory = os.path.dirname(path)
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=directory)
+    try:
+        with os.fdopen(file_descriptor, 'wb') as temporary_file:
+            temporary_file.write(data)
+        getattr(os, 'replace', os.rename)(temporary_path, path)
+    except OSError:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+
+class LRUCache(object):
+    def __init__(self, maxsize=256):
+        if maxsize is not None and maxsize < 0:
+            raise ValueError('Cache size must be non-negative, found ' + repr(maxsize))
+        self.maxsize = maxsize
+        self._items = collections.OrderedDict()
+        self._lock = threading.RLock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+
+    def info(self):
+        with self._lock:
+            return CacheInfo(self._hits, self._disk_hits, self._misses,
+                             self.maxsize, len(self._items))
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._hits = 0
+            self._disk_hits = 0
+            self._misses = 0
+
+    def resize(self, maxsize):
+        if maxsize is not None and maxsize < 0:
+            raise ValueError('Cache size must be non-negative, found ' + repr(maxsize))
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def _evict(self):
+        if self.maxsize is None:
+            return
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def _lookup(self, key):
+        with self._lock:
+            if key not in self._items:
+                return False, None
+            self._hits += 1
+            value = self._items.pop(key)
+            self._items[key] = value
+            return True, value
+
+    def _insert(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._evict()
+
+
+class QueryCache(LRUCache):
+    def __init__(self, maxsize=256, directory=None):
+        super(QueryCache, self).__init__(maxsize)
+        self.directory = directory
+
+    def _paths(self, key):
+        digest = hashlib.sha256(repr((generator_digest(), key)).encode('utf-8')).hexdigest()
+        source_path = os.path.join(self.directory, digest + '.py')
+        code_path = os.path.join(self.directory, digest + '.' + _cache_tag() + '.code')
+        return source_path, code_path
+
+    def _load_code(self, key):
+        if self.directory is None:
+            return None
+        source_path, code_path = self._paths(key)
+        try:
+            with open(code_path, 'rb') as code_file:
+                return marshal.loads(code_file.read())
+        except (IOError, OSError, EOFError, ValueError, TypeError):
+            pass
+        try:
+            with open(source_path, 'rb') as source_file:
+                return compile(source_file.read(), code_filename, 'exec')
+        except (IOError, OSError, SyntaxError, ValueError):
+            return None
+
+    def _store_code(self, key, source, code):
+        if self.directory is None:
+            return
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        source_path, code_path = self._paths(key)
+        _write_atomically(source_path, source.encode('utf-8'))
+        _write_atomically(code_path, marshal.dumps(code))
+
+    def get(self, key, function_name, generate_source):
+        key = (key, function_name)
+        found, function = self._lookup(key)
+        if found:
+            return function
+        code = self._load_code(key)
+        if code is not None:
+            with self._lock:
+                self._disk_hits += 1
+        else:
+            with self._lock:
+                self._misses += 1
+            source = generate_source()
+            if isinstance(source, tuple):
+                source, code = source
+            else:
+                code = compile(source, code_filename, 'exec')
+            self._store_code(key, source, code)
+        namespace = {'__name__': code_module_name}
+        exec(code, namespace)
+        function = namespace[function_name]
+        self._insert(key, function)
+        return function
@@ -0,0 +1,137 @@
+import ast
+import collections
+import contextlib
+import re
+import sys
+import threading
+import uuid
+
+
+placeholder_prefix = '_func_adl_rep_'
+
+recursion_frames_per_level = 8
+recursion_frame_margin = 100
+
+if (3, 11) <= sys.version_info < (3, 13):
+    ast_conversion_lock = threading.Lock()
+else:
+    ast_conversion_lock = None
+
+recursion_limit_lock = threading.Lock()
+recursion_limit_state = {'active': 0, 'saved': None}
+
+
+def query_depth(query):
+    if isinstance(query, str):
+        depth = 0
+        max_depth = 0
+        for character in query:
+            if character == '(':
+                depth += 1
+                max_depth = max(max_depth, depth)
+            elif character == ')':
+                depth -= 1
+        return max_depth
+    max_depth = 0
+    stack = [(query, 1)]
+    while len(stack) > 0:
+        node, depth = stack.pop()
+        max_depth = max(max_depth, depth)
+        stack.extend((child, depth + 1) for child in ast.iter_child_nodes(node))
+    return max_depth
+
+
+def _frame_depth():
+    depth = 0
+    frame = sys._getframe()
+    while frame is not None:
+        depth += 1
+        frame = frame.f_back
+    return depth
+
+
+@contextlib.contextmanager
+def recursion_limit(query):
+    limit = (_frame_depth() + recursion_frames_per_level * query_depth(query)
+             + recursion_frame_margin)
+    with recursion_limit_lock:
+        if recursion_limit_state['active'] == 0:
+            base_limit = sys.getrecursionlimit()
+        else:
+            base_limit = recursion_limit_state['saved']
+        raise_limit = limit > base_limit
+        if raise_limit:
+            if recursion_limit_state['active'] == 0:
+                recursion_limit_state['saved'] = base_limit
+            recursion_limit_state['active'] += 1
+            if limit > sys.getrecursionlimit():
+                sys.setrecursionlimit(limit)
+    if not raise_limit:
+        yield
+        return
+    try:
+        yield
+    finally:
+        with recursion_limit_lock:
+            recursion_limit_state['active'] -= 1
+            if recursion_limit_state['active'] == 0:
+                sys.setrecursionlimit(recursion_limit_state['saved'])
+
+
+def _parse(source, mode):
+    if ast_conversion_lock is None:
+        return ast.parse(source, mode=mode)
+    with ast_conversion_lock:
+        return ast.parse(source, mode=mode)
+
+
+class RepTemplates(object):
+    def __init__(self):
+        self._prefix = placeholder_prefix + uuid.uuid4().hex + '_'
+        self._pattern = re.compile(r'\b(' + self._prefix + r'[0-9]+)\b')
+        self._templates = collections.OrderedDict()
+        self._expressions = {}
+
+    def _substitute(self, root):
+        if isinstance(root, ast.Name) and root.id in self._expressions:
+            return self._expressions[root.id]
+        for node in list(ast.walk(root)):
+            for field, value in ast.iter_fields(node):
+                if isinstance(value, ast.Name) and value.id in self._expressions:
+                    setattr(node, field, self._expressions[value.id])
+                elif isinstance(value, list):
+                    setattr(node, field, [self._expressions[item.id]
+                                          if isinstance(item, ast.Name)
+                                          and item.id in self._expressions
+                                          else item
+                                          for item in value])
+        return root
+
+    def defer(self, rep):
+        try:
+            expression = _parse(rep, 'eval').body
+        except SyntaxError:
+            return rep
+        placeholder = self._prefix + str(len(self._templates))
+        self._templates[placeholder] = rep
+        self._expressions[placeholder] = self._substitute(expression)
+        return placeholder
+
+    def expand(self, source):
+        parts = []
+        stack = [source]
+        while len(stack) > 0:
+            pieces = self._pattern.split(stack.pop())
+            parts.append(pieces[0])
+            for index in range(len(pieces) - 2, 0, -2):
+                stack.append(pieces[index + 1])
+                stack.append(self._templates[pieces[index]])
+        return ''.join(parts)
+
+    def to_ast(self, source):
+        return self._substitute(_parse(source, 'exec'))
+
+    def compile(self, source, filename):
+        module = self.to_ast(source)
+        with recursion_limit(module):
+            return compile(module, filename, 'exec')
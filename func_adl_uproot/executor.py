@@ -1,6 +1,254 @@
-from .translation import generate_function
+import ast as python_ast_module
+import logging
+import operator
 
+from .branches import find_event_dataset, query_node
+from .ordering import merge_top_k, top_k_values
+from .metadata import find_tree_name
+from .reading import chunk_entry_ranges, entry_ranges, source_options
+from .transformer import (event_dataset_paths, ordered_projection, ordering_node_types,
+                          top_level_reduction)
+from .translation import generate_function, linq_ast, portable_query, resolve_schema
+from .writing import write_chunks
 
-def ast_executor(ast):
-    query_function = generate_function(ast)
-    return query_function()
+
+default_step_size = '100 MB'
+
+combine_func_dict = {'add': operator.add,
+                     'multiply': operator.mul,
+                     'minimum': min,
+                     'maximum': max,
+                     'top_k': merge_top_k}
+
+finalize_func_dict = {'top_k': top_k_values}
+
+
+def combine_partial_results(operation, left, right):
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if isinstance(operation, tuple):
+        return combine_func_dict[operation[0]](left, right, *operation[1:])
+    return combine_func_dict[operation](left, right)
+
+
+def accumulate_partial_results(operation, partial_results):
+    result = None
+    for partial_result in partial_results:
+        result = combine_partial_results(operation, result, partial_result)
+    return result
+
+
+def finalize_result(operation, result):
+    if isinstance(operation, tuple) and result is not None:
+        return finalize_func_dict[operation[0]](result, *operation[1:])
+    return result
+
+
+def reduce_partial_results(reduction, partial_results):
+    operation, seed = reduction
+    result = combine_partial_results(operation, seed,
+                                     accumulate_partial_results(operation, partial_results))
+    return finalize_result(operation, result)
+
+
+def _slices_events(node):
+    if isinstance(node, python_ast_module.Lambda):
+        return False
+    if type(node).__name__ in ('Take', 'Skip', 'First') + ordering_node_types:
+        return True
+    return any(_slices_events(child) for child in python_ast_module.iter_child_nodes(node))
+
+
+def _query_slices_events(python_ast):
+    node = query_node(python_ast)
+    reduction = top_level_reduction(node)
+    if reduction is not None and isinstance(reduction[0], tuple):
+        node = ordered_projection(node)[0].source
+    return _slices_events(node)
+
+
+def _run_query_on_file(text_ast, input_filename, step_size, schema, result_cache=None,
+                       backend='awkward', uproot_options=None, operation=None):
+    query_function = generate_function(text_ast, schema=schema, result_cache=result_cache,
+                                       backend=backend)
+    result = query_function(input_filenames=[input_filename], step_size=step_size,
+                            uproot_options=uproot_options)
+    if step_size is not None:
+        return accumulate_partial_results(operation, result)
+    return result
+
+
+def _run_query_on_chunk(text_ast, input_filename, entry_start, entry_stop, schema,
+                        result_cache=None, backend='awkward', uproot_options=None):
+    query_function = generate_function(text_ast, schema=schema, result_cache=result_cache,
+                                       backend=backend)
+    return query_function(input_filenames=[input_filename], entry_start=entry_start,
+                          entry_stop=entry_stop, uproot_options=uproot_options)
+
+
+def _dataset_tree_name(dataset, path, uproot_options=None):
+    if len(dataset.args) >= 2:
+        return python_ast_module.literal_eval(dataset.args[1])
+    return find_tree_name(path, uproot_options)
+
+
+def _chunk_tasks(python_ast, paths, step_size, uproot_options=None, entry_start=None,
+                 entry_stop=None):
+    dataset = find_event_dataset(python_ast)
+    if entry_start is None and entry_stop is None:
+        file_ranges = ((path, _dataset_tree_name(dataset, path, uproot_options), None, None)
+                       for path in paths)
+    else:
+        tree_name = _dataset_tree_name(dataset, paths[0], uproot_options)
+        file_ranges = ((path, tree_name, file_entry_start, file_entry_stop)
+                       for path, file_entry_start, file_entry_stop
+                       in entry_ranges(paths, tree_name, entry_start, entry_stop,
+                                       uproot_options))
+    for path, tree_name, file_entry_start, file_entry_stop in file_ranges:
+        for chunk_start, chunk_stop in chunk_entry_ranges(path, tree_name, step_size,
+                                                          uproot_options=uproot_options,
+                                                          entry_start=file_entry_start,
+                                                          entry_stop=file_entry_stop):
+            yield path, chunk_start, chunk_stop
+
+
+def _executor_pool(n_workers, use_processes):
+    import concurrent.futures
+    if use_processes:
+        return concurrent.futures.ProcessPoolExecutor(max_workers=n_workers)
+    return concurrent.futures.ThreadPoolExecutor(max_workers=n_workers)
+
+
+def _parallel_executor(text_ast, paths, step_size, n_workers, use_processes, schema,
+                       result_cache, backend, uproot_options, operation=None):
+    with _executor_pool(n_workers, use_processes) as pool:
+        return list(pool.map(_run_query_on_file,
+                             [text_ast] * len(paths),
+                             paths,
+                             [step_size] * len(paths),
+                             [schema] * len(paths),
+                             [result_cache] * len(paths),
+                             [backend] * len(paths),
+                             [uproot_options] * len(paths),
+                             [operation] * len(paths)))
+
+
+def _parallel_chunks(text_ast, tasks, n_workers, use_processes, schema, result_cache,
+                     backend, uproot_options):
+    import collections
+    with _executor_pool(n_workers, use_processes) as pool:
+        pending = collections.deque()
+        for input_filename, entry_start, entry_stop in tasks:
+            pending.append(pool.submit(_run_query_on_chunk, text_ast, input_filename,
+                                       entry_start, entry_stop, schema, result_cache,
+                                       backend, uproot_options))
+            if len(pending) >= 2 * n_workers:
+                yield pending.popleft().result()
+        while len(pending) > 0:
+            yield pending.popleft().result()
+
+
+def _split_paths(python_ast, entry_start, entry_stop):
+    if entry_start is not None or entry_stop is not None or _query_slices_events(python_ast):
+        return None
+    dataset = find_event_dataset(python_ast)
+    paths = event_dataset_paths(dataset) if dataset is not None else None
+    if paths is None or len(paths) < 2:
+        return None
+    return paths
+
+
+def _chunk_paths(python_ast):
+    if _query_slices_events(python_ast):
+        return None
+    dataset = find_event_dataset(python_ast)
+    return event_dataset_paths(dataset) if dataset is not None else None
+
+
+def _file_step_size(reduction, step_size):
+    if reduction is not None and step_size is None:
+        return default_step_size
+    return step_size
+
+
+def _combine_file_results(reduction, results):
+    if reduction is not None:
+        return reduce_partial_results(reduction, results)
+    import awkward as ak
+    return ak.concatenate(results)
+
+
+def _execute(ast, python_ast, reduction, step_size, n_workers, use_processes,
+             entry_start, entry_stop, schema, profiler, result_cache, backend,
+             uproot_options=None):
+    if profiler is None and n_workers is not None and n_workers > 1:
+        paths = _split_paths(python_ast, entry_start, entry_stop)
+        if paths is not None:
+            text_ast = portable_query(ast)
+            if reduction is None and step_size is not None:
+                return _parallel_chunks(text_ast,
+                                        _chunk_tasks(python_ast, paths, step_size,
+                                                     uproot_options),
+                                        n_workers, use_processes, schema, result_cache,
+                                        backend, uproot_options)
+            step_size = _file_step_size(reduction, step_size)
+            operation = reduction[0] if reduction is not None else None
+            results = _parallel_executor(text_ast, paths, step_size, n_workers,
+                                         use_processes, schema, result_cache, backend,
+                                         uproot_options, operation)
+            return _combine_file_results(reduction, results)
+    query_function = generate_function(ast, schema=schema, profiler=profiler,
+                                       result_cache=result_cache, backend=backend)
+    result = query_function(step_size=step_size, entry_start=entry_start, entry_stop=entry_stop,
+                            uproot_options=uproot_options)
+    if reduction is not None and step_size is not None:
+        return reduce_partial_results(reduction, result)
+    return result
+
+
+def ast_executor(ast, step_size=None, n_workers=None, use_processes=False,
+                 entry_start=None, entry_stop=None,
+                 output=None, output_path=None, row_group_size=None, compression=None,
+                 compression_level=None, schema=None, profiler=None, result_cache=None,
+                 backend='awkward', file_source=None, read_options=None):
+    uproot_options = source_options(file_source, read_options)
+    if profiler is not None:
+        profiler.start()
+    python_ast = linq_ast(ast)
+    schema = resolve_schema(python_ast, schema, uproot_options)
+    reduction = top_level_reduction(query_node(python_ast))
+    if output is not None:
+        if reduction is not None and not isinstance(reduction[0], tuple):
+            raise ValueError('Reductions cannot be written to an output file')
+        if output_path is None:
+            raise ValueError('An output path is required when writing to an output file')
+        if step_size is None:
+            step_size = default_step_size
+    result = _execute(ast, python_ast, reduction, step_size, n_workers, use_processes,
+                      entry_start, entry_stop, schema, profiler, result_cache, backend,
+                      uproot_options)
+    if output is not None:
+        if reduction is not None:
+            result = [result]
+        result = write_chunks(result, output, output_path, row_group_size, compression,
+                              compression_level)
+    elif profiler is not None and step_size is not None and reduction is None:
+        return _profiled_chunks(result, profiler)
+    if profiler is not None:
+        _stop_profiler(profiler)
+    return result
+
+
+def _stop_profiler(profiler):
+    profiler.stop()
+    logging.getLogger(__name__).info('Query profile: ' + profiler.to_json())
+
+
+def _profiled_chunks(chunks, profiler):
+    try:
+        for chunk in chunks:
+            yield chunk
+    finally:
+        _stop_profiler(profiler)
@@ -0,0 +1,12 @@
+def histogram_counts(values, bins, low=None, high=None, weighted=False):
+    import awkward as ak
+    import numpy as np
+    weights = None
+    if weighted:
+        values, weights = ak.broadcast_arrays(values['0'], values['1'])
+        present = ~ak.is_none(values, axis=-1)
+        values = values[present]
+        weights = ak.to_numpy(ak.flatten(weights[present], axis=None))
+    values = ak.to_numpy(ak.flatten(values, axis=None))
+    hist_range = (low, high) if low is not None else None
+    return np.histogram(values, bins=bins, range=hist_range, weights=weights)[0]
@@ -0,0 +1,203 @@
+import ast
+import hashlib
+import os
+import sys
+import threading
+
+from .cache import _write_atomically
+
+
+kernel_function_name = 'kernel'
+kernel_module_prefix = 'func_adl_uproot_kernel_'
+
+kernel_builtins = ('abs', 'bool', 'float', 'int', 'max', 'min', 'round')
+
+kernel_root_node_types = (ast.BinOp,
+                          ast.BoolOp,
+                          ast.Call,
+                          ast.Compare,
+                          ast.IfExp,
+                          ast.UnaryOp)
+
+kernel_bin_op_dict = {ast.Add: '+',
+                      ast.Sub: '-',
+                      ast.Mult: '*',
+                      ast.Div: '/',
+                      ast.FloorDiv: '//',
+                      ast.Mod: '%',
+                      ast.Pow: '**',
+                      ast.LShift: '<<',
+                      ast.RShift: '>>',
+                      ast.BitOr: '|',
+                      ast.BitXor: '^',
+                      ast.BitAnd: '&'}
+
+kernel_unary_op_dict = {ast.UAdd: '+',
+                        ast.USub: '-',
+                        ast.Invert: '~',
+                        ast.Not: 'not '}
+
+kernel_bool_op_dict = {ast.And: ' and ',
+                       ast.Or: ' or '}
+
+kernel_compare_op_dict = {ast.Eq: '==',
+                          ast.NotEq: '!=',
+                          ast.Lt: '<',
+                          ast.LtE: '<=',
+                          ast.Gt: '>',
+                          ast.GtE: '>='}
+
+
+class KernelSourceGenerator(ast.NodeVisitor):
+    def __init__(self):
+        self.leaves = []
+        self._leaf_keys = []
+
+    def generic_visit(self, node):
+        raise NotImplementedError('Cannot compile ' + type(node).__name__ + ' in a kernel')
+
+    def leaf_parameter(self, node):
+        leaf_key = ast.dump(node)
+        if leaf_key not in self._leaf_keys:
+            self._leaf_keys.append(leaf_key)
+            self.leaves.append(node)
+        return 'field' + str(self._leaf_keys.index(leaf_key))
+
+    def visit_Name(self, node):
+        return self.leaf_parameter(node)
+
+    def visit_Attribute(self, node):
+        value = node.value
+        while isinstance(value, ast.Attribute):
+            value = value.value
+        if not isinstance(value, ast.Name):
+            raise NotImplementedError('Kernels can only access fields of names')
+        return self.leaf_parameter(node)
+
+    def visit_Constant(self, node):
+        if not isinstance(node.value, (bool, int, float)):
+            raise NotImplementedError('Cannot compile constant ' + repr(node.value)
+                                      + ' in a kernel')
+        return repr(node.value)
+
+    def visit_Num(self, node):
+        return repr(node.n)
+
+    def visit_NameConstant(self, node):
+        if not isinstance(node.value, bool):
+            raise NotImplementedError('Cannot compile constant ' + repr(node.value)
+                                      + ' in a kernel')
+        return repr(node.value)
+
+    def visit_BinOp(self, node):
+        return ('(' + self.visit(node.left) + ' ' + kernel_bin_op_dict[type(node.op)] + ' '
+                + self.visit(node.right) + ')')
+
+    def visit_UnaryOp(self, node):
+        return '(' + kernel_unary_op_dict[type(node.op)] + self.visit(node.operand) + ')'
+
+    def visit_BoolOp(self, node):
+        separator = kernel_bool_op_dict[type(node.op)]
+        return '(' + separator.join(self.visit(value) for value in node.values) + ')'
+
+    def visit_Compare(self, node):
+        source = '(' + self.visit(node.left)
+        for op, comparator in zip(node.ops, node.comparators):
+            source += ' ' + kernel_compare_op_dict[type(op)] + ' ' + self.visit(comparator)
+        return source + ')'
+
+    def visit_IfExp(self, node):
+        return ('(' + self.visit(node.body) + ' if ' + self.visit(node.test) + ' else '
+                + self.visit(node.orelse) + ')')
+
+    def visit_Call(self, node):
+        if (not isinstance(node.func, ast.Name) or node.func.id not in kernel_builtins
+                or len(getattr(node, 'keywords', [])) > 0):
+            raise NotImplementedError('Cannot compile call to ' + ast.dump(node.func)
+                                      + ' in a kernel')
+        return node.func.id + '(' + ', '.join(self.visit(arg) for arg in node.args) + ')'
+
+
+def needs_kernel(node):
+    return any(isinstance(child, ast.IfExp)
+               or (isinstance(child, ast.Call) and isinstance(child.func, ast.Name)
+                   and child.func.id in kernel_builtins)
+               for child in ast.walk(node))
+
+
+def kernel_source(node):
+    if not isinstance(node, kernel_root_node_types) or not needs_kernel(node):
+        return None
+    generator = KernelSourceGenerator()
+    try:
+        body_source = generator.visit(node)
+    except (KeyError, NotImplementedError):
+        return None
+    if len(generator.leaves) == 0:
+        return None
+    parameters = ', '.join('field' + str(index) for index in range(len(generator.leaves)))
+    source = ('import numba\n\n\n'
+              + '@numba.vectorize(cache=True)\n'
+              + 'def ' + kernel_function_name + '(' + parameters + '):\n'
+              + '    return ' + body_source + '\n')
+    return source, generator.leaves
+
+
+def _load_module(module_name, path):
+    if sys.version_info[0] < 3:
+        import imp
+        return imp.load_source(module_name, path)
+    import importlib.util
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def default_kernel_directory():
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'),
+                                                                  '.cache')
+    return os.path.join(cache_home, 'func_adl_uproot', 'kernels')
+
+
+def _read_file(path):
+    try:
+        with open(path, 'rb') as source_file:
+            return source_file.read()
+    except (IOError, OSError):
+        return None
+
+
+class KernelCache(object):
+    def __init__(self, directory=None):
+        if directory is None:
+            directory = default_kernel_directory()
+        self.directory = directory
+        self._kernels = {}
+        self._lock = threading.RLock()
+
+    def get(self, source):
+        with self._lock:
+            if source in self._kernels:
+                return self._kernels[source]
+            module_name = kernel_module_prefix + hashlib.sha256(source.encode('utf-8')).hexdigest()
+            path = os.path.join(self.directory, module_name + '.py')
+            if _read_file(path) != source.encode('utf-8'):
+                if not os.path.isdir(self.directory):
+                    os.makedirs(self.directory, 0o700)
+                _write_atomically(path, source.encode('utf-8'))
+            kernel = getattr(_load_module(module_name, path), kernel_function_name)
+            self._kernels[source] = kernel
+            return kernel
+
+    def clear(self):
+        with self._lock:
+            self._kernels.clear()
+
+
+kernel_cache = KernelCache()
+
+
+def load_kernel(source):
+    return kernel_cache.get(source)
@@ -0,0 +1,76 @@
+import ast
+
+import qastle
+
+
+class Take(ast.AST):
+    _fields = ['source', 'count']
+
+
+class Skip(ast.AST):
+    _fields = ['source', 'count']
+
+
+class Histogram(ast.AST):
+    _fields = ['source', 'selector', 'bins', 'low', 'high', 'weights']
+
+
+extra_linq_operator_names = ('Take',
+                             'Skip',
+                             'Histogram')
+
+
+def linq_node_types(operator_names):
+    return tuple(getattr(qastle.linq_util, operator_name) for operator_name in operator_names
+                 if hasattr(qastle.linq_util, operator_name))
+
+
+class InsertExtraLINQNodesTransformer(ast.NodeTransformer):
+    def visit_Call(self, node):
+        if isinstance(node.func, ast.Attribute):
+            function_name = node.func.attr
+            if function_name not in extra_linq_operator_names:
+                return self.generic_visit(node)
+            source = node.func.value
+            args = node.args
+        elif isinstance(node.func, ast.Name):
+            function_name = node.func.id
+            if function_name not in extra_linq_operator_names:
+                return self.generic_visit(node)
+            if len(node.args) == 0:
+                raise SyntaxError('LINQ operators must specify a data source to operate on')
+            source = node.args[0]
+            args = node.args[1:]
+        else:
+            return self.generic_visit(node)
+
+        if function_name == 'Take':
+            if len(args) != 1:
+                raise SyntaxError('Take() call must have exactly one argument')
+            return Take(source=self.visit(source), count=self.visit(args[0]))
+        elif function_name == 'Skip':
+            if len(args) != 1:
+                raise SyntaxError('Skip() call must have exactly one argument')
+            return Skip(source=self.visit(source), count=self.visit(args[0]))
+        elif function_name == 'Histogram':
+            if len(args) not in (2, 3, 4, 5):
+                raise SyntaxError('Histogram() call must have two to five arguments')
+            weights = None
+            if len(args) in (3, 5):
+                weights = self.visit(args[-1])
+                args = args[:-1]
+            low = self.visit(args[2]) if len(args) == 4 else None
+            high = self.visit(args[3]) if len(args) == 4 else None
+            return Histogram(source=self.visit(source),
+                             selector=self.visit(args[0]),
+                             bins=self.visit(args[1]),
+                             low=low,
+                             high=high,
+                             weights=weights)
+        else:
+            raise NameError('Unhandled LINQ operator: ' + function_name)
+
+
+def insert_linq_nodes(python_ast):
+    python_ast = qastle.insert_linq_nodes(python_ast)
+    return InsertExtraLINQNodesTransformer().visit(python_ast)
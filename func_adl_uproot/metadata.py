@@ -0,0 +1,90 @@
+import collections
+import os
+
+from .cache import LRUCache
+from .schema import read_schema
+
+
+TreeMetadata = collections.namedtuple('TreeMetadata',
+                                      ['num_entries', 'branches', 'entry_offsets'])
+
+
+def _strip_cycle(name):
+    return name.rsplit(';', 1)[0]
+
+
+def file_key(path):
+    try:
+        file_stat = os.stat(path)
+    except (OSError, TypeError, ValueError):
+        return (path, None, None)
+    return (path, getattr(file_stat, 'st_mtime_ns', file_stat.st_mtime), file_stat.st_size)
+
+
+def _uproot_options(uproot_options):
+    if uproot_options is None:
+        return {}
+    return uproot_options
+
+
+def _read_tree_names(path, uproot_options=None):
+    import uproot
+    with uproot.open(path, **_uproot_options(uproot_options)) as root_file:
+        tree_names = []
+        for name, classname in root_file.classnames().items():
+            name = _strip_cycle(name)
+            if classname == 'TTree' and name not in tree_names:
+                tree_names.append(name)
+    return tuple(tree_names)
+
+
+def _read_tree_metadata(path, tree_name, uproot_options=None):
+    import uproot
+    with uproot.open(path, **_uproot_options(uproot_options)) as root_file:
+        tree = root_file[tree_name]
+        return TreeMetadata(tree.num_entries,
+                            tuple(tree.keys()),
+                            tuple(int(offset) for offset in tree.common_entry_offsets()))
+
+
+class MetadataCache(LRUCache):
+    def __init__(self, maxsize=1024):
+        super(MetadataCache, self).__init__(maxsize)
+
+    def _get(self, key, read):
+        found, value = self._lookup(key)
+        if found:
+            return value
+        with self._lock:
+            self._misses += 1
+        value = read()
+        self._insert(key, value)
+        return value
+
+    def tree_names(self, path, uproot_options=None):
+        return self._get(file_key(path) + (None,),
+                         lambda: _read_tree_names(path, uproot_options))
+
+    def tree_metadata(self, path, tree_name, uproot_options=None):
+        tree_name = _strip_cycle(tree_name)
+        return self._get(file_key(path) + (tree_name,),
+                         lambda: _read_tree_metadata(path, tree_name, uproot_options))
+
+    def tree_schema(self, path, tree_name, uproot_options=None):
+        tree_name = _strip_cycle(tree_name)
+        return self._get(file_key(path) + (tree_name, 'schema'),
+                         lambda: read_schema(path, tree_name, uproot_options))
+
+
+metadata_cache = MetadataCache()
+
+
+def find_tree_name(path, uproot_options=None):
+    tree_names = metadata_cache.tree_names(path, uproot_options)
+    if len(tree_names) == 0:
+        raise ValueError('No TTree found in ' + repr(path))
+    return tree_names[0]
+
+
+def num_entries(path, tree_name, uproot_options=None):
+    return metadata_cache.tree_metadata(path, tree_name, uproot_options).num_entries
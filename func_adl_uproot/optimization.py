@@ -0,0 +1,532 @@
+import ast
+import collections
+import copy
+import math
+import operator
+
+import qastle
+
+from .branches import lambda_argument_names
+from .linq import Histogram, Skip, Take, linq_node_types
+
+
+constant_bin_op_dict = {ast.Add: operator.add,
+                        ast.Sub: operator.sub,
+                        ast.Mult: operator.mul,
+                        ast.Div: operator.truediv,
+                        ast.FloorDiv: operator.floordiv,
+                        ast.Mod: operator.mod,
+                        ast.Pow: operator.pow,
+                        ast.LShift: operator.lshift,
+                        ast.RShift: operator.rshift,
+                        ast.BitOr: operator.or_,
+                        ast.BitXor: operator.xor,
+                        ast.BitAnd: operator.and_}
+
+constant_unary_op_dict = {ast.UAdd: operator.pos,
+                          ast.USub: operator.neg,
+                          ast.Invert: operator.invert,
+                          ast.Not: operator.not_}
+
+constant_compare_op_dict = {ast.Eq: operator.eq,
+                            ast.NotEq: operator.ne,
+                            ast.Lt: operator.lt,
+                            ast.LtE: operator.le,
+                            ast.Gt: operator.gt,
+                            ast.GtE: operator.ge}
+
+max_folded_exponent = 64
+
+subexpression_node_types = (ast.BinOp,
+                            ast.BoolOp,
+                            ast.Call,
+                            ast.Compare,
+                            ast.IfExp,
+                            ast.Subscript,
+                            ast.UnaryOp)
+
+subexpression_linq_node_types = linq_node_types(('Where',
+                                                 'Select',
+                                                 'SelectMany',
+                                                 'First',
+                                                 'Last',
+                                                 'ElementAt',
+                                                 'Contains',
+                                                 'Aggregate',
+                                                 'Count',
+                                                 'Max',
+                                                 'Min',
+                                                 'Sum',
+                                                 'All',
+                                                 'Any',
+                                                 'Concat',
+                                                 'Zip',
+                                                 'OrderBy',
+                                                 'OrderByDescending',
+                                                 'Choose')) + (Take, Skip, Histogram)
+
+unfusable_linq_node_types = linq_node_types(('First',
+                                             'Last',
+                                             'ElementAt',
+                                             'Max',
+                                             'Min'))
+
+
+def copy_ast(root):
+    nodes = list(ast.walk(root))
+    copies = {}
+    for node in reversed(nodes):
+        node_copy = copy.copy(node)
+        for field, value in ast.iter_fields(node):
+            if isinstance(value, ast.AST):
+                setattr(node_copy, field, copies[id(value)])
+            elif isinstance(value, list):
+                setattr(node_copy, field, [copies[id(item)]
+                                           if isinstance(item, ast.AST) else item
+                                           for item in value])
+        copies[id(node)] = node_copy
+    return copies[id(root)]
+
+
+def _literal_value(node):
+    try:
+        return True, ast.literal_eval(node)
+    except (SyntaxError, TypeError, ValueError):
+        return False, None
+
+
+def _is_number(value):
+    return isinstance(value, (bool, int, float, complex))
+
+
+def _is_finite(value):
+    if isinstance(value, complex):
+        return _is_finite(value.real) and _is_finite(value.imag)
+    if isinstance(value, float):
+        return not (math.isinf(value) or math.isnan(value))
+    return True
+
+
+def _literal_node(value):
+    return ast.parse(repr(value), mode='eval').body
+
+
+class ConstantFolder(ast.NodeTransformer):
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if type(node.op) not in constant_bin_op_dict:
+            return node
+        left_is_literal, left = _literal_value(node.left)
+        right_is_literal, right = _literal_value(node.right)
+        if not (left_is_literal and right_is_literal and _is_number(left) and _is_number(right)):
+            return node
+        if type(node.op) is ast.Pow and abs(right) > max_folded_exponent:
+            return node
+        try:
+            result = constant_bin_op_dict[type(node.op)](left, right)
+        except (ArithmeticError, TypeError, ValueError):
+            return node
+        if not _is_finite(result):
+            return node
+        return ast.copy_location(_literal_node(result), node)
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        operand_is_literal, operand = _literal_value(node.operand)
+        if not operand_is_literal or not _is_number(operand):
+            return node
+        try:
+            result = constant_unary_op_dict[type(node.op)](operand)
+        except (ArithmeticError, TypeError, ValueError):
+            return node
+        if not _is_finite(result):
+            return node
+        return ast.copy_location(_literal_node(result), node)
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        values = [_literal_value(value) for value in node.values]
+        if not all(is_literal and _is_number(value) for is_literal, value in values):
+            return node
+        if type(node.op) is ast.And:
+            result = all(value for is_literal, value in values)
+        else:
+            result = any(value for is_literal, value in values)
+        return ast.copy_location(_literal_node(result), node)
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        operands = [_literal_value(operand) for operand in [node.left] + node.comparators]
+        if not all(is_literal and (_is_number(value) or isinstance(value, str))
+                   for is_literal, value in operands):
+            return node
+        if not all(type(op) in constant_compare_op_dict for op in node.ops):
+            return node
+        result = True
+        try:
+            for op, (_, left), (_, right) in zip(node.ops, operands[:-1], operands[1:]):
+                result = result and constant_compare_op_dict[type(op)](left, right)
+        except TypeError:
+            return node
+        return ast.copy_location(_literal_node(bool(result)), node)
+
+    def visit_IfExp(self, node):
+        self.generic_visit(node)
+        test_is_literal, test = _literal_value(node.test)
+        if not test_is_literal or not _is_number(test):
+            return node
+        if test:
+            return node.body
+        return node.orelse
+
+
+def fold_constants(python_ast):
+    return ConstantFolder().visit(python_ast)
+
+
+def _is_subexpression_candidate(node):
+    if isinstance(node, ast.Subscript):
+        slice_node = node.slice
+        if type(slice_node).__name__ == 'Index':
+            slice_node = slice_node.value
+        return not _literal_value(slice_node)[0]
+    return isinstance(node, subexpression_node_types + subexpression_linq_node_types)
+
+
+def _subexpressions(node):
+    stack = list(reversed(list(ast.iter_child_nodes(node))))
+    while len(stack) > 0:
+        child = stack.pop()
+        if isinstance(child, ast.Lambda):
+            continue
+        if _is_subexpression_candidate(child):
+            yield child
+        stack.extend(reversed(list(ast.iter_child_nodes(child))))
+
+
+class StructuralKeys(object):
+    def __init__(self):
+        self._key_ids = {}
+        self._entries = {}
+
+    def _field_key(self, value):
+        if isinstance(value, ast.AST):
+            return self._entries[id(value)][1]
+        if isinstance(value, list):
+            return tuple(self._field_key(item) for item in value)
+        return (type(value), value)
+
+    def _field_size(self, value):
+        if isinstance(value, ast.AST):
+            return self._entries[id(value)][2]
+        if isinstance(value, list):
+            return sum(self._field_size(item) for item in value)
+        return 0
+
+    def _compute(self, root):
+        stack = [(root, False)]
+        while len(stack) > 0:
+            node, expanded = stack.pop()
+            if id(node) in self._entries:
+                continue
+            if not expanded:
+                stack.append((node, True))
+                stack.extend((child, False) for child in ast.iter_child_nodes(node))
+                continue
+            fields = [value for _, value in ast.iter_fields(node)]
+            structure = (type(node), tuple(self._field_key(value) for value in fields))
+            key = self._key_ids.setdefault(structure, len(self._key_ids))
+            size = 1 + sum(self._field_size(value) for value in fields)
+            self._entries[id(node)] = (node, key, size)
+
+    def key(self, node):
+        if id(node) not in self._entries:
+            self._compute(node)
+        return self._entries[id(node)][1]
+
+    def size(self, node):
+        if id(node) not in self._entries:
+            self._compute(node)
+        return self._entries[id(node)][2]
+
+    def known(self, node):
+        return id(node) in self._entries
+
+    def invalidate(self, node):
+        self._entries.pop(id(node), None)
+
+
+class SubexpressionReplacer(ast.NodeTransformer):
+    def __init__(self, names, structural_keys):
+        self.names = names
+        self.structural_keys = structural_keys
+
+    def visit_Lambda(self, node):
+        return node
+
+    def generic_visit(self, node):
+        if _is_subexpression_candidate(node):
+            name = self.names.get(self.structural_keys.key(node))
+            if name is not None:
+                return ast.copy_location(ast.Name(id=name, ctx=ast.Load()), node)
+        node = super(SubexpressionReplacer, self).generic_visit(node)
+        if not all(self.structural_keys.known(child) for child in ast.iter_child_nodes(node)):
+            self.structural_keys.invalidate(node)
+        return node
+
+
+class CommonSubexpressionEliminator(ast.NodeTransformer):
+    def __init__(self, used_names):
+        self.used_names = set(used_names)
+        self.n_bindings = 0
+        self.structural_keys = StructuralKeys()
+
+    def new_name(self):
+        while True:
+            name = '_cse' + str(self.n_bindings)
+            self.n_bindings += 1
+            if name not in self.used_names:
+                return name
+
+    def repeated_subexpressions(self, roots):
+        counts = collections.OrderedDict()
+        nodes = {}
+        for root in roots:
+            candidates = list(_subexpressions(root))
+            if _is_subexpression_candidate(root):
+                candidates.append(root)
+            for candidate in candidates:
+                key = self.structural_keys.key(candidate)
+                counts[key] = counts.get(key, 0) + 1
+                nodes[key] = candidate
+        repeated_keys = set(key for key, count in counts.items() if count > 1)
+        nested_keys = set()
+        stack = [(root, False) for root in roots]
+        while len(stack) > 0:
+            node, inside_repeated = stack.pop()
+            repeated = (_is_subexpression_candidate(node)
+                        and self.structural_keys.key(node) in repeated_keys)
+            if repeated and inside_repeated:
+                nested_keys.add(self.structural_keys.key(node))
+            stack.extend((child, inside_repeated or repeated)
+                         for child in ast.iter_child_nodes(node)
+                         if not isinstance(child, ast.Lambda))
+        keys = [key for key in counts if key in repeated_keys and key not in nested_keys]
+        keys.sort(key=lambda key: -self.structural_keys.size(nodes[key]))
+        return [(key, nodes[key]) for key in keys]
+
+    def visit_Lambda(self, node):
+        self.generic_visit(node)
+        body = node.body
+        bindings = []
+        while True:
+            subexpressions = self.repeated_subexpressions(
+                [body] + [expression for _, expression in bindings])
+            if len(subexpressions) == 0:
+                break
+            names = dict((key, self.new_name()) for key, _ in subexpressions)
+            replacer = SubexpressionReplacer(names, self.structural_keys)
+            body = replacer.visit(body)
+            bindings = [(binding_name, replacer.visit(expression))
+                        for binding_name, expression in bindings]
+            bindings.extend((names[key], subexpression) for key, subexpression in subexpressions)
+        for name, expression in bindings:
+            binding_lambda = ast.parse('lambda ' + name + ': None', mode='eval').body
+            binding_lambda.body = body
+            binding_lambda.is_binding = True
+            body = ast.Call(func=binding_lambda, args=[expression], keywords=[])
+        node.body = body
+        return node
+
+
+def eliminate_common_subexpressions(python_ast):
+    used_names = [node.id for node in ast.walk(python_ast) if isinstance(node, ast.Name)]
+    return CommonSubexpressionEliminator(used_names).visit(python_ast)
+
+
+class SubstitutionConflict(Exception):
+    pass
+
+
+def _literal_index(node):
+    slice_node = node.slice
+    if type(slice_node).__name__ == 'Index':
+        slice_node = slice_node.value
+    return _literal_value(slice_node)
+
+
+def _container_element(container, index):
+    if isinstance(container, ast.Dict):
+        for key, value in zip(container.keys, container.values):
+            if key is not None and _literal_value(key) == (True, index):
+                return value
+        if (isinstance(index, int) and not isinstance(index, bool)
+                and all(key is not None for key in container.keys)
+                and -len(container.values) <= index < len(container.values)):
+            return container.values[index]
+    if (isinstance(container, (ast.List, ast.Tuple))
+            and isinstance(index, int) and not isinstance(index, bool)
+            and -len(container.elts) <= index < len(container.elts)):
+        return container.elts[index]
+    return None
+
+
+class NameSubstituter(ast.NodeTransformer):
+    def __init__(self, name, replacement, copy_replacement=True):
+        self.name = name
+        self.replacement = replacement
+        self.copy_replacement = copy_replacement
+        self._replacement_names = None
+        self.taken = []
+
+    def replacement_names(self):
+        if self._replacement_names is None:
+            self._replacement_names = set(node.id for node in ast.walk(self.replacement)
+                                          if isinstance(node, ast.Name))
+        return self._replacement_names
+
+    def take(self, node):
+        self.taken.append(node)
+        if self.copy_replacement:
+            return copy_ast(node)
+        self.copy_replacement = True
+        return node
+
+    def is_substituted(self, node):
+        return isinstance(node, ast.Name) and node.id == self.name
+
+    def visit_Name(self, node):
+        if self.is_substituted(node):
+            return ast.copy_location(self.take(self.replacement), node)
+        return node
+
+    def visit_Attribute(self, node):
+        if self.is_substituted(node.value):
+            element = _container_element(self.replacement, node.attr)
+            if element is not None:
+                return self.take(element)
+        self.generic_visit(node)
+        element = _container_element(node.value, node.attr)
+        return element if element is not None else node
+
+    def visit_Subscript(self, node):
+        is_literal, index = _literal_index(node)
+        if is_literal and self.is_substituted(node.value):
+            element = _container_element(self.replacement, index)
+            if element is not None:
+                return self.take(element)
+        self.generic_visit(node)
+        if is_literal:
+            element = _container_element(node.value, index)
+            if element is not None:
+                return element
+        return node
+
+    def visit_Lambda(self, node):
+        argument_names = lambda_argument_names(node)
+        if self.name in argument_names:
+            return node
+        if not self.replacement_names().isdisjoint(argument_names):
+            raise SubstitutionConflict(node)
+        return self.generic_visit(node)
+
+
+def _is_unary_lambda(node):
+    return isinstance(node, ast.Lambda) and len(node.args.args) == 1
+
+
+def _is_field_access(node):
+    while not isinstance(node, ast.Name):
+        if isinstance(node, ast.Subscript):
+            is_literal, index = _literal_index(node)
+            if not is_literal or not isinstance(index, str):
+                return False
+        elif not isinstance(node, ast.Attribute):
+            return False
+        node = node.value
+    return True
+
+
+def _compose(outer, inner, copy_inner=True, field_accesses_only=False):
+    substituter = NameSubstituter(lambda_argument_names(outer)[0], inner.body, copy_inner)
+    try:
+        body = substituter.visit(copy_ast(outer.body))
+    except SubstitutionConflict:
+        return None
+    if field_accesses_only and not all(_is_field_access(node) for node in substituter.taken):
+        return None
+    composed = copy.copy(inner)
+    composed.args = copy_ast(inner.args)
+    composed.body = body
+    return composed
+
+
+def _can_evaluate_eagerly(node):
+    for child in ast.walk(node):
+        if isinstance(child, unfusable_linq_node_types):
+            return False
+        if isinstance(child, ast.Subscript):
+            slice_node = child.slice
+            if type(slice_node).__name__ == 'Index':
+                slice_node = slice_node.value
+            is_literal, index = _literal_value(slice_node)
+            if not is_literal or not isinstance(index, str):
+                return False
+    return True
+
+
+def _conjunction(left, right):
+    values = []
+    for value in (left, right):
+        if isinstance(value, ast.BoolOp) and isinstance(value.op, ast.And):
+            values.extend(value.values)
+        else:
+            values.append(value)
+    return ast.BoolOp(op=ast.And(), values=values)
+
+
+class LINQOperatorFuser(ast.NodeTransformer):
+    def visit_Select(self, node):
+        self.generic_visit(node)
+        source = node.source
+        if (isinstance(source, qastle.linq_util.Select)
+                and _is_unary_lambda(node.selector) and _is_unary_lambda(source.selector)):
+            selector = _compose(node.selector, source.selector, False)
+            if selector is not None:
+                return ast.copy_location(qastle.linq_util.Select(source=source.source,
+                                                                 selector=selector),
+                                         node)
+        return node
+
+    def visit_Where(self, node):
+        self.generic_visit(node)
+        source = node.source
+        if not _is_unary_lambda(node.predicate):
+            return node
+        if (isinstance(source, qastle.linq_util.Select)
+                and _is_unary_lambda(source.selector)):
+            predicate = _compose(node.predicate, source.selector, field_accesses_only=True)
+            if predicate is not None:
+                where = qastle.linq_util.Where(source=source.source, predicate=predicate)
+                return ast.copy_location(qastle.linq_util.Select(source=self.visit(where),
+                                                                 selector=source.selector),
+                                         node)
+        if (isinstance(source, qastle.linq_util.Where)
+                and _is_unary_lambda(source.predicate)):
+            argument = copy.copy(source.predicate)
+            argument.body = ast.Name(id=lambda_argument_names(argument)[0], ctx=ast.Load())
+            predicate = _compose(node.predicate, argument, False)
+            if predicate is not None and _can_evaluate_eagerly(predicate.body):
+                predicate.body = _conjunction(source.predicate.body, predicate.body)
+                return ast.copy_location(qastle.linq_util.Where(source=source.source,
+                                                                predicate=predicate),
+                                         node)
+        return node
+
+
+def fuse_linq_operators(python_ast):
+    return LINQOperatorFuser().visit(python_ast)
+
+
+def optimize(python_ast):
+    return eliminate_common_subexpressions(fold_constants(fuse_linq_operators(python_ast)))
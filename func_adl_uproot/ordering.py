@@ -0,0 +1,70 @@
+def _flat_keys(keys):
+    import awkward as ak
+    import numpy as np
+    try:
+        values = ak.to_numpy(keys, allow_missing=False)
+    except (TypeError, ValueError):
+        return None
+    if values.ndim != 1 or values.dtype.kind not in 'biuf':
+        return None
+    if values.dtype.kind == 'f' and np.isnan(values).any():
+        return None
+    return values
+
+
+def _partial_argsort(values, count, ascending):
+    import awkward as ak
+    import numpy as np
+    if count == 0:
+        return np.empty(0, dtype=np.int64)
+    if ascending:
+        threshold = np.partition(values, count - 1)[count - 1]
+        selected = np.flatnonzero(values < threshold)
+    else:
+        threshold = np.partition(values, len(values) - count)[len(values) - count]
+        selected = np.flatnonzero(values > threshold)
+    ties = np.flatnonzero(values == threshold)[:count - len(selected)]
+    indices = np.sort(np.concatenate([selected, ties]))
+    return indices[ak.to_numpy(ak.argsort(values[indices], ascending=ascending))]
+
+
+def top_k_indices(keys, count, axis, ascending=True):
+    import awkward as ak
+    if axis == 0 and count is not None:
+        values = _flat_keys(keys)
+        if values is not None and 0 <= count < len(values):
+            return _partial_argsort(values, count, ascending)
+    indices = ak.argsort(keys, axis=axis, ascending=ascending)
+    if count is None:
+        return indices
+    return indices[(slice(None),) * axis + (slice(None, count),)]
+
+
+def top_k_partial(rows, keys, count, ascending=True):
+    import awkward as ak
+    indices = top_k_indices(keys, count, 0, ascending)
+    return ak.zip({'key': keys[indices], 'value': rows[indices]}, depth_limit=1)
+
+
+def _sorted_runs(partial):
+    if isinstance(partial, list):
+        return partial
+    return [partial]
+
+
+def merge_top_k(left, right, count, ascending=True):
+    import awkward as ak
+    if count is None:
+        runs = _sorted_runs(left)
+        runs.extend(_sorted_runs(right))
+        return runs
+    merged = ak.concatenate([left, right])
+    return merged[top_k_indices(merged['key'], count, 0, ascending)]
+
+
+def top_k_values(result, count=None, ascending=True):
+    import awkward as ak
+    if isinstance(result, list):
+        merged = ak.concatenate(result) if len(result) > 1 else result[0]
+        result = merged[top_k_indices(merged['key'], count, 0, ascending)]
+    return result['value']
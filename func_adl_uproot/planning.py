@@ -0,0 +1,114 @@
+import bisect
+import collections
+
+from .branches import annotate_branches, find_event_dataset, query_node
+from .executor import (_dataset_tree_name, _query_slices_events, accumulate_partial_results,
+                       reduce_partial_results)
+from .metadata import _uproot_options, metadata_cache
+from .optimization import optimize
+from .reading import source_options
+from .transformer import event_dataset_paths, top_level_reduction
+from .translation import generate_function, linq_ast, portable_query, resolve_schema
+
+
+default_target_bytes = 100 * 1024 ** 2
+
+WorkUnit = collections.namedtuple('WorkUnit',
+                                  ['path', 'tree_name', 'entry_start', 'entry_stop', 'query'])
+
+
+def cluster_bytes(path, tree_name, branch_names, entry_offsets, uproot_options=None):
+    import uproot
+    n_bytes = [0] * (len(entry_offsets) - 1)
+    with uproot.open(path, **_uproot_options(uproot_options)) as root_file:
+        tree = root_file[tree_name]
+        if branch_names is None:
+            branch_names = tree.keys(recursive=False)
+        for branch_name in branch_names:
+            branch = tree[branch_name]
+            for basket_index in range(branch.num_baskets):
+                basket_start, _ = branch.basket_entry_start_stop(basket_index)
+                cluster_index = bisect.bisect_right(entry_offsets, basket_start) - 1
+                if 0 <= cluster_index < len(n_bytes):
+                    n_bytes[cluster_index] += branch.basket_compressed_bytes(basket_index)
+    return n_bytes
+
+
+def _file_work_units(path, tree_name, branch_names, query, target_events, target_bytes,
+                     uproot_options):
+    entry_offsets = list(metadata_cache.tree_metadata(path, tree_name,
+                                                      uproot_options).entry_offsets)
+    if target_bytes is not None:
+        n_bytes = cluster_bytes(path, tree_name, branch_names, entry_offsets, uproot_options)
+    work_units = []
+    unit_start = entry_offsets[0]
+    unit_bytes = 0
+    for cluster_index in range(len(entry_offsets) - 1):
+        cluster_stop = entry_offsets[cluster_index + 1]
+        if target_bytes is not None:
+            unit_bytes += n_bytes[cluster_index]
+        if ((target_events is not None and cluster_stop - unit_start >= target_events)
+                or (target_bytes is not None and unit_bytes >= target_bytes)
+                or cluster_index == len(entry_offsets) - 2):
+            work_units.append(WorkUnit(path, tree_name, unit_start, cluster_stop, query))
+            unit_start = cluster_stop
+            unit_bytes = 0
+    return work_units
+
+
+def plan_work_units(ast, target_events=None, target_bytes=None, file_source=None,
+                    read_options=None):
+    if target_events is None and target_bytes is None:
+        target_bytes = default_target_bytes
+    if ((target_events is not None and target_events <= 0)
+            or (target_bytes is not None and target_bytes <= 0)):
+        raise ValueError('Work unit targets must be positive, found '
+                         + repr((target_events, target_bytes)))
+    uproot_options = source_options(file_source, read_options)
+    python_ast = optimize(linq_ast(ast))
+    if _query_slices_events(python_ast):
+        raise ValueError('Queries that take or skip events cannot be split into work units')
+    dataset = find_event_dataset(python_ast)
+    paths = event_dataset_paths(dataset) if dataset is not None else None
+    if paths is None or len(paths) == 0:
+        raise ValueError('Planning work units requires an EventDataset with input files')
+    annotate_branches(python_ast)
+    query = portable_query(ast)
+    work_units = []
+    for path in paths:
+        work_units.extend(_file_work_units(path,
+                                           _dataset_tree_name(dataset, path, uproot_options),
+                                           getattr(dataset, 'branches', None), query,
+                                           target_events, target_bytes, uproot_options))
+    return work_units
+
+
+def run_work_unit(work_unit, schema=None, result_cache=None, backend='awkward',
+                  file_source=None, read_options=None):
+    work_unit = WorkUnit(*work_unit)
+    uproot_options = source_options(file_source, read_options)
+    python_ast = linq_ast(work_unit.query)
+    query_function = generate_function(work_unit.query,
+                                       schema=resolve_schema(python_ast, schema, uproot_options),
+                                       result_cache=result_cache, backend=backend)
+    reduction = top_level_reduction(query_node(python_ast))
+    step_size = None
+    if reduction is not None:
+        step_size = work_unit.entry_stop - work_unit.entry_start
+    result = query_function(input_filenames=[work_unit.path],
+                            tree_name=work_unit.tree_name,
+                            step_size=step_size,
+                            entry_start=work_unit.entry_start,
+                            entry_stop=work_unit.entry_stop,
+                            uproot_options=uproot_options)
+    if reduction is not None:
+        return accumulate_partial_results(reduction[0], result)
+    return result
+
+
+def merge_work_unit_results(query, results):
+    reduction = top_level_reduction(query_node(linq_ast(query)))
+    if reduction is not None:
+        return reduce_partial_results(reduction, results)
+    import awkward as ak
+    return ak.concatenate(list(results))
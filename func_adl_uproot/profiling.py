@@ -0,0 +1,150 @@
+import collections
+import contextlib
+import json
+import threading
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+def count_elements(array, depth):
+    import awkward as ak
+    if depth is None or depth == 0:
+        return len(array)
+    return int(ak.sum(ak.num(array, axis=depth)))
+
+
+class QueryProfiler(object):
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory and tracemalloc is not None
+        self.stages = collections.OrderedDict()
+        self.nodes = collections.OrderedDict()
+        self.branches = collections.OrderedDict()
+        self.peak_memory = None
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._start_time = None
+        self._started_tracing = False
+
+    def start(self):
+        self._start_time = time.time()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        if self.trace_memory and hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+
+    def stop(self):
+        if self._start_time is not None:
+            self.add_stage_time('total', time.time() - self._start_time)
+            self._start_time = None
+        if self.trace_memory and tracemalloc.is_tracing():
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+    def add_stage_time(self, stage, seconds):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def stage(self, stage):
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            self.add_stage_time(stage, time.time() - start_time)
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def _node_record(self, node_id, operator, depth):
+        if node_id not in self.nodes:
+            self.nodes[node_id] = collections.OrderedDict([('id', node_id),
+                                                           ('operator', operator),
+                                                           ('depth', depth),
+                                                           ('calls', 0),
+                                                           ('time', 0.0),
+                                                           ('self_time', 0.0)])
+        return self.nodes[node_id]
+
+    def call(self, node_id, operator, depth, function, *args):
+        stack = self._stack()
+        stack.append(0.0)
+        start_time = time.time()
+        try:
+            return function(*args)
+        finally:
+            elapsed_time = time.time() - start_time
+            child_time = stack.pop()
+            if len(stack) > 0:
+                stack[-1] += elapsed_time
+            with self._lock:
+                record = self._node_record(node_id, operator, depth)
+                record['calls'] += 1
+                record['time'] += elapsed_time
+                record['self_time'] += elapsed_time - child_time
+
+    def count_events(self, node_id, operator, depth, events_in, events_out):
+        with self._lock:
+            record = self._node_record(node_id, operator, depth)
+            record['events_in'] = record.get('events_in', 0) + events_in
+            record['events_out'] = record.get('events_out', 0) + events_out
+
+    def filter(self, node_id, depth, source, predicate):
+        result = self.call(node_id, 'Where', depth, predicate, source)
+        self.count_events(node_id, 'Where', depth,
+                          count_elements(source, depth), count_elements(result, depth))
+        return result
+
+    def predicate(self, node_id, depth, predicate):
+        def profiled_predicate(events):
+            import awkward as ak
+            import numpy as np
+            mask = self.call(node_id, 'Where', depth, predicate, events)
+            self.count_events(node_id, 'Where', depth, len(events),
+                              int(np.count_nonzero(ak.to_numpy(ak.fill_none(mask, False)))))
+            return mask
+        return profiled_predicate
+
+    def record_read(self, tree, branch_names, entry_start, entry_stop):
+        if branch_names is None:
+            branch_names = tree.keys(recursive=False)
+        if entry_start is None:
+            entry_start = 0
+        if entry_stop is None:
+            entry_stop = tree.num_entries
+        for branch_name in branch_names:
+            branch = tree[branch_name]
+            n_bytes = 0
+            n_baskets = 0
+            for basket_index in range(branch.num_baskets):
+                basket_start, basket_stop = branch.basket_entry_start_stop(basket_index)
+                if basket_start < entry_stop and basket_stop > entry_start:
+                    n_bytes += branch.basket_compressed_bytes(basket_index)
+                    n_baskets += 1
+            with self._lock:
+                if branch_name not in self.branches:
+                    self.branches[branch_name] = collections.OrderedDict([('bytes', 0),
+                                                                          ('baskets', 0)])
+                self.branches[branch_name]['bytes'] += n_bytes
+                self.branches[branch_name]['baskets'] += n_baskets
+
+    def report(self):
+        with self._lock:
+            return collections.OrderedDict([('stages', dict(self.stages)),
+                                            ('nodes', [dict(record)
+                                                       for record in self.nodes.values()]),
+                                            ('branches', dict((branch_name, dict(record))
+                                                              for branch_name, record
+                                                              in self.branches.items())),
+                                            ('peak_memory', self.peak_memory)])
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.report(), **kwargs)
@@ -0,0 +1,290 @@
+import collections
+
+from .metadata import _uproot_options, metadata_cache, num_entries
+
+
+file_source_handlers = {'memmap': 'MemmapSource',
+                        'file': 'MultithreadedFileSource'}
+
+
+def compose_entry_range(entry_start, entry_stop, query_entry_start, query_entry_stop):
+    if entry_start is None:
+        entry_start = 0
+    start = entry_start + query_entry_start
+    if query_entry_stop is None:
+        stop = entry_stop
+    elif entry_stop is None:
+        stop = entry_start + query_entry_stop
+    else:
+        stop = min(entry_stop, entry_start + query_entry_stop)
+    if stop is not None:
+        start = min(start, stop)
+    return start, stop
+
+
+def source_options(file_source=None, read_options=None):
+    options = dict(read_options) if read_options is not None else {}
+    if file_source is not None:
+        if file_source not in file_source_handlers:
+            raise ValueError('Unknown file source: ' + repr(file_source) + ', expected one of '
+                             + repr(sorted(file_source_handlers)))
+        import uproot
+        options['file_handler'] = getattr(uproot, file_source_handlers[file_source])
+    return options
+
+
+def _reads_no_branches(filter_name):
+    return filter_name is not None and len(filter_name) == 0
+
+
+def _filter_options(filter_name):
+    if filter_name is None:
+        return {}
+    return {'filter_name': filter_name}
+
+
+def entry_ranges(input_files, tree_name, entry_start=None, entry_stop=None,
+                 uproot_options=None):
+    if entry_start is None:
+        entry_start = 0
+    if entry_start < 0 or (entry_stop is not None and entry_stop < 0):
+        raise ValueError('Entry ranges must be non-negative, found '
+                         + repr((entry_start, entry_stop)))
+    offset = 0
+    for input_file in input_files:
+        if entry_stop is not None and offset >= entry_stop:
+            break
+        file_num_entries = num_entries(input_file, tree_name, uproot_options)
+        file_entry_start = max(entry_start - offset, 0)
+        file_entry_stop = file_num_entries
+        if entry_stop is not None:
+            file_entry_stop = min(entry_stop - offset, file_num_entries)
+        if file_entry_start < file_entry_stop:
+            yield input_file, file_entry_start, file_entry_stop
+        offset += file_num_entries
+
+
+def tree_chunk_ranges(tree, step_size, filter_name=None, entry_start=None, entry_stop=None):
+    file_num_entries = tree.num_entries
+    if isinstance(step_size, str):
+        if _reads_no_branches(filter_name):
+            step_size = file_num_entries
+        else:
+            step_size = tree.num_entries_for(step_size, **_filter_options(filter_name))
+    step_size = max(int(step_size), 1)
+    if entry_start is None:
+        entry_start = 0
+    if entry_stop is None or entry_stop > file_num_entries:
+        entry_stop = file_num_entries
+    return [(chunk_start, min(chunk_start + step_size, entry_stop))
+            for chunk_start in range(entry_start, entry_stop, step_size)]
+
+
+def chunk_entry_ranges(input_file, tree_name, step_size, filter_name=None, uproot_options=None,
+                       entry_start=None, entry_stop=None):
+    import uproot
+    with uproot.open(input_file, **_uproot_options(uproot_options)) as root_file:
+        return tree_chunk_ranges(root_file[tree_name], step_size, filter_name, entry_start,
+                                 entry_stop)
+
+
+def _other_branches(tree, filter_name, predicate_branches):
+    if filter_name is None:
+        filter_name = tree.keys(recursive=False)
+    return [branch for branch in filter_name if branch not in predicate_branches]
+
+
+def surviving_entry_ranges(mask, entry_start, entry_offsets):
+    import numpy as np
+    entry_stop = entry_start + len(mask)
+    boundaries = sorted(set([entry_start, entry_stop]
+                            + [offset for offset in entry_offsets
+                               if entry_start < offset < entry_stop]))
+    ranges = []
+    for cluster_start, cluster_stop in zip(boundaries[:-1], boundaries[1:]):
+        if not np.any(mask[cluster_start - entry_start:cluster_stop - entry_start]):
+            continue
+        if len(ranges) > 0 and ranges[-1][1] == cluster_start:
+            ranges[-1] = (ranges[-1][0], cluster_stop)
+        else:
+            ranges.append((cluster_start, cluster_stop))
+    return ranges
+
+
+def empty_events(n_events):
+    import awkward as ak
+    return ak.Array(ak.layout.RecordArray([], [], n_events))
+
+
+def read_arrays(tree, filter_name, entry_start, entry_stop, profiler=None):
+    if profiler is not None:
+        profiler.record_read(tree, filter_name, entry_start, entry_stop)
+    if _reads_no_branches(filter_name):
+        if entry_start is None:
+            entry_start = 0
+        if entry_stop is None or entry_stop > tree.num_entries:
+            entry_stop = tree.num_entries
+        return empty_events(max(entry_stop - entry_start, 0))
+    return tree.arrays(entry_start=entry_start, entry_stop=entry_stop,
+                       **_filter_options(filter_name))
+
+
+def select_events(events, predicate):
+    import awkward as ak
+    import numpy as np
+    return events[np.asarray(ak.to_numpy(ak.fill_none(predicate(events), False)), dtype=bool)]
+
+
+def filter_events(tree, predicate_events, predicate, predicate_branches, filter_name,
+                  entry_start, entry_offsets, profiler=None):
+    import awkward as ak
+    import numpy as np
+    mask = np.asarray(ak.to_numpy(ak.fill_none(predicate(predicate_events), False)), dtype=bool)
+    other_branches = _other_branches(tree, filter_name, predicate_branches)
+    fields = {field: predicate_events[field][mask] for field in predicate_events.fields}
+    if len(other_branches) > 0:
+        other_events = []
+        for range_start, range_stop in surviving_entry_ranges(mask, entry_start, entry_offsets):
+            range_mask = mask[range_start - entry_start:range_stop - entry_start]
+            other_events.append(read_arrays(tree, other_branches, range_start, range_stop,
+                                            profiler)[range_mask])
+        if len(other_events) == 0:
+            other_events.append(read_arrays(tree, other_branches, entry_start, entry_start))
+        other_events = ak.concatenate(other_events) if len(other_events) > 1 else other_events[0]
+        for field in other_events.fields:
+            fields[field] = other_events[field]
+    tree_fields = tree.keys(recursive=False)
+    field_names = sorted(fields, key=lambda field: (tree_fields.index(field)
+                                                    if field in tree_fields
+                                                    else len(tree_fields)))
+    return ak.zip(collections.OrderedDict((field, fields[field]) for field in field_names),
+                  depth_limit=1)
+
+
+def _read_filtered_events(input_file, tree_name, predicate, predicate_branches, filter_name,
+                          entry_start, entry_stop, profiler=None, uproot_options=None):
+    import uproot
+    entry_offsets = metadata_cache.tree_metadata(input_file, tree_name,
+                                                 uproot_options).entry_offsets
+    with uproot.open(input_file, **_uproot_options(uproot_options)) as root_file:
+        tree = root_file[tree_name]
+        predicate_events = read_arrays(tree, predicate_branches, entry_start, entry_stop,
+                                       profiler)
+        return filter_events(tree, predicate_events, predicate, predicate_branches, filter_name,
+                             entry_start, entry_offsets, profiler)
+
+
+def _read_events(input_files, tree_name, filter_name, entry_start, entry_stop,
+                 predicate, predicate_branches, profiler, uproot_options):
+    import awkward as ak
+    import uproot
+    if predicate is not None:
+        arrays = [_read_filtered_events(input_file, tree_name, predicate, predicate_branches,
+                                        filter_name, file_entry_start, file_entry_stop,
+                                        profiler, uproot_options)
+                  for input_file, file_entry_start, file_entry_stop
+                  in entry_ranges(input_files, tree_name, entry_start, entry_stop,
+                                  uproot_options)]
+        if len(arrays) == 0:
+            return _read_filtered_events(input_files[0], tree_name, predicate,
+                                         predicate_branches, filter_name, 0, 0,
+                                         uproot_options=uproot_options)
+        if len(arrays) == 1:
+            return arrays[0]
+        return ak.concatenate(arrays)
+    if (entry_start is None and entry_stop is None and profiler is None
+            and not _reads_no_branches(filter_name)):
+        return uproot.lazy({input_file: tree_name for input_file in input_files},
+                           **dict(_uproot_options(uproot_options),
+                                  **_filter_options(filter_name)))
+    arrays = []
+    for input_file, file_entry_start, file_entry_stop in entry_ranges(input_files, tree_name,
+                                                                      entry_start, entry_stop,
+                                                                      uproot_options):
+        with uproot.open(input_file, **_uproot_options(uproot_options)) as root_file:
+            arrays.append(read_arrays(root_file[tree_name], filter_name,
+                                      file_entry_start, file_entry_stop, profiler))
+    if len(arrays) == 0:
+        with uproot.open(input_files[0], **_uproot_options(uproot_options)) as root_file:
+            return read_arrays(root_file[tree_name], filter_name, 0, 0)
+    if len(arrays) == 1:
+        return arrays[0]
+    return ak.concatenate(arrays)
+
+
+def read_events(input_files, tree_name, filter_name=None, entry_start=None, entry_stop=None,
+                predicate=None, predicate_branches=None, profiler=None, uproot_options=None):
+    if profiler is None:
+        return _read_events(input_files, tree_name, filter_name, entry_start, entry_stop,
+                            predicate, predicate_branches, profiler, uproot_options)
+    with profiler.stage('read'):
+        return _read_events(input_files, tree_name, filter_name, entry_start, entry_stop,
+                            predicate, predicate_branches, profiler, uproot_options)
+
+
+def _iterate_file_events(input_file, tree_name, step_size, filter_name, entry_start, entry_stop,
+                         predicate, predicate_branches, profiler, uproot_options):
+    import uproot
+    if predicate is not None:
+        entry_offsets = metadata_cache.tree_metadata(input_file, tree_name,
+                                                     uproot_options).entry_offsets
+        iterated_branches = predicate_branches
+    else:
+        iterated_branches = filter_name
+    with uproot.open(input_file, **_uproot_options(uproot_options)) as root_file:
+        tree = root_file[tree_name]
+        if _reads_no_branches(iterated_branches):
+            for chunk_start, chunk_stop in tree_chunk_ranges(tree, step_size, filter_name,
+                                                             entry_start, entry_stop):
+                yield read_arrays(tree, iterated_branches, chunk_start, chunk_stop, profiler)
+            return
+        for events, report in tree.iterate(entry_start=entry_start,
+                                           entry_stop=entry_stop,
+                                           step_size=step_size,
+                                           report=True,
+                                           **_filter_options(iterated_branches)):
+            if profiler is not None:
+                profiler.record_read(tree, iterated_branches,
+                                     report.tree_entry_start, report.tree_entry_stop)
+            if predicate is not None:
+                events = filter_events(tree, events, predicate, predicate_branches,
+                                       filter_name, report.tree_entry_start, entry_offsets,
+                                       profiler)
+            yield events
+
+
+def _iterate_events(input_files, tree_name, step_size, filter_name, entry_start, entry_stop,
+                    predicate, predicate_branches, profiler, uproot_options):
+    import uproot
+    if (entry_start is None and entry_stop is None and predicate is None and profiler is None
+            and not _reads_no_branches(filter_name)):
+        for events in uproot.iterate({input_file: tree_name for input_file in input_files},
+                                     step_size=step_size,
+                                     **dict(_uproot_options(uproot_options),
+                                            **_filter_options(filter_name))):
+            yield events
+        return
+    for input_file, file_entry_start, file_entry_stop in entry_ranges(input_files, tree_name,
+                                                                      entry_start, entry_stop,
+                                                                      uproot_options):
+        for events in _iterate_file_events(input_file, tree_name, step_size, filter_name,
+                                           file_entry_start, file_entry_stop,
+                                           predicate, predicate_branches, profiler,
+                                           uproot_options):
+            yield events
+
+
+def iterate_events(input_files, tree_name, step_size, filter_name=None,
+                   entry_start=None, entry_stop=None, predicate=None, predicate_branches=None,
+                   profiler=None, uproot_options=None):
+    chunks = _iterate_events(input_files, tree_name, step_size, filter_name, entry_start,
+                             entry_stop, predicate, predicate_branches, profiler, uproot_options)
+    while True:
+        if profiler is None:
+            events = next(chunks, None)
+        else:
+            with profiler.stage('read'):
+                events = next(chunks, None)
+        if events is None:
+            return
+        yield events
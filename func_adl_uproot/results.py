@@ -0,0 +1,172 @@
+import collections
+import hashlib
+import io
+import os
+import threading
+
+from .cache import _write_atomically
+from .metadata import file_key
+
+
+ResultCacheInfo = collections.namedtuple('ResultCacheInfo',
+                                         ['hits', 'misses', 'max_bytes', 'currbytes'])
+
+result_file_suffix = '.npz'
+form_buffer_name = '__form__'
+length_buffer_name = '__length__'
+
+default_max_bytes = 2**30
+
+
+def save_array(array):
+    import awkward as ak
+    import numpy as np
+    form, length, container = ak.to_buffers(ak.packed(array))
+    buffers = dict(container)
+    buffers[form_buffer_name] = np.array(form.tojson())
+    buffers[length_buffer_name] = np.array(length)
+    data = io.BytesIO()
+    np.savez(data, **buffers)
+    return data.getvalue()
+
+
+def load_array(path):
+    import awkward as ak
+    import numpy as np
+    with np.load(path) as buffers:
+        container = dict((name, buffers[name]) for name in buffers.files
+                         if name not in (form_buffer_name, length_buffer_name))
+        return ak.from_buffers(str(buffers[form_buffer_name]),
+                               buffers[length_buffer_name].tolist(),
+                               container)
+
+
+class ResultCache(object):
+    def __init__(self, directory, max_bytes=default_max_bytes):
+        if max_bytes is not None and max_bytes < 0:
+            raise ValueError('Cache size must be non-negative, found ' + repr(max_bytes))
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._hits = 0
+        self._misses = 0
+
+    def __getstate__(self):
+        return {'directory': self.directory, 'max_bytes': self.max_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(state['directory'], state['max_bytes'])
+
+    def _path(self, key):
+        digest = hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest + result_file_suffix)
+
+    def _result_files(self):
+        if not os.path.isdir(self.directory):
+            return []
+        result_files = []
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(result_file_suffix):
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                file_stat = os.stat(path)
+            except OSError:
+                continue
+            result_files.append((file_stat.st_mtime, file_stat.st_size, path))
+        return sorted(result_files)
+
+    def info(self):
+        with self._lock:
+            return ResultCacheInfo(self._hits, self._misses, self.max_bytes,
+                                   sum(size for _, size, _ in self._result_files()))
+
+    def clear(self):
+        with self._lock:
+            for _, _, path in self._result_files():
+                os.remove(path)
+            self._hits = 0
+            self._misses = 0
+
+    def _evict(self):
+        if self.max_bytes is None:
+            return
+        result_files = self._result_files()
+        total_bytes = sum(size for _, size, _ in result_files)
+        for _, size, path in result_files:
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total_bytes -= size
+
+    def load(self, key):
+        path = self._path(key)
+        try:
+            array = load_array(path)
+        except (IOError, OSError, KeyError, ValueError):
+            with self._lock:
+                self._misses += 1
+            return False, None
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        with self._lock:
+            self._hits += 1
+        return True, array
+
+    def store(self, key, array):
+        with self._lock:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            _write_atomically(self._path(key), save_array(array))
+            self._evict()
+
+
+def _event_mask(mask):
+    import awkward as ak
+    import numpy as np
+    return np.asarray(ak.to_numpy(ak.fill_none(mask, False)), dtype=bool)
+
+
+class ResultScope(object):
+    def __init__(self, result_cache, input_key):
+        self.result_cache = result_cache
+        self.input_key = input_key
+
+    def call(self, subtree_key, function):
+        if self.result_cache is None:
+            return function()
+        import awkward as ak
+        key = (self.input_key, subtree_key)
+        found, result = self.result_cache.load(key)
+        if found:
+            return result
+        result = function()
+        if isinstance(result, ak.Array):
+            self.result_cache.store(key, result)
+        return result
+
+    def filter(self, subtree_key, source_function, predicate):
+        source = source_function()
+        if self.result_cache is None:
+            return source[_event_mask(predicate(source))]
+        import awkward as ak
+        key = (self.input_key, subtree_key)
+        found, mask = self.result_cache.load(key)
+        if not found:
+            mask = predicate(source)
+            if isinstance(mask, ak.Array):
+                mask = ak.Array(_event_mask(mask))
+                self.result_cache.store(key, mask)
+        return source[_event_mask(mask)]
+
+
+def result_scope(result_cache, input_files, tree_name, entry_start, entry_stop, step_size):
+    if result_cache is None or step_size is not None:
+        return ResultScope(None, None)
+    return ResultScope(result_cache, (tuple(file_key(input_file) for input_file in input_files),
+                                      tree_name, entry_start, entry_stop))
@@ -0,0 +1,184 @@
+import collections
+
+
+class ScalarType(object):
+    def __init__(self, dtype=None):
+        self.dtype = dtype
+
+    def __eq__(self, other):
+        return type(other) is ScalarType and other.dtype == self.dtype
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(repr(self))
+
+    def __repr__(self):
+        return 'ScalarType(' + repr(self.dtype) + ')'
+
+
+class ListType(object):
+    def __init__(self, content):
+        self.content = content
+
+    def __eq__(self, other):
+        return type(other) is ListType and other.content == self.content
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(repr(self))
+
+    def __repr__(self):
+        return 'ListType(' + repr(self.content) + ')'
+
+
+class RecordType(object):
+    def __init__(self, fields):
+        self.fields = collections.OrderedDict(fields)
+
+    def __eq__(self, other):
+        return (type(other) is RecordType
+                and list(other.fields.items()) == list(self.fields.items()))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(repr(self))
+
+    def __repr__(self):
+        return 'RecordType(' + repr(list(self.fields.items())) + ')'
+
+
+static_types = (ScalarType, ListType, RecordType)
+
+
+def parse_type(type_spec):
+    if type_spec is None or isinstance(type_spec, static_types):
+        return type_spec
+    if isinstance(type_spec, dict):
+        return RecordType((name, parse_type(field_type_spec))
+                          for name, field_type_spec in type_spec.items())
+    if not isinstance(type_spec, str):
+        raise TypeError('Unsupported type specification: ' + repr(type_spec))
+    dimensions = [part.strip() for part in type_spec.split('*')]
+    for dimension in dimensions[:-1]:
+        if dimension != 'var' and not dimension.isdigit():
+            raise ValueError('Unsupported type specification: ' + repr(type_spec))
+    static_type = ScalarType(dimensions[-1])
+    for _ in dimensions[:-1]:
+        static_type = ListType(static_type)
+    return static_type
+
+
+def parse_schema(schema):
+    if schema is None:
+        return None
+    return RecordType((name, parse_type(type_spec)) for name, type_spec in schema.items())
+
+
+def form_type(form):
+    import awkward as ak
+    if form.parameters.get('__array__') in ('string', 'bytestring'):
+        return ScalarType('string')
+    if isinstance(form, ak.forms.NumpyForm):
+        static_type = ScalarType(form.primitive)
+        for _ in form.inner_shape:
+            static_type = ListType(static_type)
+        return static_type
+    if isinstance(form, (ak.forms.ListOffsetForm, ak.forms.ListForm, ak.forms.RegularForm)):
+        return ListType(form_type(form.content))
+    if isinstance(form, ak.forms.RecordForm):
+        return RecordType((key, form_type(form.content(key))) for key in form.keys())
+    if isinstance(form, (ak.forms.IndexedForm,
+                         ak.forms.IndexedOptionForm,
+                         ak.forms.ByteMaskedForm,
+                         ak.forms.BitMaskedForm,
+                         ak.forms.UnmaskedForm)):
+        return form_type(form.content)
+    return None
+
+
+def read_schema(path, tree_name, uproot_options=None):
+    import uproot
+    from .metadata import _uproot_options
+    with uproot.open(path, **_uproot_options(uproot_options)) as root_file:
+        events = root_file[tree_name].arrays(entry_start=0, entry_stop=0)
+    return form_type(events.layout.form)
+
+
+def schema_key(schema):
+    if schema is None:
+        return None
+    return repr(schema)
+
+
+def field_type(static_type, field_name):
+    if static_type is None:
+        return None
+    if isinstance(static_type, ListType):
+        content_type = field_type(static_type.content, field_name)
+        return ListType(content_type) if content_type is not None else None
+    if not isinstance(static_type, RecordType):
+        raise TypeError('Cannot access field ' + repr(field_name) + ' of non-record type '
+                        + repr(static_type))
+    if field_name not in static_type.fields:
+        raise NameError('Unknown field: ' + repr(field_name) + ', expected one of '
+                        + repr(list(static_type.fields.keys())))
+    return static_type.fields[field_name]
+
+
+def select_fields(static_type, field_names):
+    if isinstance(static_type, ListType):
+        return ListType(select_fields(static_type.content, field_names))
+    return RecordType((field_name, static_type.fields[field_name]) for field_name in field_names)
+
+
+def record_fields(static_type):
+    while isinstance(static_type, ListType):
+        static_type = static_type.content
+    if not isinstance(static_type, RecordType):
+        return None
+    return list(static_type.fields.keys())
+
+
+def content_type(static_type, operation):
+    if static_type is None:
+        return None
+    if not isinstance(static_type, ListType):
+        raise TypeError(operation + '() requires a sequence, found ' + repr(static_type))
+    return static_type.content
+
+
+def broadcast_type(static_types, operation):
+    if any(static_type is None for static_type in static_types) or len(static_types) == 0:
+        return None
+    result = None
+    for static_type in static_types:
+        inner_type = static_type
+        while isinstance(inner_type, ListType):
+            inner_type = inner_type.content
+        if isinstance(inner_type, RecordType):
+            raise TypeError('Cannot apply ' + operation + ' to record type ' + repr(static_type))
+        if inner_type is None:
+            return None
+        if result is None or _list_depth(static_type) > _list_depth(result):
+            result = static_type
+    return _with_content(result, ScalarType())
+
+
+def _list_depth(static_type):
+    depth = 0
+    while isinstance(static_type, ListType):
+        static_type = static_type.content
+        depth += 1
+    return depth
+
+
+def _with_content(static_type, scalar_type):
+    if isinstance(static_type, ListType):
+        return ListType(_with_content(static_type.content, scalar_type))
+    return scalar_type
@@ -1,13 +1,33 @@
 import ast
+import hashlib
 import sys
 if sys.version_info[0] < 3:
     from urlparse import urlparse
 else:
     from urllib.parse import urlparse
 
+import qastle
+
+from .branches import is_event_dataset, lambda_argument_names
+from .kernels import kernel_source
+from .linq import Histogram, Skip, Take, linq_node_types
+from .schema import (ListType, RecordType, ScalarType, broadcast_type, content_type, field_type,
+                     record_fields, select_fields)
+
 
 input_filenames_argument_name = 'input_filenames'
 tree_name_argument_name = 'tree_name'
+step_size_argument_name = 'step_size'
+entry_start_argument_name = 'entry_start'
+entry_stop_argument_name = 'entry_stop'
+uproot_options_argument_name = 'uproot_options'
+shared_events_argument_name = 'shared_events'
+profiler_argument_name = 'profiler'
+result_cache_argument_name = 'result_cache'
+result_scope_name = 'result_scope'
+
+local_url_schemes = ('', 'file')
+events_name = 'events'
 
 unary_op_dict = {ast.UAdd: '+',
                  ast.USub: '-',
@@ -40,17 +60,270 @@ compare_op_dict = {ast.Eq: '==',
                    ast.In: 'in',
                    ast.NotIn: 'not in'}
 
+reduction_func_dict = {'add': 'ak.sum',
+                       'multiply': 'ak.prod',
+                       'minimum': 'ak.min',
+                       'maximum': 'ak.max'}
+
+aggregate_bin_op_dict = {ast.Add: 'add',
+                         ast.Mult: 'multiply'}
+
+aggregate_call_dict = {'min': 'minimum',
+                       'max': 'maximum'}
+
+profiled_node_types = ('Select',
+                       'SelectMany',
+                       'Zip',
+                       'Count',
+                       'Sum',
+                       'Min',
+                       'Max',
+                       'Aggregate',
+                       'Take',
+                       'Skip',
+                       'First',
+                       'Histogram',
+                       'OrderBy',
+                       'OrderByDescending')
+
+ordering_node_types = ('OrderBy',
+                       'OrderByDescending')
+
+
+backends = ('awkward',
+            'numba')
+
+cached_node_types = ('Select',
+                     'SelectMany')
+
+
+deferred_node_types = ((ast.expr,) + linq_node_types(('Where',
+                                                      'Select',
+                                                      'SelectMany',
+                                                      'First',
+                                                      'Last',
+                                                      'ElementAt',
+                                                      'Contains',
+                                                      'Aggregate',
+                                                      'Count',
+                                                      'Max',
+                                                      'Min',
+                                                      'Sum',
+                                                      'All',
+                                                      'Any',
+                                                      'Concat',
+                                                      'Zip',
+                                                      'OrderBy',
+                                                      'OrderByDescending',
+                                                      'Choose'))
+                       + (Take, Skip, Histogram))
+
+
+def url_path(url):
+    parsed_url = urlparse(url)
+    if len(parsed_url.scheme) > 1 and parsed_url.scheme not in local_url_schemes:
+        return url
+    return ''.join(parsed_url[1:])
+
+
+def event_dataset_paths(node):
+    if len(node.args) < 1:
+        return None
+    if hasattr(node.args[0], 'elts'):
+        urls = node.args[0].elts
+    else:
+        urls = [node.args[0]]
+    return [url_path(ast.literal_eval(url))
+            for url in urls if ast.literal_eval(url) is not None]
+
+
+def derives_from_event_dataset(node):
+    while not is_event_dataset(node):
+        if not hasattr(node, 'source'):
+            return False
+        node = node.source
+    return True
+
+
+def event_aligned_dataset(node):
+    while not is_event_dataset(node):
+        if type(node).__name__ not in ('Select', 'Zip', 'Take', 'Skip'):
+            return None
+        node = node.source
+    return node
+
+
+def literal_count(node):
+    try:
+        return ast.literal_eval(node)
+    except ValueError:
+        return None
+
+
+def is_literal(node):
+    try:
+        ast.literal_eval(node)
+    except ValueError:
+        return False
+    return True
+
+
+def take_entry_range(entry_range, count):
+    entry_start, entry_stop = entry_range
+    new_entry_stop = entry_start + max(count, 0)
+    if entry_stop is not None:
+        new_entry_stop = min(entry_stop, new_entry_stop)
+    return entry_start, new_entry_stop
+
+
+def skip_entry_range(entry_range, count):
+    entry_start, entry_stop = entry_range
+    new_entry_start = entry_start + max(count, 0)
+    if entry_stop is not None:
+        new_entry_start = min(entry_stop, new_entry_start)
+    return new_entry_start, entry_stop
+
+
+def aggregate_operation(func):
+    if type(func) is not ast.Lambda:
+        raise TypeError('Second argument to Aggregate() must be a lambda function, found '
+                        + str(func))
+    if len(func.args.args) != 2:
+        raise TypeError('Lambda function in Aggregate() must have exactly two arguments, found '
+                        + str(len(func.args.args)))
+    body = func.body
+    if isinstance(body, ast.BinOp) and type(body.op) in aggregate_bin_op_dict:
+        operation = aggregate_bin_op_dict[type(body.op)]
+        operands = [body.left, body.right]
+    elif (isinstance(body, ast.Call)
+          and isinstance(body.func, ast.Name)
+          and body.func.id in aggregate_call_dict
+          and len(body.args) == 2):
+        operation = aggregate_call_dict[body.func.id]
+        operands = body.args
+    else:
+        raise NotImplementedError('Aggregate() only supports addition, multiplication, min, and'
+                                  + ' max of the accumulator and the element')
+    if (not all(isinstance(operand, ast.Name) for operand in operands)
+            or sorted(operand.id for operand in operands)
+            != sorted(lambda_argument_names(func))):
+        raise NotImplementedError('Aggregate() lambda must combine the accumulator and the'
+                                  + ' element directly')
+    return operation
+
+
+def balanced_reduction_rep(func, reps):
+    if len(reps) == 1:
+        return reps[0]
+    middle = len(reps) // 2
+    return (func + '(' + balanced_reduction_rep(func, reps[:middle]) + ', '
+            + balanced_reduction_rep(func, reps[middle:]) + ')')
+
+
+def ordered_projection(node):
+    take = None
+    while type(node).__name__ not in ordering_node_types:
+        if type(node).__name__ == 'Take' and take is None:
+            take = node
+        elif type(node).__name__ != 'Select':
+            return None
+        node = node.source
+    return node, take
+
+
+def top_level_reduction(node):
+    node_type = type(node).__name__
+    projection = ordered_projection(node)
+    if node_type in ('Count', 'Sum'):
+        return 'add', 0
+    elif node_type == 'Histogram':
+        return 'add', None
+    elif projection is not None:
+        ordering, take = projection
+        ascending = type(ordering).__name__ == 'OrderBy'
+        if take is None:
+            return ('top_k', None, ascending), None
+        count = literal_count(take.count)
+        if not isinstance(count, int) or isinstance(count, bool):
+            return None
+        return ('top_k', count, ascending), None
+    elif node_type == 'Min':
+        return 'minimum', None
+    elif node_type == 'Max':
+        return 'maximum', None
+    elif node_type == 'Aggregate':
+        return aggregate_operation(node.func), ast.literal_eval(node.seed)
+    else:
+        return None
+
 
 class PythonSourceGeneratorTransformer(ast.NodeTransformer):
-    def __init__(self):
+    def __init__(self, schema=None, profile=False, cache_results=False, backend='awkward',
+                 rep_templates=None):
+        if backend not in backends:
+            raise ValueError('Unknown backend: ' + repr(backend) + ', expected one of '
+                             + repr(backends))
+        self._backend = backend
+        self._rep_templates = rep_templates
+        self._in_kernel = False
         self._depth = None
+        self._schema = schema
+        self._profile = profile
+        self._cache_results = cache_results
+        self._node_count = 0
         self._id_scopes = {}
+        self._array_id_scopes = {}
+        self._type_id_scopes = {}
 
     def visit(self, node):
         if hasattr(node, 'rep'):
             return node
-        else:
-            return super(PythonSourceGeneratorTransformer, self).visit(node)
+        subtree_key = None
+        if type(node).__name__ in cached_node_types:
+            subtree_key = self.result_key(node)
+        kernel = None
+        if self._backend == 'numba' and not self._in_kernel:
+            kernel = kernel_source(node)
+        if kernel is not None:
+            self._in_kernel = True
+            try:
+                node = super(PythonSourceGeneratorTransformer, self).visit(node)
+            finally:
+                self._in_kernel = False
+            source, leaves = kernel
+            node.rep = ('load_kernel(' + repr(source) + ')('
+                        + ', '.join(self.get_rep(leaf) for leaf in leaves) + ')')
+            return self.defer_rep(node)
+        node = super(PythonSourceGeneratorTransformer, self).visit(node)
+        if subtree_key is not None:
+            node.rep = (result_scope_name + '.call(' + repr(subtree_key) + ', (lambda: '
+                        + node.rep + '))')
+        if self._profile and type(node).__name__ in profiled_node_types:
+            node_id = self.next_node_id()
+            node.rep = self.profiled_rep(node_id, type(node).__name__, node.rep)
+            if hasattr(node, 'partial_rep'):
+                node.partial_rep = self.profiled_rep(node_id, type(node).__name__,
+                                                     node.partial_rep)
+        return self.defer_rep(node)
+
+    def defer_rep(self, node):
+        if (self._rep_templates is not None and hasattr(node, 'rep')
+                and isinstance(node, deferred_node_types)):
+            node.rep = self._rep_templates.defer(node.rep)
+        return node
+
+    def next_node_id(self):
+        self._node_count += 1
+        return self._node_count
+
+    def result_key(self, node):
+        if not self._cache_results or self._depth != 0 or not derives_from_event_dataset(node):
+            return None
+        return hashlib.sha256(ast.dump(node).encode('utf-8')).hexdigest()
+
+    def profiled_rep(self, node_id, operator, rep):
+        return (profiler_argument_name + '.call(' + repr(node_id) + ', ' + repr(operator) + ', '
+                + repr(self._depth) + ', (lambda: ' + rep + '))')
 
     def generic_visit(self, node):
         if hasattr(node, 'rep'):
@@ -58,6 +331,55 @@ class PythonSourceGeneratorTransformer(ast.NodeTransformer):
         else:
             return super(PythonSourceGeneratorTransformer, self).generic_visit(node)
 
+    def is_array(self, node):
+        if getattr(node, 'static_type', None) is not None:
+            return True
+        if is_event_dataset(node):
+            return True
+        if isinstance(node, ast.Name):
+            return self._array_id_scopes.get(node.id, [False])[-1]
+        if isinstance(node, ast.Attribute):
+            return self.is_array(node.value)
+        if isinstance(node, ast.Call) and getattr(node.func, 'is_binding', False):
+            return getattr(node.func, 'body_is_array', False)
+        if isinstance(node, ast.Subscript) and isinstance(literal_count(node.slice), str):
+            return self.is_array(node.value)
+        node_type = type(node).__name__
+        if node_type in ('Select', 'SelectMany', 'Where', 'Take', 'Skip') + ordering_node_types:
+            return self.is_array(node.source)
+        return node_type == 'Zip'
+
+    def static_type(self, node):
+        return getattr(node, 'static_type', None)
+
+    def operation_type(self, node, operands, operation):
+        operands = [operand for operand in operands if literal_count(operand) is None]
+        if len(operands) > 0:
+            node.static_type = broadcast_type([self.static_type(operand)
+                                               for operand in operands], operation)
+
+    def container_type(self, node):
+        if isinstance(node, (ast.List, ast.Tuple)):
+            field_names = [str(index) for index in range(len(node.elts))]
+            field_nodes = node.elts
+        elif isinstance(node, ast.Dict):
+            field_names = [literal_count(key) for key in node.keys]
+            field_nodes = node.values
+            if not all(isinstance(field_name, str) for field_name in field_names):
+                return None
+        else:
+            return None
+        field_types = [ScalarType() if literal_count(field_node) is not None
+                       else self.static_type(field_node) for field_node in field_nodes]
+        if any(field_type is None for field_type in field_types):
+            return None
+        return RecordType(zip(field_names, field_types))
+
+    def element_type(self, node, operation):
+        if self._depth == 0:
+            return self.static_type(node)
+        return content_type(self.static_type(node), operation)
+
     def get_rep(self, node):
         if node is None:
             return ''
@@ -121,6 +443,7 @@ class PythonSourceGeneratorTransformer(ast.NodeTransformer):
             node.rep = node.id
         else:
             node.rep = self.resolve_id(node.id)
+            node.static_type = self._type_id_scopes.get(node.id, [None])[-1]
         return node
 
     def visit_NameConstant(self, node):
@@ -130,12 +453,14 @@ class PythonSourceGeneratorTransformer(ast.NodeTransformer):
     def visit_UnaryOp(self, node):
         if type(node.op) is ast.Not:
             node.rep = 'np.logical_not(' + self.get_rep(node.operand) + ')'
+            self.operation_type(node, [node.operand], 'not')
             return node
         if type(node.op) not in unary_op_dict:
             raise SyntaxError('Unimplemented unary operation: ' + node.op)
         operator_rep = unary_op_dict[type(node.op)]
         operand_rep = self.get_rep(node.operand)
         node.rep = '(' + operator_rep + operand_rep + ')'
+        self.operation_type(node, [node.operand], operator_rep)
         return node
 
     def visit_BinOp(self, node):
@@ -145,15 +470,16 @@ class PythonSourceGeneratorTransformer(ast.NodeTransformer):
         operator_rep = bin_op_dict[type(node.op)]
         right_rep = self.get_rep(node.right)
         node.rep = '(' + left_rep + ' ' + operator_rep + ' ' + right_rep + ')'
+        self.operation_type(node, [node.left, node.right], operator_rep)
         return node
 
     def visit_BoolOp(self, node):
         if type(node.op) not in bool_op_dict:
             raise SyntaxError('Unimplemented boolean operation: ' + node.op)
         bool_op_func = bool_op_dict[type(node.op)]
-        node.rep = (bool_op_func + '('
-                    + ', '.join([self.get_rep(value) for value in node.values])
-                    + ')')
+        node.rep = balanced_reduction_rep(bool_op_func,
+                                          [self.get_rep(value) for value in node.values])
+        self.operation_type(node, node.values, bool_op_func)
         return node
 
     def visit_Compare(self, node):
@@ -166,17 +492,24 @@ class PythonSourceGeneratorTransformer(ast.NodeTransformer):
             comparator_rep = self.get_rep(comparator)
             node.rep += ' ' + operator_rep + ' ' + comparator_rep
         node.rep += ')'
+        self.operation_type(node, [node.left] + node.comparators, 'comparison')
         return node
 
     def visit_IfExp(self, node):
         body_rep = self.get_rep(node.body)
         test_rep = self.get_rep(node.test)
         orelse_rep = self.get_rep(node.orelse)
-        node.rep = '(' + body_rep + ' if ' + test_rep + ' else ' + orelse_rep + ')'
+        if is_literal(node.test):
+            node.rep = '(' + body_rep + ' if ' + test_rep + ' else ' + orelse_rep + ')'
+        else:
+            node.rep = 'np.where(' + test_rep + ', ' + body_rep + ', ' + orelse_rep + ')'
+        if self.static_type(node.body) == self.static_type(node.orelse):
+            node.static_type = self.static_type(node.body)
         return node
 
     def visit_Index(self, node):
         node.rep = self.get_rep(node.value)
+        node.static_type = self.static_type(node.value)
         return node
 
     def visit_Slice(self, node):
@@ -197,53 +530,107 @@ class PythonSourceGeneratorTransformer(ast.NodeTransformer):
         slice_rep = self.get_rep(node.slice)
         if hasattr(node, 'short_circuit') and node.short_circuit is True:
             node.rep = value_rep + '[' + slice_rep + ']'
+            node.static_type = self.static_type(node.value)
+            return node
+        if (isinstance(node.slice, ast.Tuple)
+                or ((sys.version_info[0] < 3
+                     or (sys.version_info[0] == 3 and sys.version_info[1] < 9))
+                    and isinstance(node.slice, ast.ExtSlice))):
+            raise NotImplementedError('Multidimensional slices are not supported')
+        if ((sys.version_info[0] < 3
+             or (sys.version_info[0] == 3
+                 and sys.version_info[1] < 9)) and isinstance(node.slice, ast.Index)):
+            slice_value = node.slice.value
         else:
-            if isinstance(node.slice, ast.Slice):
-                node.rep = ('(' + value_rep + '[' + value_rep + '.fields[' + slice_rep + ']]'
-                            + ' if isinstance(' + value_rep + ', ak.Array)'
-                            + ' else ' + value_rep + '[' + slice_rep + '])')
-            elif (isinstance(node.slice, ast.Tuple)
-                  or ((sys.version_info[0] < 3
-                       or (sys.version_info[0] == 3 and sys.version_info[1] < 9))
-                      and isinstance(node.slice, ast.ExtSlice))):
-                raise NotImplementedError('Multidimensional slices are not supported')
-            else:
-                if ((sys.version_info[0] < 3
-                     or (sys.version_info[0] == 3
-                         and sys.version_info[1] < 9)) and isinstance(node.slice, ast.Index)):
-                    slice_value = node.slice.value
-                else:
-                    slice_value = node.slice
-                try:
-                    slice_eval = ast.literal_eval(slice_value)
-                    if isinstance(slice_eval, int):
-                        node.rep = ('(' + value_rep + '[' + value_rep + '.fields[' + slice_rep
-                                    + ']]' + ' if isinstance(' + value_rep + ', ak.Array)'
-                                    + ' else ' + value_rep + '[' + slice_rep + '])')
-                    else:
-                        node.rep = value_rep + '[' + slice_rep + ']'
-                except ValueError:
-                    node.rep = ('(' + value_rep + '[' + value_rep + '.fields[' + slice_rep + ']]'
-                                + ' if isinstance(' + value_rep + ', ak.Array)'
-                                + ' and (isinstance(' + slice_rep + ', int)'
-                                + ' or isinstance(' + slice_rep + ', slice))'
-                                + ' else ' + value_rep + '[' + slice_rep + '])')
+            slice_value = node.slice
+        static_fields = record_fields(self.static_type(node.value))
+        if static_fields is None and self.static_type(node.value) is not None:
+            slice_eval = literal_count(slice_value)
+            if isinstance(slice_value, ast.Slice) or isinstance(slice_eval, int):
+                raise TypeError('Cannot take fields by position from non-record type '
+                                + repr(self.static_type(node.value)))
+        if isinstance(slice_value, ast.Slice):
+            slice_parts = [slice_value.lower, slice_value.upper, slice_value.step]
+            dynamic_slice = False
+            simple_slice = all(part is None
+                               or isinstance(part, ast.Name)
+                               or literal_count(part) is not None for part in slice_parts)
+            index_rep = ('slice(' + ', '.join(self.get_rep(part) or 'None'
+                                              for part in slice_parts) + ')')
+            slice_evals = [literal_count(part) for part in slice_parts]
+            if static_fields is not None and all(part is None or isinstance(slice_eval, int)
+                                                 for part, slice_eval in zip(slice_parts,
+                                                                             slice_evals)):
+                selected_fields = static_fields[slice(*slice_evals)]
+                node.rep = value_rep + '[' + repr(selected_fields) + ']'
+                node.static_type = select_fields(self.static_type(node.value), selected_fields)
+                return node
+        else:
+            try:
+                slice_eval = ast.literal_eval(slice_value)
+                if isinstance(slice_eval, str):
+                    node.static_type = field_type(self.static_type(node.value), slice_eval)
+                if not isinstance(slice_eval, int):
+                    node.rep = value_rep + '[' + slice_rep + ']'
+                    return node
+                if static_fields is not None:
+                    if not -len(static_fields) <= slice_eval < len(static_fields):
+                        raise IndexError('Field index ' + repr(slice_eval)
+                                         + ' out of range for fields ' + repr(static_fields))
+                    node.rep = value_rep + '[' + repr(static_fields[slice_eval]) + ']'
+                    node.static_type = field_type(self.static_type(node.value),
+                                                  static_fields[slice_eval])
+                    return node
+                dynamic_slice = False
+                simple_slice = True
+            except ValueError:
+                dynamic_slice = True
+                simple_slice = isinstance(slice_value, ast.Name)
+            index_rep = slice_rep
+        if isinstance(node.value, (ast.List, ast.Tuple, ast.Dict)):
+            node.rep = value_rep + '[' + slice_rep + ']'
+            return node
+        bind_operands = not (isinstance(node.value, ast.Name) and simple_slice)
+        if bind_operands:
+            value_rep, slice_rep = 'value', 'index'
+        conditions = []
+        if not self.is_array(node.value):
+            conditions.append('isinstance(' + value_rep + ', ak.Array)')
+        if dynamic_slice:
+            conditions.append('(isinstance(' + slice_rep + ', int)'
+                              + ' or isinstance(' + slice_rep + ', slice))')
+        node.rep = value_rep + '[' + value_rep + '.fields[' + slice_rep + ']]'
+        if len(conditions) > 0:
+            node.rep = ('(' + node.rep + ' if ' + ' and '.join(conditions)
+                        + ' else ' + value_rep + '[' + slice_rep + '])')
+        if bind_operands:
+            node.rep = ('(lambda value, index: ' + node.rep + ')('
+                        + self.get_rep(node.value) + ', ' + index_rep + ')')
         return node
 
     def visit_Attribute(self, node):
         value_rep = self.get_rep(node.value)
         node.rep = value_rep + '[' + repr(node.attr) + ']'
+        node.static_type = field_type(self.static_type(node.value), node.attr)
         return node
 
     def visit_Lambda(self, node):
         arg_strs = [self.get_rep(arg_node) for arg_node in node.args.args]
         args_rep = ', '.join(arg_strs)
+        argument_types = getattr(node, 'argument_types', [None] * len(arg_strs))
+        for arg_str, argument_type in zip(arg_strs, argument_types):
+            self._type_id_scopes.setdefault(arg_str, []).append(argument_type)
         for arg_str in arg_strs:
             if arg_str in self._id_scopes:
                 self._id_scopes[arg_str] += 1
             else:
                 self._id_scopes[arg_str] = 1
+            self._array_id_scopes.setdefault(arg_str, []).append(getattr(node,
+                                                                         'array_arguments',
+                                                                         False))
         body_rep = self.get_rep(node.body)
+        node.body_is_array = self.is_array(node.body)
+        node.body_type = self.static_type(node.body)
         node.rep = '(lambda'
         if args_rep != '':
             node.rep += ' '
@@ -252,58 +639,70 @@ class PythonSourceGeneratorTransformer(ast.NodeTransformer):
             self._id_scopes[arg_str] -= 1
             if self._id_scopes[arg_str] == 0:
                 del self._id_scopes[arg_str]
+            self._array_id_scopes[arg_str].pop()
+            if len(self._array_id_scopes[arg_str]) == 0:
+                del self._array_id_scopes[arg_str]
+            self._type_id_scopes[arg_str].pop()
+            if len(self._type_id_scopes[arg_str]) == 0:
+                del self._type_id_scopes[arg_str]
         return node
 
     def visit_arg(self, node):
         node.rep = node.arg
         return node
 
+    def visit_EventDataset(self, node):
+        if len(node.args) > 2:
+            raise TypeError('EventDataset() should have no more than two arguments, found '
+                            + str(len(node.args)))
+        self._depth = 0
+        paths = event_dataset_paths(node)
+        if paths is not None:
+            source_rep = (input_filenames_argument_name + ' '
+                          + 'if ' + input_filenames_argument_name + ' is not None '
+                          + 'else ' + repr(paths))
+        else:
+            source_rep = input_filenames_argument_name
+        node.input_files_rep = ('(lambda source: [source] if isinstance(source, str) else source)('
+                                + source_rep + ')')
+        if len(node.args) >= 2:
+            local_tree_name_rep = self.get_rep(node.args[1])
+        else:
+            local_tree_name_rep = ('find_tree_name(input_files[0], '
+                                   + uproot_options_argument_name + ')')
+        node.tree_name_rep = (tree_name_argument_name + ' '
+                              + 'if ' + tree_name_argument_name + ' is not None '
+                              + 'else ' + local_tree_name_rep)
+        node.source_rep = '{input_file: tree_name_to_use for input_file in input_files}'
+        node.static_type = self._schema
+        if getattr(node, 'branches', None):
+            node.source_rep += ', filter_name=' + repr(node.branches)
+        node.rep = ('(lambda input_files: (lambda tree_name_to_use: '
+                    + "(logging.getLogger(__name__).info('Using treename='"
+                    + ' + repr(tree_name_to_use)),'
+                    + ' uproot.lazy(' + node.source_rep + '))[1])'
+                    + '(' + node.tree_name_rep + '))'
+                    + '(' + node.input_files_rep + ')')
+        return node
+
     def visit_Call(self, node):
         if isinstance(node.func, ast.Name) and node.func.id == 'EventDataset':
-            if len(node.args) > 2:
-                raise TypeError('EventDataset() should have no more than two arguments, found '
-                                + str(len(node.args)))
-            self._depth = 0
-            if len(node.args) >= 1:
-                if hasattr(node.args[0], 'elts'):
-                    urls = node.args[0].elts
-                else:
-                    urls = [node.args[0]]
-                paths = [''.join(urlparse(ast.literal_eval(url))[1:])
-                         for url in urls if ast.literal_eval(url) is not None]
-                source_rep = (input_filenames_argument_name + ' '
-                              + 'if ' + input_filenames_argument_name + ' is not None '
-                              + 'else ' + repr(paths))
-            else:
-                source_rep = input_filenames_argument_name
-            source_rep = ('(lambda source: [source] if isinstance(source, str) else source)('
-                          + source_rep + ')')
-            if len(node.args) >= 2:
-                local_tree_name_rep = self.get_rep(node.args[1])
-            else:
-                local_tree_name_rep = ('(lambda key_array: '
-                                       + "key_array[key_array[:, 1] == 'TTree'][:, 0])("
-                                       + 'np.atleast_2d((lambda classnames:'
-                                       + ' np.hstack([list(classnames.keys()),'
-                                       + ' list(classnames.values())]))'
-                                       + '(uproot.open(' + source_rep + '[0]).classnames())'
-                                       + '))[0]')
-            tree_name_rep = (tree_name_argument_name + ' '
-                             + 'if ' + tree_name_argument_name + ' is not None '
-                             + 'else ' + local_tree_name_rep)
-            node.rep = ('(lambda input_files, tree_name_to_use: '
-                        + "(logging.getLogger(__name__).info('Using treename='"
-                        + ' + repr(tree_name_to_use)),'
-                        + ' uproot.lazy({input_file: tree_name_to_use'
-                        + ' for input_file in input_files}))[1])'
-                        + '(' + source_rep + ', ' + tree_name_rep + ')')
-        else:
-            func_rep = self.get_rep(node.func)
-            args_rep = ', '.join(self.get_rep(arg) for arg in node.args)
-            node.rep = func_rep + '(' + args_rep + ')'
+            return self.visit_EventDataset(node)
+        if isinstance(node.func, ast.Lambda) and not hasattr(node.func, 'argument_types'):
+            for arg in node.args:
+                self.visit(arg)
+            node.func.argument_types = [self.static_type(arg) for arg in node.args]
+            node.func.array_arguments = all(self.is_array(arg) for arg in node.args)
+        func_rep = self.get_rep(node.func)
+        args_rep = ', '.join(self.get_rep(arg) for arg in node.args)
+        node.rep = func_rep + '(' + args_rep + ')'
+        if isinstance(node.func, ast.Lambda):
+            node.static_type = getattr(node.func, 'body_type', None)
         return node
 
     def visit_Select(self, node):
+        if type(node).__name__ == 'Select' and self.visit_ordered_projection(node) is not None:
+            return node
         if type(node.selector) is not ast.Lambda:
             raise TypeError('Argument to Select() must be a lambda function, found '
                             + node.selector)
@@ -311,12 +710,31 @@ class PythonSourceGeneratorTransformer(ast.NodeTransformer):
             raise TypeError('Lambda function in Select() must have exactly one argument, found '
                             + len(node.selector.args.args))
         self.visit(node.source)
+        node.selector.argument_types = [self.element_type(node.source, type(node).__name__)]
         self._depth += 1
+        node.selector.array_arguments = self.is_array(node.source)
         call_node = ast.Call(func=node.selector, args=[node.source])
-        node.rep = ('(lambda selection: ak.zip(selection, depth_limit=' + repr(self._depth) + ')'
-                    + ' if not isinstance(selection, ak.Array)'
-                    + ' else selection)(' + self.get_rep(call_node) + ')')
+        call_rep = self.get_rep(call_node)
+        selection = node.selector.body
+        while isinstance(selection, ast.Call) and getattr(selection.func, 'is_binding', False):
+            selection = selection.func.body
+        if isinstance(selection, (ast.List, ast.Tuple, ast.Dict)):
+            node.rep = 'ak.zip(' + call_rep + ', depth_limit=' + repr(self._depth) + ')'
+            selection_type = self.container_type(selection)
+        elif node.selector.body_is_array:
+            node.rep = call_rep
+            selection_type = node.selector.body_type
+        else:
+            node.rep = ('(lambda selection: ak.zip(selection, depth_limit='
+                        + repr(self._depth) + ')'
+                        + ' if not isinstance(selection, ak.Array)'
+                        + ' else selection)(' + call_rep + ')')
+            selection_type = None
         self._depth -= 1
+        if self._depth == 0 or selection_type is None:
+            node.static_type = selection_type
+        else:
+            node.static_type = ListType(selection_type)
         return node
 
     def visit_SelectMany(self, node):
@@ -328,6 +746,10 @@ class PythonSourceGeneratorTransformer(ast.NodeTransformer):
                             'found ' + len(node.selector.args.args))
         self.visit_Select(node)
         node.rep = 'ak.flatten(' + node.rep + ')'
+        if self._depth == 0:
+            node.static_type = content_type(node.static_type, 'SelectMany')
+        elif node.static_type is not None:
+            node.static_type = ListType(content_type(node.static_type.content, 'SelectMany'))
         return node
 
     def visit_Where(self, node):
@@ -337,21 +759,51 @@ class PythonSourceGeneratorTransformer(ast.NodeTransformer):
         if len(node.predicate.args.args) != 1:
             raise TypeError('Lambda function in Where() must have exactly one argument, found '
                             + len(node.predicate.args.args))
+        subtree_key = self.result_key(node)
         self.visit(node.source)
+        node.predicate.argument_types = [self.element_type(node.source, 'Where')]
+        node.predicate.array_arguments = self.is_array(node.source)
         self._depth += 1
-        if sys.version_info[0] < 3:
-            subscriptable = node.predicate.args.args[0].id
+        predicate_body = node.predicate.body
+        if hasattr(node, 'predicate_branches'):
+            node.predicate_rep = self.get_rep(node.predicate)
+            if self._profile:
+                node.predicate_rep = (profiler_argument_name + '.predicate('
+                                      + repr(self.next_node_id()) + ', '
+                                      + repr(self._depth - 1) + ', '
+                                      + node.predicate_rep + ')')
+            node.rep = self.get_rep(node.source)
+        elif subtree_key is not None:
+            predicate_rep = self.get_rep(node.predicate)
+            if self._profile:
+                predicate_rep = (profiler_argument_name + '.predicate('
+                                 + repr(self.next_node_id()) + ', '
+                                 + repr(self._depth - 1) + ', '
+                                 + predicate_rep + ')')
+            node.rep = (result_scope_name + '.filter(' + repr(subtree_key) + ', (lambda: '
+                        + self.get_rep(node.source) + '), ' + predicate_rep + ')')
         else:
-            subscriptable = node.predicate.args.args[0].arg
-        if sys.version_info[0] < 3 or (sys.version_info[0] == 3 and sys.version_info[1] < 9):
-            slice_node = ast.Index(node.predicate.body)
-        else:
-            slice_node = node.predicate.body
-        node.predicate.body = ast.Subscript(value=ast.Name(id=subscriptable),
-                                            slice=slice_node,
-                                            short_circuit=True)
-        call_node = ast.Call(func=node.predicate, args=[node.source])
-        node.rep = self.get_rep(call_node)
+            if sys.version_info[0] < 3:
+                subscriptable = node.predicate.args.args[0].id
+            else:
+                subscriptable = node.predicate.args.args[0].arg
+            if sys.version_info[0] < 3 or (sys.version_info[0] == 3 and sys.version_info[1] < 9):
+                predicate_body = ast.Index(node.predicate.body)
+            node.predicate.body = ast.Subscript(value=ast.Name(id=subscriptable),
+                                                slice=predicate_body,
+                                                short_circuit=True)
+            call_node = ast.Call(func=node.predicate, args=[node.source])
+            node.rep = self.get_rep(call_node)
+            if self._profile:
+                node.rep = (profiler_argument_name + '.filter(' + repr(self.next_node_id()) + ', '
+                            + repr(self._depth - 1) + ', '
+                            + self.get_rep(node.source) + ', '
+                            + self.get_rep(node.predicate) + ')')
+        predicate_type = self.static_type(predicate_body)
+        if predicate_type is not None and not isinstance(predicate_type, ScalarType):
+            raise TypeError('Predicate in Where() must be a boolean for each element, found '
+                            + repr(predicate_type))
+        node.static_type = self.static_type(node.source)
         self._depth -= 1
         return node
 
@@ -359,4 +811,216 @@ class PythonSourceGeneratorTransformer(ast.NodeTransformer):
         self.visit(node.source)
         node.rep = ('ak.zip(' + self.get_rep(node.source)
                     + ', depth_limit=' + repr(self._depth + 1) + ')')
+        node.static_type = self.container_type(node.source)
+        return node
+
+    def reduction_type(self, node):
+        operation = type(node).__name__
+        if self._depth == 0:
+            source_type = self.static_type(node.source)
+        else:
+            source_type = content_type(self.static_type(node.source), operation)
+        if isinstance(source_type, RecordType):
+            raise TypeError(operation + '() cannot reduce record type ' + repr(source_type))
+        if self._depth is not None and self._depth > 0 and isinstance(source_type, ScalarType):
+            return ScalarType()
+        return None
+
+    def visit_reduction(self, node, reduction_func_rep):
+        self.visit(node.source)
+        axis = self._depth if self._depth != 0 else None
+        node.rep = (reduction_func_rep + '(' + self.get_rep(node.source)
+                    + ', axis=' + repr(axis) + ')')
+        node.static_type = self.reduction_type(node)
+        if self._depth == 0:
+            node.partial_rep = node.rep
+        return node
+
+    def visit_Count(self, node):
+        if self._depth is None or self._depth == 0:
+            self.visit(node.source)
+            node.rep = 'len(' + self.get_rep(node.source) + ')'
+            if self._depth == 0:
+                node.partial_rep = node.rep
+            return node
+        self.visit_reduction(node, 'ak.num')
+        if content_type(self.static_type(node.source), 'Count') is not None:
+            node.static_type = ScalarType('int64')
+        else:
+            node.static_type = None
+        return node
+
+    def visit_Sum(self, node):
+        return self.visit_reduction(node, 'ak.sum')
+
+    def visit_Min(self, node):
+        return self.visit_reduction(node, 'ak.min')
+
+    def visit_Max(self, node):
+        return self.visit_reduction(node, 'ak.max')
+
+    def visit_Aggregate(self, node):
+        operation = aggregate_operation(node.func)
+        self.visit_reduction(node, reduction_func_dict[operation])
+        seed_rep = self.get_rep(node.seed)
+        if operation == 'add':
+            node.finalize_rep = '(lambda result: ' + seed_rep + ' + result)'
+        elif operation == 'multiply':
+            node.finalize_rep = '(lambda result: ' + seed_rep + ' * result)'
+        else:
+            node.finalize_rep = ('(lambda result: ' + seed_rep + ' if result is None'
+                                 + ' else ' + operation[:3] + '(' + seed_rep + ', result))')
+        if operation in ('add', 'multiply') or self._depth == 0:
+            node.rep = node.finalize_rep + '(' + node.rep + ')'
+        else:
+            node.rep = ('ak.fill_none(np.' + operation + '(' + node.rep + ', ' + seed_rep + '), '
+                        + seed_rep + ')')
+        return node
+
+    def restrict_entry_range(self, node, entry_range_function, count):
+        if self._depth != 0 or not isinstance(count, int) or isinstance(count, bool):
+            return False
+        dataset = event_aligned_dataset(node.source)
+        if dataset is None:
+            return False
+        dataset.entry_range = entry_range_function(getattr(dataset, 'entry_range', (0, None)),
+                                                   count)
+        return True
+
+    def ordering_key_rep(self, node):
+        operation = type(node).__name__
+        if type(node.key_selector) is not ast.Lambda or len(node.key_selector.args.args) != 1:
+            raise TypeError('Argument to ' + operation + '() must be a lambda function with'
+                            + ' exactly one argument')
+        self.visit(node.source)
+        node.key_selector.argument_types = [self.element_type(node.source, operation)]
+        node.key_selector.array_arguments = self.is_array(node.source)
+        self._depth += 1
+        key_rep = self.get_rep(node.key_selector)
+        key_type = self.static_type(node.key_selector.body)
+        self._depth -= 1
+        if key_type is not None and not isinstance(key_type, ScalarType):
+            raise TypeError('Key in ' + operation + '() must be a scalar for each element, found '
+                            + repr(key_type))
+        return key_rep
+
+    def visit_ordering(self, node, ordering, count=None, projection=None, reduction=None):
+        keys_rep = self.ordering_key_rep(ordering) + '(ordered)'
+        ascending_rep = repr(type(ordering).__name__ == 'OrderBy')
+        source_rep = self.get_rep(ordering.source)
+        values_rep = 'ordered'
+        node.static_type = self.static_type(ordering.source)
+        if projection is not None:
+            ordering.rep = 'ordered'
+            ordering.static_type = node.static_type
+            values_rep = self.get_rep(projection)
+            node.static_type = self.static_type(projection)
+        if count is None:
+            count_rep = 'None'
+            indices_rep = ('ak.argsort(' + keys_rep + ', axis=' + repr(self._depth)
+                           + ', ascending=' + ascending_rep + ')')
+        else:
+            count_rep = self.get_rep(count)
+            indices_rep = ('top_k_indices(' + keys_rep + ', ' + count_rep + ', '
+                           + repr(self._depth) + ', ' + ascending_rep + ')')
+        node.rep = ('(lambda ordered: ' + values_rep + '[' + indices_rep + '])('
+                    + source_rep + ')')
+        if self._depth == 0 and reduction is not None:
+            node.partial_rep = ('(lambda ordered: top_k_partial(' + values_rep + ', '
+                                + keys_rep + ', ' + count_rep + ', ' + ascending_rep + '))('
+                                + source_rep + ')')
+            node.finalize_rep = 'top_k_values'
+        node.chunk_dependent = self._depth == 0
+        return node
+
+    def visit_ordered_projection(self, node):
+        projection = ordered_projection(node)
+        if projection is None or hasattr(projection[0], 'rep'):
+            return None
+        ordering, take = projection
+        reduction = top_level_reduction(node)
+        if take is node:
+            projection = take.source if take.source is not ordering else None
+        else:
+            projection = node if node is not ordering else None
+            if take is not None:
+                parent = node
+                while parent.source is not take:
+                    parent = parent.source
+                parent.source = take.source
+        return self.visit_ordering(node, ordering, take.count if take is not None else None,
+                                   projection, reduction)
+
+    def visit_OrderBy(self, node):
+        return self.visit_ordered_projection(node)
+
+    def visit_OrderByDescending(self, node):
+        return self.visit_ordered_projection(node)
+
+    def visit_Take(self, node):
+        if self.visit_ordered_projection(node) is not None:
+            return node
+        self.visit(node.source)
+        self.element_type(node.source, 'Take')
+        node.static_type = self.static_type(node.source)
+        if self.restrict_entry_range(node, take_entry_range, literal_count(node.count)):
+            node.rep = self.get_rep(node.source)
+        else:
+            node.rep = (self.get_rep(node.source) + '[' + ':, ' * (self._depth or 0)
+                        + ':' + self.get_rep(node.count) + ']')
+            node.chunk_dependent = self._depth == 0
+        return node
+
+    def visit_Skip(self, node):
+        self.visit(node.source)
+        self.element_type(node.source, 'Skip')
+        node.static_type = self.static_type(node.source)
+        if self.restrict_entry_range(node, skip_entry_range, literal_count(node.count)):
+            node.rep = self.get_rep(node.source)
+        else:
+            node.rep = (self.get_rep(node.source) + '[' + ':, ' * (self._depth or 0)
+                        + self.get_rep(node.count) + ':]')
+            node.chunk_dependent = self._depth == 0
+        return node
+
+    def visit_Histogram(self, node):
+        if type(node.selector) is not ast.Lambda or len(node.selector.args.args) != 1:
+            raise TypeError('First argument to Histogram() must be a lambda function with'
+                            + ' exactly one argument')
+        self.visit(node.source)
+        if self._depth != 0:
+            raise NotImplementedError('Histogram() is only supported over events')
+        if node.low is None and not isinstance(node.bins, (ast.List, ast.Tuple)):
+            raise ValueError('Histogram() with a number of bins requires low and high edges,'
+                             + ' since each chunk would otherwise choose its own range')
+        selector = node.selector
+        keywords_rep = ''
+        if node.low is not None:
+            keywords_rep += (', low=' + self.get_rep(node.low)
+                             + ', high=' + self.get_rep(node.high))
+        if node.weights is not None:
+            if type(node.weights) is not ast.Lambda or len(node.weights.args.args) != 1:
+                raise TypeError('Weights in Histogram() must be a lambda function with'
+                                + ' exactly one argument')
+            element = ast.Name(id=lambda_argument_names(selector)[0], ctx=ast.Load())
+            weight = ast.Call(func=node.weights, args=[element], keywords=[])
+            selector = ast.Lambda(args=selector.args,
+                                  body=ast.Tuple(elts=[selector.body, weight], ctx=ast.Load()))
+            keywords_rep += ', weighted=True'
+        values = qastle.linq_util.Select(source=node.source, selector=selector)
+        node.rep = ('histogram_counts(' + self.get_rep(values) + ', ' + self.get_rep(node.bins)
+                    + keywords_rep + ')')
+        node.partial_rep = node.rep
+        return node
+
+    def visit_First(self, node):
+        self.visit(node.source)
+        if self._depth is None or self._depth == 0:
+            if not self.restrict_entry_range(node, take_entry_range, 1):
+                node.chunk_dependent = self._depth == 0
+            node.rep = self.get_rep(node.source) + '[0]'
+        else:
+            node.rep = ('ak.firsts(' + self.get_rep(node.source)
+                        + ', axis=' + repr(self._depth) + ')')
+            node.static_type = content_type(self.static_type(node.source), 'First')
         return node
@@ -1,26 +1,241 @@
+import ast as python_ast_module
+import functools
+
 import qastle
 
-from .transformer import PythonSourceGeneratorTransformer
-from .transformer import input_filenames_argument_name, tree_name_argument_name
+from .branches import annotate_branches, find_event_dataset, pushdown_predicate, query_node
+from .cache import QueryCache, code_filename, code_module_name
+from .codegen import RepTemplates, recursion_limit
+from .linq import insert_linq_nodes
+from .metadata import find_tree_name, metadata_cache
+from .optimization import copy_ast, optimize
+from .schema import RecordType, parse_schema, schema_key
+from .transformer import PythonSourceGeneratorTransformer, event_dataset_paths
+from .transformer import (input_filenames_argument_name, tree_name_argument_name,
+                          step_size_argument_name, entry_start_argument_name,
+                          entry_stop_argument_name, uproot_options_argument_name,
+                          shared_events_argument_name, events_name, profiler_argument_name,
+                          result_cache_argument_name, result_scope_name)
+
+
+query_cache = QueryCache()
+
+chunk_dependent_message = ('Event-level Take(), Skip(), First() and OrderBy() that cannot be'
+                           + ' combined across chunks require running the query without a'
+                           + ' step size')
+
+runtime_imports = (('from func_adl_uproot.histograms import histogram_counts',
+                    ('Histogram',)),
+                   ('from func_adl_uproot.ordering import top_k_indices, top_k_partial,'
+                    + ' top_k_values',
+                    ('OrderBy', 'OrderByDescending')))
 
 
 def python_ast_to_python_source(python_ast):
     return PythonSourceGeneratorTransformer().get_rep(python_ast)
 
 
-def generate_python_source(ast, function_name='run_query'):
-    if isinstance(ast, str):
-        ast = qastle.text_ast_to_python_ast(ast)
-    qastle.insert_linq_nodes(ast)
+def linq_ast(ast):
+    with recursion_limit(ast):
+        if isinstance(ast, str):
+            ast = qastle.text_ast_to_python_ast(ast)
+        else:
+            ast = copy_ast(ast)
+        return insert_linq_nodes(ast)
+
+
+def canonical_text_ast(ast):
+    with recursion_limit(ast):
+        if isinstance(ast, str):
+            ast = qastle.text_ast_to_python_ast(ast)
+        else:
+            ast = copy_ast(ast)
+        return qastle.python_ast_to_text_ast(qastle.insert_linq_nodes(ast))
+
+
+def portable_query(ast):
+    try:
+        return canonical_text_ast(ast)
+    except SyntaxError:
+        return ast
+
+
+def query_cache_key(ast):
+    try:
+        return canonical_text_ast(ast)
+    except SyntaxError:
+        ast = linq_ast(ast)
+        with recursion_limit(ast):
+            return python_ast_module.dump(ast)
+
+
+def resolve_schema(ast, schema, uproot_options=None):
+    if schema is None or isinstance(schema, RecordType):
+        return schema
+    if schema is not True:
+        return parse_schema(schema)
+    dataset = find_event_dataset(linq_ast(ast))
+    paths = event_dataset_paths(dataset) if dataset is not None else None
+    if paths is None or len(paths) == 0:
+        raise ValueError('Reading a schema requires an EventDataset with input files')
+    if len(dataset.args) >= 2:
+        tree_name = python_ast_module.literal_eval(dataset.args[1])
+    else:
+        tree_name = find_tree_name(paths[0], uproot_options)
+    return metadata_cache.tree_schema(paths[0], tree_name, uproot_options)
+
+
+def _python_source_template(ast, function_name, schema, profile, cache_results, backend,
+                            rep_templates):
+    ast = optimize(linq_ast(ast))
+    with recursion_limit(ast):
+        return _optimized_source_template(ast, function_name, schema, profile, cache_results,
+                                          backend, rep_templates)
+
+
+def _optimized_source_template(ast, function_name, schema, profile, cache_results, backend,
+                               rep_templates):
+    annotate_branches(ast)
+    transformer = PythonSourceGeneratorTransformer(resolve_schema(ast, schema), profile,
+                                                   cache_results, backend, rep_templates)
     source = ('def ' + function_name
               + '(' + input_filenames_argument_name + '=None, '
-              + tree_name_argument_name + '=None):\n')
-    source += '    import logging, numpy as np, awkward as ak, uproot\n'
-    source += '    return ' + python_ast_to_python_source(ast) + '\n'
-    return source
+              + tree_name_argument_name + '=None, '
+              + step_size_argument_name + '=None, '
+              + entry_start_argument_name + '=None, '
+              + entry_stop_argument_name + '=None, '
+              + uproot_options_argument_name + '=None, '
+              + shared_events_argument_name + '=None')
+    if profile:
+        source += ', ' + profiler_argument_name + '=None'
+    if cache_results:
+        source += ', ' + result_cache_argument_name + '=None'
+    source += '):\n'
+    imports = 'import logging, numpy as np, awkward as ak, uproot\n'
+    if backend == 'numba':
+        imports += 'from func_adl_uproot.kernels import load_kernel\n'
+    node_types = set(type(node).__name__ for node in python_ast_module.walk(ast))
+    for import_rep, import_node_types in runtime_imports:
+        if not node_types.isdisjoint(import_node_types):
+            imports += import_rep + '\n'
+    dataset = find_event_dataset(ast)
+    if dataset is None:
+        source += '    return ' + transformer.get_rep(ast) + '\n'
+        return imports + source
+    imports += ('from func_adl_uproot.reading import'
+                + ' compose_entry_range, iterate_events, read_events, select_events\n')
+    imports += 'from func_adl_uproot.metadata import find_tree_name\n'
+    transformer.visit(dataset)
+    source += '    input_files = ' + dataset.input_files_rep + '\n'
+    source += '    tree_name_to_use = ' + dataset.tree_name_rep + '\n'
+    source += "    logging.getLogger(__name__).info('Using treename=' + repr(tree_name_to_use))\n"
+    dataset.rep = events_name
+    pushed_down_where = pushdown_predicate(ast) if not cache_results else None
+    query_rep = transformer.get_rep(ast)
+    finalize_rep = None
+    top_node = query_node(ast)
+    if hasattr(top_node, 'partial_rep'):
+        query_rep = top_node.partial_rep
+        finalize_rep = getattr(top_node, 'finalize_rep', None)
+    source += '    query = (lambda ' + events_name + ': ' + query_rep + ')\n'
+    entry_range_rep = (entry_start_argument_name + ', ' + entry_stop_argument_name)
+    if hasattr(dataset, 'entry_range'):
+        source += ('    ' + entry_range_rep + ' = compose_entry_range(' + entry_range_rep + ', '
+                   + ', '.join(repr(entry) for entry in dataset.entry_range) + ')\n')
+    if cache_results:
+        imports += 'from func_adl_uproot.results import result_scope as make_result_scope\n'
+        source += ('    ' + result_scope_name + ' = make_result_scope('
+                   + result_cache_argument_name + ', input_files, tree_name_to_use, '
+                   + entry_range_rep + ', ' + step_size_argument_name + ')\n')
+    read_options_rep = ('filter_name=' + repr(dataset.branches)
+                        + ', entry_start=' + entry_start_argument_name
+                        + ', entry_stop=' + entry_stop_argument_name
+                        + ', uproot_options=' + uproot_options_argument_name)
+    if pushed_down_where is not None:
+        source += '    predicate = ' + pushed_down_where.predicate_rep + '\n'
+        read_options_rep += (', predicate=predicate, predicate_branches='
+                             + repr(pushed_down_where.predicate_branches))
+    if profile:
+        read_options_rep += ', profiler=' + profiler_argument_name
+    shared_events_rep = shared_events_argument_name
+    if pushed_down_where is not None:
+        shared_events_rep = 'select_events(' + shared_events_rep + ', predicate)'
+    source += '    if ' + shared_events_argument_name + ' is not None:\n'
+    source += '        return query(' + shared_events_rep + ')\n'
+    source += '    if ' + step_size_argument_name + ' is None:\n'
+    read_rep = ('query(read_events(input_files, tree_name_to_use, ' + read_options_rep + '))')
+    if finalize_rep is not None:
+        read_rep = finalize_rep + '(' + read_rep + ')'
+    source += '        return ' + read_rep + '\n'
+    if any(getattr(node, 'chunk_dependent', False)
+           and (node is not top_node or not hasattr(node, 'partial_rep'))
+           for node in python_ast_module.walk(ast)):
+        source += '    raise ValueError(' + repr(chunk_dependent_message) + ')\n'
+        return imports + source
+    source += ('    return (query(' + events_name + ') for ' + events_name
+               + ' in iterate_events(input_files, tree_name_to_use, '
+               + step_size_argument_name + ', ' + read_options_rep + '))\n')
+    return imports + source
+
+
+def generate_python_source(ast, function_name='run_query', schema=None, profile=False,
+                           cache_results=False, backend='awkward'):
+    rep_templates = RepTemplates()
+    with recursion_limit(ast):
+        return rep_templates.expand(_python_source_template(ast, function_name, schema, profile,
+                                                            cache_results, backend,
+                                                            rep_templates))
+
+
+def _generate_source_and_code(ast, function_name, schema, profile, cache_results, backend):
+    rep_templates = RepTemplates()
+    with recursion_limit(ast):
+        source_template = _python_source_template(ast, function_name, schema, profile,
+                                                  cache_results, backend, rep_templates)
+        return (rep_templates.expand(source_template),
+                rep_templates.compile(source_template, code_filename))
+
+
+def generate_code(ast, function_name='run_query', schema=None, profile=False,
+                  cache_results=False, backend='awkward'):
+    return _generate_source_and_code(ast, function_name, schema, profile, cache_results,
+                                     backend)[1]
+
+
+def _generate_function(ast, function_name, use_cache, schema, profile, cache_results,
+                       backend):
+    if use_cache:
+        key = query_cache_key(ast)
+        if schema is not None:
+            key = (key, schema_key(schema))
+        if profile:
+            key = (key, profiler_argument_name)
+        if cache_results:
+            key = (key, result_cache_argument_name)
+        if backend != 'awkward':
+            key = (key, backend)
+        return query_cache.get(key, function_name,
+                               lambda: _generate_source_and_code(ast, function_name, schema,
+                                                                 profile, cache_results,
+                                                                 backend))
+    namespace = {'__name__': code_module_name}
+    exec(generate_code(ast, function_name, schema, profile, cache_results, backend), namespace)
+    return namespace[function_name]
 
 
-def generate_function(ast, function_name='run_query'):
-    source = generate_python_source(ast)
-    exec(source)
-    return eval(function_name)
+def generate_function(ast, function_name='run_query', use_cache=True, schema=None,
+                      profiler=None, result_cache=None, backend='awkward'):
+    cache_results = result_cache is not None
+    if profiler is None:
+        function = _generate_function(ast, function_name, use_cache,
+                                      resolve_schema(ast, schema), False, cache_results,
+                                      backend)
+    else:
+        with profiler.stage('translation'):
+            function = _generate_function(ast, function_name, use_cache,
+                                          resolve_schema(ast, schema), True, cache_results,
+                                          backend)
+        function = functools.partial(function, profiler=profiler)
+    if cache_results:
+        function = functools.partial(function, result_cache=result_cache)
+    return function
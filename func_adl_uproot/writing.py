@@ -0,0 +1,94 @@
+import itertools
+
+output_tree_name = 'tree'
+
+default_root_compression_level = 1
+
+
+def rechunk(chunks, chunk_size):
+    import awkward as ak
+    if chunk_size is None:
+        for chunk in chunks:
+            yield chunk
+        return
+    if chunk_size < 1:
+        raise ValueError('Chunk size must be positive, found ' + repr(chunk_size))
+    pending_chunks = []
+    n_pending = 0
+    for chunk in chunks:
+        while len(chunk) > 0:
+            head = chunk[:chunk_size - n_pending]
+            chunk = chunk[chunk_size - n_pending:]
+            pending_chunks.append(head)
+            n_pending += len(head)
+            if n_pending == chunk_size:
+                yield ak.concatenate(pending_chunks)
+                pending_chunks = []
+                n_pending = 0
+    if n_pending > 0:
+        yield ak.concatenate(pending_chunks)
+
+
+def write_parquet(chunks, path, row_group_size=None, compression=None, compression_level=None):
+    import awkward as ak
+    import pyarrow.parquet
+    if compression is None:
+        compression = 'snappy'
+    writer = None
+    try:
+        for chunk in rechunk(chunks, row_group_size):
+            table = ak.to_arrow_table(chunk)
+            if writer is None:
+                writer = pyarrow.parquet.ParquetWriter(path, table.schema,
+                                                       compression=compression,
+                                                       compression_level=compression_level)
+            elif not table.schema.equals(writer.schema):
+                table = table.cast(writer.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return path
+
+
+def _root_branches(chunk):
+    if len(chunk.fields) == 0:
+        return {'value': chunk}
+    return {field: chunk[field] for field in chunk.fields}
+
+
+def write_root(chunks, path, row_group_size=None, compression=None, compression_level=None):
+    import uproot
+    if isinstance(compression, str):
+        if compression_level is None:
+            compression_level = default_root_compression_level
+        compression = getattr(uproot, compression.upper())(compression_level)
+    elif compression_level is not None:
+        raise ValueError('A compression level requires a compression algorithm name')
+    options = {}
+    if compression is not None:
+        options['compression'] = compression
+    with uproot.recreate(path, **options) as root_file:
+        for chunk in rechunk(chunks, row_group_size):
+            if output_tree_name in root_file:
+                root_file[output_tree_name].extend(_root_branches(chunk))
+            else:
+                root_file[output_tree_name] = _root_branches(chunk)
+    return path
+
+
+output_writer_dict = {'parquet': write_parquet,
+                      'root': write_root}
+
+
+def write_chunks(chunks, output, path, row_group_size=None, compression=None,
+                 compression_level=None):
+    if output not in output_writer_dict:
+        raise ValueError('Unknown output format: ' + repr(output))
+    chunks = iter(chunks)
+    try:
+        first_chunk = next(chunks)
+    except StopIteration:
+        return None
+    return output_writer_dict[output](itertools.chain([first_chunk], chunks), path,
+                                      row_group_size, compression, compression_level)
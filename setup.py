@@ -9,14 +9,21 @@ setuptools.setup(name='func_adl_uproot',
                               + ' uproot backend for accessing flat ROOT ntuples'),
                  long_description=long_description,
                  long_description_content_type="text/markdown",
-                 packages=setuptools.find_packages(exclude=['tests']),
+                 packages=setuptools.find_packages(exclude=['benchmarks', 'tests']),
                  python_requires=('>=2.7, '
                                   '!=3.0.*, !=3.1.*, !=3.2.*, !=3.3.*, !=3.4.*, !=3.5.*, <3.10'),
                  install_requires=['awkward>=1, !=1.0.1',
+                                   'futures; python_version < "3"',
                                    'numpy',
                                    'qastle>=0.10',
                                    'uproot>=4'],
-                 extras_require={'test': ['flake8', 'pytest', 'pytest-cov']},
+                 extras_require={'numba': ['numba'],
+                                 'parquet': ['pyarrow'],
+                                 'test': ['flake8',
+                                          'numba; python_version >= "3.6"',
+                                          'pyarrow; python_version >= "3.6"',
+                                          'pytest',
+                                          'pytest-cov']},
                  author='Mason Proffitt',
                  author_email='masonlp@uw.edu',
                  url='https://github.com/iris-hep/func_adl_uproot')
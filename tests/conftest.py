@@ -0,0 +1,3 @@
+import sys
+
+collect_ignore = ['test_async_executor.py'] if sys.version_info < (3, 6) else []
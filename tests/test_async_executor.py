@@ -0,0 +1,190 @@
+import ast
+import concurrent.futures
+import os
+import threading
+
+import pytest
+
+from func_adl_uproot.executor import _run_query_on_chunk
+from func_adl_uproot.transformer import url_path
+
+try:
+    from http.server import HTTPServer, SimpleHTTPRequestHandler
+except ImportError:
+    HTTPServer = None
+
+asyncio = pytest.importorskip('asyncio')
+async_ast_executor = pytest.importorskip('func_adl_uproot.async_executor').async_ast_executor
+
+
+class CountingExecutor(concurrent.futures.ThreadPoolExecutor):
+    def __init__(self):
+        super(CountingExecutor, self).__init__(max_workers=1)
+        self.n_queries = 0
+
+    def submit(self, function, *args, **kwargs):
+        if getattr(function, 'func', None) is _run_query_on_chunk:
+            self.n_queries += 1
+        return super(CountingExecutor, self).submit(function, *args, **kwargs)
+
+
+async def collect_chunks(coroutine):
+    return [chunk.tolist() async for chunk in await coroutine]
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+tests_directory = os.path.dirname(os.path.abspath(__file__))
+
+
+class RangeRequestHandler(SimpleHTTPRequestHandler if HTTPServer is not None else object):
+    def translate_path(self, path):
+        return os.path.join(tests_directory,
+                            os.path.relpath(SimpleHTTPRequestHandler.translate_path(self, path)))
+
+    def do_GET(self):
+        byte_range = self.headers.get('Range')
+        if byte_range is None or ',' in byte_range:
+            return SimpleHTTPRequestHandler.do_GET(self)
+        path = self.translate_path(self.path)
+        start, stop = [int(value) for value in byte_range.split('=')[1].split('-')]
+        with open(path, 'rb') as input_file:
+            input_file.seek(start)
+            content = input_file.read(stop + 1 - start)
+        self.send_response(206)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(content)))
+        self.send_header('Content-Range', 'bytes ' + str(start) + '-' + str(stop) + '/'
+                         + str(os.path.getsize(path)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    if HTTPServer is None:
+        pytest.skip('http.server is not available')
+    server = HTTPServer(('127.0.0.1', 0), RangeRequestHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield 'http://127.0.0.1:' + str(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+
+def test_url_path():
+    assert url_path('tests/vectors_tree_file.root') == 'tests/vectors_tree_file.root'
+    assert url_path('file:///data/file.root') == '/data/file.root'
+    assert url_path('root://host//data/file.root') == 'root://host//data/file.root'
+
+
+def test_async_ast_executor():
+    python_source = ("Select(EventDataset('tests/vectors_tree_file.root', 'tree'),"
+                     + ' lambda row: row.int_vector_branch)')
+    assert run(async_ast_executor(ast.parse(python_source))).tolist() == [[], [-1, 2, 3], [13]]
+
+
+def test_async_ast_executor_multiple_files():
+    python_source = ("Select(EventDataset(['tests/scalars_tree_file.root',"
+                     + " 'tests/scalars_and_vectors_tree_file.root'], 'tree'),"
+                     + ' lambda row: row.int_branch)')
+    result = run(async_ast_executor(ast.parse(python_source), prefetch=1))
+    assert result.tolist() == [0, -1, 0, -1, 5]
+
+
+def test_async_ast_executor_reduction_chunks():
+    python_source = ("EventDataset(['tests/scalars_tree_file.root',"
+                     + " 'tests/scalars_and_vectors_tree_file.root'], 'tree').Count()")
+    assert run(async_ast_executor(ast.parse(python_source))) == 5
+    python_source = ("Select(EventDataset(['tests/scalars_tree_file.root',"
+                     + " 'tests/scalars_and_vectors_tree_file.root'], 'tree'),"
+                     + ' lambda row: row.int_branch)')
+    chunks = run(collect_chunks(async_ast_executor(ast.parse(python_source), step_size=1)))
+    assert chunks == [[0], [-1], [0], [-1], [5]]
+
+
+def test_async_ast_executor_streams_chunks():
+    python_source = ("Select(EventDataset(['tests/scalars_tree_file.root',"
+                     + " 'tests/scalars_and_vectors_tree_file.root'], 'tree'),"
+                     + ' lambda row: row.int_branch)')
+    executor = CountingExecutor()
+
+    async def first_chunk():
+        chunks = await async_ast_executor(ast.parse(python_source), step_size=1, prefetch=1,
+                                          executor=executor)
+        async for chunk in chunks:
+            await chunks.aclose()
+            return chunk.tolist()
+
+    try:
+        assert run(first_chunk()) == [0]
+        assert executor.n_queries < 5
+    finally:
+        executor.shutdown()
+
+
+def test_async_ast_executor_single_file_chunks():
+    python_source = ("Select(EventDataset('tests/scalars_and_vectors_tree_file.root', 'tree'),"
+                     + ' lambda row: row.int_branch)')
+    chunks = run(collect_chunks(async_ast_executor(ast.parse(python_source), step_size=2)))
+    assert chunks == [[0, -1], [5]]
+
+
+def test_async_ast_executor_single_file_prefetch():
+    python_source = ("Select(EventDataset('tests/scalars_and_vectors_tree_file.root', 'tree'),"
+                     + ' lambda row: row.int_branch)')
+    executor = CountingExecutor()
+    try:
+        chunks = run(collect_chunks(async_ast_executor(ast.parse(python_source), step_size=1,
+                                                       executor=executor)))
+        assert chunks == [[0], [-1], [5]]
+        assert executor.n_queries == 3
+    finally:
+        executor.shutdown()
+
+
+def test_async_ast_executor_entry_range_chunks():
+    python_source = ("Select(EventDataset(['tests/scalars_tree_file.root',"
+                     + " 'tests/scalars_and_vectors_tree_file.root'], 'tree'),"
+                     + ' lambda row: row.int_branch)')
+    chunks = run(collect_chunks(async_ast_executor(ast.parse(python_source), step_size=2,
+                                                   entry_start=1, entry_stop=4)))
+    assert chunks == [[-1], [0, -1]]
+
+
+def test_async_ast_executor_concurrent_queries():
+    python_sources = ["EventDataset('tests/scalars_tree_file.root', 'tree').Count()",
+                      "EventDataset('tests/vectors_tree_file.root', 'tree').Count()"]
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        coroutine = asyncio.gather(*[async_ast_executor(ast.parse(python_source))
+                                     for python_source in python_sources])
+        assert loop.run_until_complete(coroutine) == [2, 3]
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+def test_async_ast_executor_http(http_server):
+    python_source = ("Select(EventDataset(['" + http_server + "/vectors_tree_file.root', '"
+                     + http_server + "/scalars_and_vectors_tree_file.root'], 'tree'),"
+                     + ' lambda row: row.int_vector_branch)')
+    result = run(async_ast_executor(ast.parse(python_source)))
+    assert result.tolist() == [[], [-1, 2, 3], [13], [], [-2, 3, 4], [6]]
+
+
+def test_async_ast_executor_invalid_prefetch():
+    python_source = "EventDataset('tests/scalars_tree_file.root', 'tree').Count()"
+    with pytest.raises(ValueError):
+        run(async_ast_executor(ast.parse(python_source), prefetch=0))
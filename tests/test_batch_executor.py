@@ -0,0 +1,88 @@
+import ast
+
+import func_adl_uproot.batch_executor
+from func_adl_uproot import ast_executor, batch_ast_executor
+
+
+scalars_dataset = "EventDataset('tests/scalars_tree_file.root', 'tree')"
+vectors_dataset = "EventDataset('tests/vectors_tree_file.root', 'tree')"
+
+
+def count_reads(monkeypatch):
+    reads = []
+    read_events = func_adl_uproot.batch_executor.read_events
+    iterate_events = func_adl_uproot.batch_executor.iterate_events
+
+    def counted_read_events(*args, **kwargs):
+        reads.append(args[2])
+        return read_events(*args, **kwargs)
+
+    def counted_iterate_events(*args, **kwargs):
+        reads.append(args[3])
+        return iterate_events(*args, **kwargs)
+
+    monkeypatch.setattr(func_adl_uproot.batch_executor, 'read_events', counted_read_events)
+    monkeypatch.setattr(func_adl_uproot.batch_executor, 'iterate_events',
+                        counted_iterate_events)
+    return reads
+
+
+def test_batch_executor_shared_scan(monkeypatch):
+    reads = count_reads(monkeypatch)
+    python_sources = [scalars_dataset + '.Select(lambda row: row.int_branch)',
+                      scalars_dataset + '.Where(lambda row: row.int_branch < 0)'
+                      + '.Select(lambda row: row.float_branch)',
+                      scalars_dataset + '.Select(lambda row: row.long_branch).Sum()']
+    results = batch_ast_executor([ast.parse(python_source) for python_source in python_sources])
+    assert reads == [['float_branch', 'int_branch', 'long_branch']]
+    assert results[0].tolist() == [0, -1]
+    assert results[1].tolist() == ast_executor(ast.parse(python_sources[1])).tolist()
+    assert results[2] == ast_executor(ast.parse(python_sources[2]))
+
+
+def test_batch_executor_step_size(monkeypatch):
+    reads = count_reads(monkeypatch)
+    python_sources = [vectors_dataset + '.Select(lambda row: row.int_vector_branch)',
+                      vectors_dataset + '.Select(lambda row: row.int_vector_branch.Count())'
+                      + '.Max()',
+                      vectors_dataset]
+    results = batch_ast_executor([ast.parse(python_source) for python_source in python_sources],
+                                 step_size=1)
+    assert reads == [None]
+    assert results[0].tolist() == [[], [-1, 2, 3], [13]]
+    assert results[1] == 3
+    assert len(results[2]) == 3
+
+
+def test_batch_executor_separate_scans(monkeypatch):
+    reads = count_reads(monkeypatch)
+    python_sources = [scalars_dataset + '.Select(lambda row: row.int_branch)',
+                      vectors_dataset + '.Count()',
+                      scalars_dataset + '.Take(1).Select(lambda row: row.int_branch)']
+    results = batch_ast_executor([ast.parse(python_source) for python_source in python_sources])
+    assert len(reads) == 2
+    assert results[0].tolist() == [0, -1]
+    assert results[1] == 3
+    assert results[2].tolist() == [0]
+
+
+def test_batch_executor_fallback_options(monkeypatch):
+    reads = count_reads(monkeypatch)
+    calls = []
+    executor = func_adl_uproot.batch_executor.ast_executor
+
+    def recorded_ast_executor(ast, **kwargs):
+        calls.append(kwargs)
+        return executor(ast, **kwargs)
+
+    monkeypatch.setattr(func_adl_uproot.batch_executor, 'ast_executor', recorded_ast_executor)
+    python_sources = [scalars_dataset + '.Select(lambda row: row.int_branch)',
+                      scalars_dataset + '.Take(1).Select(lambda row: row.int_branch)']
+    results = batch_ast_executor([ast.parse(python_source) for python_source in python_sources],
+                                 step_size=1, entry_start=1, entry_stop=2)
+    assert reads == [['int_branch']]
+    assert calls[0]['step_size'] == 1
+    assert calls[0]['entry_start'] == 1
+    assert calls[0]['entry_stop'] == 2
+    assert results[0].tolist() == [-1]
+    assert results[1].tolist() == [-1]
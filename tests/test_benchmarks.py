@@ -0,0 +1,59 @@
+import ast
+import sys
+
+import pytest
+
+import uproot
+
+from func_adl_uproot import ast_executor
+
+from benchmarks.ntuples import generate_ntuple
+from benchmarks.queries import queries, query_source
+from benchmarks.runner import (compare_to_baseline, imported_modules, result_key,
+                               run_scaling_benchmarks, scaling_exponent)
+
+
+def test_generate_flat_ntuple(tmp_path):
+    path = generate_ntuple(str(tmp_path / 'flat.root'), 'flat', 25, 3, chunk_size=10)
+    with uproot.open(path) as root_file:
+        assert root_file['tree'].num_entries == 25
+        assert root_file['tree'].keys() == ['flat_0', 'flat_1', 'flat_2']
+
+
+def test_generate_jagged_ntuple(tmp_path):
+    path = generate_ntuple(str(tmp_path / 'jagged.root'), 'jagged', 25, 2, chunk_size=10)
+    with uproot.open(path) as root_file:
+        assert root_file['tree'].num_entries == 25
+        assert 'jagged_b1' in root_file['tree'].keys()
+
+
+def test_benchmark_queries(tmp_path):
+    paths = {'flat': generate_ntuple(str(tmp_path / 'flat.root'), 'flat', 10, 3),
+             'jagged': generate_ntuple(str(tmp_path / 'jagged.root'), 'jagged', 10, 2)}
+    for query in queries:
+        ast_executor(ast.parse(query_source(query, paths[query.kind])))
+
+
+def test_translation_scaling():
+    results = run_scaling_benchmarks(lengths=[2, 4])
+    assert [result['query'] for result in results] == ['where_chain', 'select_chain',
+                                                       'select_repeated_terms']
+    assert all(len(result['translation_times']) == 2 for result in results)
+    assert abs(scaling_exponent([100, 400], [1.0, 4.0]) - 1) < 1e-9
+    assert abs(scaling_exponent([100, 400], [1.0, 16.0]) - 2) < 1e-9
+    assert scaling_exponent([100, 400], [0.0, 1.0]) is None
+
+
+def test_compare_to_baseline():
+    result = {'query': 'select_flat', 'events': 1000, 'branches': 10,
+              'execution_time': 2.0, 'peak_rss': 100}
+    baseline = {result_key(result): dict(result, execution_time=1.0)}
+    regressions = compare_to_baseline([result], baseline, tolerance=0.5)
+    assert len(regressions) == 1
+    assert regressions[0].startswith('select_flat/1000/10: execution_time')
+    assert compare_to_baseline([result], baseline, tolerance=1.5) == []
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason='Submodules are imported eagerly')
+def test_import_skips_heavy_modules():
+    assert not set(['awkward', 'numpy', 'qastle', 'uproot']) & set(imported_modules())
@@ -0,0 +1,117 @@
+import ast
+
+import qastle
+
+from func_adl_uproot.branches import annotate_branches, find_event_dataset, pushdown_predicate
+from func_adl_uproot.linq import insert_linq_nodes
+
+
+def get_branches(python_source):
+    python_ast = annotate_branches(qastle.insert_linq_nodes(ast.parse(python_source)))
+    for node in ast.walk(python_ast):
+        if hasattr(node, 'branches'):
+            return node.branches
+    raise AssertionError('No EventDataset found')
+
+
+def test_bare_dataset():
+    assert get_branches("EventDataset('f.root')") is None
+
+
+def test_select_attribute():
+    assert get_branches("EventDataset('f.root').Select(lambda row: row.a)") == ['a']
+
+
+def test_select_subscript():
+    assert get_branches("EventDataset('f.root').Select(lambda row: row['a'])") == ['a']
+
+
+def test_select_multiple():
+    assert (get_branches("EventDataset('f.root').Select(lambda row: [row.b, row.a, row.b])")
+            == ['a', 'b'])
+
+
+def test_select_whole_row():
+    assert get_branches("EventDataset('f.root').Select(lambda row: row)") is None
+    assert get_branches("EventDataset('f.root').Select(lambda row: row[0])") is None
+    assert get_branches("EventDataset('f.root').Zip()") is None
+
+
+def test_where_then_select():
+    assert (get_branches("EventDataset('f.root').Where(lambda row: row.a > 0)"
+                         + '.Select(lambda row: row.b)')
+            == ['a', 'b'])
+
+
+def test_where_without_select():
+    assert get_branches("EventDataset('f.root').Where(lambda row: row.a > 0)") is None
+
+
+def test_count():
+    assert (get_branches("EventDataset('f.root').Where(lambda row: row.a > 0).Count()")
+            == ['a'])
+    assert get_branches("EventDataset('f.root').Count()") == []
+
+
+def test_sum():
+    assert (get_branches("EventDataset('f.root').Where(lambda row: row.a > 0)"
+                         + '.Select(lambda row: row.b).Sum()')
+            == ['a', 'b'])
+    assert (get_branches("EventDataset('f.root').Select(lambda row: row.b)"
+                         + '.Aggregate(0, lambda total, b: total + b)')
+            == ['b'])
+
+
+def test_select_of_select():
+    assert (get_branches("EventDataset('f.root').Select(lambda row: {'x': row.a})"
+                         + '.Select(lambda row: row.x)')
+            == ['a'])
+
+
+def test_selectmany_nested_lambda():
+    assert (get_branches("EventDataset('f.root')"
+                         + '.SelectMany(lambda row: row.jets.Where(lambda jet: jet > row.cut))')
+            == ['cut', 'jets'])
+
+
+def test_shadowed_name():
+    assert (get_branches("EventDataset('f.root')"
+                         + '.Select(lambda row: row.jets.Select(lambda row: row))')
+            == ['jets'])
+
+
+def get_pushed_down_branches(python_source):
+    where_node = pushdown_predicate(annotate_branches(
+        qastle.insert_linq_nodes(ast.parse(python_source))))
+    return where_node.predicate_branches if where_node is not None else None
+
+
+def test_pushdown_predicate():
+    assert (get_pushed_down_branches("EventDataset('f.root').Where(lambda row: row.a > 0)"
+                                     + '.Select(lambda row: row.b)')
+            == ['a'])
+
+
+def test_no_pushdown_predicate():
+    assert (get_pushed_down_branches("EventDataset('f.root').Where(lambda row: row.a > 0)")
+            is None)
+    assert (get_pushed_down_branches("EventDataset('f.root').Where(lambda row: row.a > 0)"
+                                     + '.Select(lambda row: row.a)')
+            is None)
+    assert (get_pushed_down_branches("EventDataset('f.root').Where(lambda row: len(row) > 0)"
+                                     + '.Select(lambda row: row.a)')
+            is None)
+    assert (get_pushed_down_branches("EventDataset('f.root').Select(lambda row: row.b)"
+                                     + '.Where(lambda b: b > 0)')
+            is None)
+
+
+def test_histogram():
+    python_ast = annotate_branches(insert_linq_nodes(ast.parse(
+        "EventDataset('f.root').Histogram(lambda e: e.jet_pt, [0, 1], lambda e: e.weight)")))
+    assert find_event_dataset(python_ast).branches == ['jet_pt', 'weight']
+
+
+def test_order_by():
+    assert get_branches("Select(EventDataset('f.root').OrderBy(lambda e: e.met),"
+                        + ' lambda e: e.jet_pt)') == ['jet_pt', 'met']
@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+from func_adl_uproot.cache import QueryCache, generator_digest_state
+
+
+def make_source(value):
+    return 'def run_query():\n    return ' + repr(value) + '\n'
+
+
+def test_cache_hit():
+    cache = QueryCache()
+    function = cache.get('key', 'run_query', lambda: make_source(1))
+    assert function() == 1
+    assert cache.get('key', 'run_query', lambda: make_source(2)) is function
+    info = cache.info()
+    assert info.hits == 1
+    assert info.misses == 1
+    assert info.currsize == 1
+
+
+def test_cache_function_name_is_part_of_key():
+    cache = QueryCache()
+    cache.get('key', 'run_query', lambda: make_source(1))
+    function = cache.get('key', 'other_query', lambda: 'def other_query():\n    return 2\n')
+    assert function() == 2
+    assert cache.info().misses == 2
+
+
+def test_cache_eviction():
+    cache = QueryCache(maxsize=2)
+    cache.get('a', 'run_query', lambda: make_source('a'))
+    cache.get('b', 'run_query', lambda: make_source('b'))
+    cache.get('a', 'run_query', lambda: make_source('a'))
+    cache.get('c', 'run_query', lambda: make_source('c'))
+    assert cache.info().currsize == 2
+    assert cache.get('b', 'run_query', lambda: make_source('new b'))() == 'new b'
+    assert cache.get('c', 'run_query', lambda: make_source('new c'))() == 'c'
+
+
+def test_cache_resize():
+    cache = QueryCache(maxsize=None)
+    for key in 'abcd':
+        cache.get(key, 'run_query', lambda: make_source(key))
+    assert cache.info().currsize == 4
+    cache.resize(1)
+    assert cache.info().currsize == 1
+    assert cache.info().maxsize == 1
+    with pytest.raises(ValueError):
+        cache.resize(-1)
+
+
+def test_cache_clear():
+    cache = QueryCache()
+    cache.get('key', 'run_query', lambda: make_source(1))
+    cache.clear()
+    assert cache.info() == (0, 0, 0, 256, 0)
+
+
+def test_cache_disk_tier(tmp_path):
+    directory = str(tmp_path / 'queries')
+    QueryCache(directory=directory).get('key', 'run_query', lambda: make_source(1))
+    assert any(filename.endswith('.py') for filename in os.listdir(directory))
+    cache = QueryCache(directory=directory)
+    assert cache.get('key', 'run_query', lambda: make_source(2))() == 1
+    assert cache.info().disk_hits == 1
+    assert cache.info().misses == 0
+
+
+def test_cache_disk_tier_source_fallback(tmp_path):
+    directory = str(tmp_path)
+    QueryCache(directory=directory).get('key', 'run_query', lambda: make_source(1))
+    for filename in os.listdir(directory):
+        if filename.endswith('.code'):
+            os.remove(os.path.join(directory, filename))
+    cache = QueryCache(directory=directory)
+    assert cache.get('key', 'run_query', lambda: make_source(2))() == 1
+    assert cache.info().disk_hits == 1
+
+
+def test_cache_disk_tier_generator_change(tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    QueryCache(directory=directory).get('key', 'run_query', lambda: make_source(1))
+    monkeypatch.setitem(generator_digest_state, 'digest', 'other')
+    cache = QueryCache(directory=directory)
+    assert cache.get('key', 'run_query', lambda: make_source(2))() == 2
+    assert cache.info().disk_hits == 0
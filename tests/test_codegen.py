@@ -0,0 +1,61 @@
+import ast
+import sys
+
+from func_adl_uproot.codegen import RepTemplates, query_depth, recursion_limit
+
+
+def test_rep_templates_expand():
+    rep_templates = RepTemplates()
+    inner = rep_templates.defer('(a + 1)')
+    outer = rep_templates.defer('(' + inner + ' * ' + inner + ')')
+    assert inner != '(a + 1)'
+    assert rep_templates.expand('f(' + outer + ')') == 'f(((a + 1) * (a + 1)))'
+
+
+def test_rep_templates_not_expression():
+    rep_templates = RepTemplates()
+    assert rep_templates.defer('1:2') == '1:2'
+    assert rep_templates.defer('*a') == '*a'
+
+
+def test_rep_templates_string_literal():
+    rep_templates = RepTemplates()
+    rep = rep_templates.defer('(a + 1)')
+    source = "x = (" + rep + ", '_func_adl_rep0', '_func_adl_rep_0')\n"
+    assert rep_templates.expand(source) == "x = ((a + 1), '_func_adl_rep0', '_func_adl_rep_0')\n"
+    namespace = {'a': 1}
+    exec(rep_templates.compile(source, '<test>'), namespace)
+    assert namespace['x'] == (2, '_func_adl_rep0', '_func_adl_rep_0')
+    assert RepTemplates().defer('(a + 1)') != rep
+
+
+def test_rep_templates_compile():
+    rep_templates = RepTemplates()
+    rep = rep_templates.defer('x')
+    for _ in range(500):
+        rep = rep_templates.defer('(' + rep + ' + 1)')
+    namespace = {}
+    exec(rep_templates.compile('def f(x):\n    return ' + rep + '\n', '<test>'), namespace)
+    assert namespace['f'](1) == 501
+    assert isinstance(rep_templates.to_ast('y = ' + rep).body[0].value, ast.BinOp)
+
+
+def test_query_depth():
+    assert query_depth('(call f (call g x))') == 2
+    assert query_depth(ast.parse('f(g(x))', mode='eval')) == 5
+
+
+def test_recursion_limit():
+    limit = sys.getrecursionlimit()
+    with recursion_limit('(' * 1000 + ')' * 1000):
+        assert sys.getrecursionlimit() > limit
+        with recursion_limit('()'):
+            assert sys.getrecursionlimit() > limit
+    assert sys.getrecursionlimit() == limit
+
+
+def test_recursion_limit_shallow_query():
+    limit = sys.getrecursionlimit()
+    with recursion_limit('(call f (call g x))'):
+        assert sys.getrecursionlimit() == limit
+    assert sys.getrecursionlimit() == limit
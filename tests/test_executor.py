@@ -1,10 +1,18 @@
 import ast
+import math
+import types
+
+import pytest
 
 import numpy as np
 
 import awkward as ak
 
+import uproot
+
 from func_adl_uproot import ast_executor
+from func_adl_uproot.kernels import kernel_cache
+from func_adl_uproot.profiling import QueryProfiler
 
 
 def test_ast_executor():
@@ -112,6 +120,13 @@ def test_ast_executor_select_of_select_scalar_branch_dict():
     assert ast_executor(python_ast)['longs2'].tolist() == [0, -2]
 
 
+def test_ast_executor_select_of_select_dict_by_position():
+    python_source = ("Select(EventDataset('tests/scalars_tree_file.root', 'tree'),"
+                     + " lambda row: {'ints': row.int_branch, 'longs': row.long_branch})"
+                     + '.Select(lambda row: row[1])')
+    assert ast_executor(ast.parse(python_source)).tolist() == [0, -2]
+
+
 def test_ast_executor_where_scalar_branch():
     python_source = ("Where(EventDataset('tests/scalars_tree_file.root', 'tree'),"
                      + ' lambda row: row.int_branch < 0)'
@@ -215,3 +230,492 @@ def test_ast_executor_where_vector_branch_dict():
     assert ast_executor(python_ast)['ints'].tolist() == [[], [2, 3], [13]]
     assert ak.max(abs(ast_executor(python_ast)['floats']
                       - ak.Array([[], [8.8, 9.9], [15.15]]))) < 1e-6
+
+
+def test_ast_executor_where_multiple_cuts():
+    python_source = ("Select(EventDataset('tests/vectors_tree_file.root', 'tree'),"
+                     + 'lambda row: row.int_vector_branch'
+                     + '.Where(lambda value: value > 0 and value < 13 and value != 2))')
+    python_ast = ast.parse(python_source)
+    assert ast_executor(python_ast).tolist() == [[], [3], []]
+
+
+def test_ast_executor_conditional_vector_branch():
+    python_source = ("Select(EventDataset('tests/vectors_tree_file.root', 'tree'),"
+                     + 'lambda row: row.int_vector_branch'
+                     + '.Select(lambda value: value if value > 2 else 0))')
+    python_ast = ast.parse(python_source)
+    assert ast_executor(python_ast).tolist() == [[], [0, 0, 3], [13]]
+
+
+def test_ast_executor_common_subexpressions():
+    python_source = ('Select(Where('
+                     + "EventDataset('tests/scalars_and_vectors_tree_file.root', 'tree'),"
+                     + ' lambda row: row.int_vector_branch.Count() * (1 + 1) > 0'
+                     + ' and row.int_vector_branch.Count() < 4),'
+                     + ' lambda row: (row.int_branch * row.int_vector_branch.Count(),'
+                     + ' row.int_vector_branch.Count()))')
+    python_ast = ast.parse(python_source)
+    assert ast_executor(python_ast).tolist() == [(-3, 3), (5, 1)]
+
+
+def test_ast_executor_schema():
+    python_source = ("Select(EventDataset('tests/scalars_and_vectors_tree_file.root', 'tree'),"
+                     + ' lambda row: (row.int_branch, row.int_vector_branch.Count()))')
+    python_ast = ast.parse(python_source)
+    assert ast_executor(python_ast, schema=True).tolist() == [(0, 0), (-1, 3), (5, 1)]
+    assert ast_executor(python_ast,
+                        schema={'int_branch': 'int32',
+                                'int_vector_branch': 'var * int32'}).tolist() == [(0, 0),
+                                                                                  (-1, 3),
+                                                                                  (5, 1)]
+
+
+def test_ast_executor_schema_type_error():
+    python_source = ("Select(EventDataset('tests/scalars_and_vectors_tree_file.root', 'tree'),"
+                     + ' lambda row: row.missing_branch)')
+    with pytest.raises(NameError):
+        ast_executor(ast.parse(python_source), schema=True)
+
+
+def test_ast_executor_where_pushdown():
+    python_source = ('Select(Where('
+                     + "EventDataset('tests/scalars_and_vectors_tree_file.root', 'tree'),"
+                     + ' lambda row: row.int_branch != 0),'
+                     + ' lambda row: row.int_vector_branch)')
+    python_ast = ast.parse(python_source)
+    assert ast_executor(python_ast).tolist() == [[-2, 3, 4], [6]]
+    assert [chunk.tolist()
+            for chunk in ast_executor(python_ast, step_size=2)] == [[[-2, 3, 4]], [[6]]]
+
+
+def test_ast_executor_step_size():
+    python_source = ("Select(EventDataset('tests/vectors_tree_file.root', 'tree'),"
+                     + ' lambda row: row.int_vector_branch)')
+    python_ast = ast.parse(python_source)
+    chunks = list(ast_executor(python_ast, step_size=2))
+    assert [chunk.tolist() for chunk in chunks] == [[[], [-1, 2, 3]], [[13]]]
+
+
+def test_ast_executor_step_size_where_selectmany():
+    python_source = ("Where(EventDataset('tests/scalars_and_vectors_tree_file.root', 'tree'),"
+                     + ' lambda row: row.int_branch >= 0)'
+                     + '.SelectMany(lambda row: row.int_vector_branch)')
+    python_ast = ast.parse(python_source)
+    chunks = list(ast_executor(python_ast, step_size=1))
+    assert [chunk.tolist() for chunk in chunks] == [[], [], [6]]
+
+
+def test_ast_executor_n_workers_threads():
+    python_source = ("Select(EventDataset(['tests/vectors_tree_file.root',"
+                     + " 'tests/scalars_and_vectors_tree_file.root'], 'tree'),"
+                     + ' lambda row: row.int_vector_branch)')
+    python_ast = ast.parse(python_source)
+    assert (ast_executor(python_ast, n_workers=2).tolist()
+            == [[], [-1, 2, 3], [13], [], [-2, 3, 4], [6]])
+
+
+def test_ast_executor_n_workers_processes():
+    python_source = ("Select(EventDataset(['tests/vectors_tree_file.root',"
+                     + " 'tests/scalars_and_vectors_tree_file.root']),"
+                     + ' lambda row: row.int_vector_branch)')
+    python_ast = ast.parse(python_source)
+    assert (ast_executor(python_ast, n_workers=2, use_processes=True).tolist()
+            == [[], [-1, 2, 3], [13], [], [-2, 3, 4], [6]])
+
+
+def test_ast_executor_n_workers_slice():
+    python_source = ("Select(EventDataset(['tests/scalars_tree_file.root',"
+                     + " 'tests/scalars_tree_file.root'], 'tree'),"
+                     + ' lambda row: row[1:3])')
+    python_ast = ast.parse(python_source)
+    assert (ast_executor(python_ast, n_workers=2, use_processes=True).long_branch.tolist()
+            == [0, -2, 0, -2])
+
+
+def test_ast_executor_n_workers_step_size():
+    python_source = ("Select(EventDataset(['tests/vectors_tree_file.root',"
+                     + " 'tests/scalars_and_vectors_tree_file.root'], 'tree'),"
+                     + ' lambda row: row.int_vector_branch)')
+    python_ast = ast.parse(python_source)
+    chunks = list(ast_executor(python_ast, step_size=2, n_workers=2))
+    assert ([chunk.tolist() for chunk in chunks]
+            == [[[], [-1, 2, 3]], [[13]], [[], [-2, 3, 4]], [[6]]])
+
+
+def test_ast_executor_n_workers_step_size_streams():
+    python_source = ("Select(EventDataset(['tests/vectors_tree_file.root',"
+                     + " 'tests/scalars_and_vectors_tree_file.root']),"
+                     + ' lambda row: row.int_vector_branch)')
+    python_ast = ast.parse(python_source)
+    chunks = ast_executor(python_ast, step_size=1, n_workers=2, use_processes=True)
+    assert isinstance(chunks, types.GeneratorType)
+    assert next(chunks).tolist() == [[]]
+    assert ([chunk.tolist() for chunk in chunks]
+            == [[[-1, 2, 3]], [[13]], [[]], [[-2, 3, 4]], [[6]]])
+
+
+def test_ast_executor_count():
+    python_source = "EventDataset('tests/scalars_tree_file.root', 'tree').Count()"
+    python_ast = ast.parse(python_source)
+    assert ast_executor(python_ast) == 2
+
+
+def test_ast_executor_sum_min_max():
+    python_source = ("Select(EventDataset('tests/vectors_tree_file.root', 'tree'),"
+                     + ' lambda row: row.int_vector_branch.{}())')
+    assert ast_executor(ast.parse(python_source.format('Count'))).tolist() == [0, 3, 1]
+    assert ast_executor(ast.parse(python_source.format('Sum'))).tolist() == [0, 4, 13]
+    assert ast_executor(ast.parse(python_source.format('Min'))).tolist() == [None, -1, 13]
+    assert ast_executor(ast.parse(python_source.format('Max'))).tolist() == [None, 3, 13]
+
+
+def test_ast_executor_aggregate_vector_branch():
+    python_source = ("Select(EventDataset('tests/vectors_tree_file.root', 'tree'),"
+                     + ' lambda row: row.int_vector_branch.Aggregate({}, lambda acc, x: {}))')
+    assert (ast_executor(ast.parse(python_source.format(10, 'acc + x'))).tolist()
+            == [10, 14, 23])
+    assert (ast_executor(ast.parse(python_source.format(2, 'x * acc'))).tolist()
+            == [2, -12, 26])
+    assert (ast_executor(ast.parse(python_source.format(0, 'max(acc, x)'))).tolist()
+            == [0, 3, 13])
+
+
+def test_ast_executor_top_level_sum_step_size():
+    python_source = ("SelectMany(EventDataset('tests/vectors_tree_file.root', 'tree'),"
+                     + ' lambda row: row.int_vector_branch).Sum()')
+    python_ast = ast.parse(python_source)
+    assert ast_executor(python_ast) == 17
+    assert ast_executor(python_ast, step_size=1) == 17
+
+
+def test_ast_executor_top_level_sum_of_lists():
+    python_source = ("Select(EventDataset(['tests/vectors_tree_file.root',"
+                     + " 'tests/scalars_and_vectors_tree_file.root'], 'tree'),"
+                     + ' lambda row: row.int_vector_branch).{}()')
+    for operation, expected in (('Sum', 28), ('Max', 13)):
+        python_ast = ast.parse(python_source.format(operation))
+        assert ast_executor(python_ast) == expected
+        assert ast_executor(python_ast, step_size=1) == expected
+        assert ast_executor(python_ast, n_workers=2) == expected
+
+
+def test_ast_executor_top_level_min_step_size():
+    python_source = ("SelectMany(EventDataset('tests/vectors_tree_file.root', 'tree'),"
+                     + ' lambda row: row.int_vector_branch).Min()')
+    python_ast = ast.parse(python_source)
+    assert ast_executor(python_ast) == -1
+    assert ast_executor(python_ast, step_size=1) == -1
+
+
+def test_ast_executor_top_level_aggregate_step_size():
+    python_source = ("SelectMany(EventDataset('tests/vectors_tree_file.root', 'tree'),"
+                     + ' lambda row: row.int_vector_branch)'
+                     + '.Aggregate(100, lambda acc, x: acc + x)')
+    python_ast = ast.parse(python_source)
+    assert ast_executor(python_ast) == 117
+    assert ast_executor(python_ast, step_size=1) == 117
+
+
+def test_ast_executor_top_level_aggregate_n_workers():
+    python_source = ("SelectMany(EventDataset(['tests/vectors_tree_file.root',"
+                     + " 'tests/scalars_and_vectors_tree_file.root'], 'tree'),"
+                     + ' lambda row: row.int_vector_branch)'
+                     + '.Aggregate(100, lambda acc, x: acc + x)')
+    python_ast = ast.parse(python_source)
+    assert ast_executor(python_ast) == 128
+    assert ast_executor(python_ast, n_workers=2) == 128
+
+
+def test_ast_executor_entry_range():
+    python_source = ("Select(EventDataset(['tests/vectors_tree_file.root',"
+                     + " 'tests/scalars_and_vectors_tree_file.root'], 'tree'),"
+                     + ' lambda row: row.int_vector_branch)')
+    python_ast = ast.parse(python_source)
+    assert (ast_executor(python_ast, entry_start=2, entry_stop=5).tolist()
+            == [[13], [], [-2, 3, 4]])
+    assert ast_executor(python_ast, entry_start=4).tolist() == [[-2, 3, 4], [6]]
+    assert ast_executor(python_ast, entry_stop=0).tolist() == []
+
+
+def test_ast_executor_take_skip():
+    python_source = ("Select(EventDataset(['tests/vectors_tree_file.root',"
+                     + " 'tests/scalars_and_vectors_tree_file.root'], 'tree'),"
+                     + ' lambda row: row.int_vector_branch).Skip(1).Take(3)')
+    python_ast = ast.parse(python_source)
+    assert ast_executor(python_ast).tolist() == [[-1, 2, 3], [13], []]
+    assert ast_executor(python_ast, entry_start=1).tolist() == [[13], [], [-2, 3, 4]]
+    chunks = list(ast_executor(python_ast, step_size=2))
+    assert [chunk.tolist() for chunk in chunks] == [[[-1, 2, 3], [13]], [[]]]
+
+
+def test_ast_executor_take_count():
+    python_source = "EventDataset('tests/vectors_tree_file.root', 'tree').Take(2).Count()"
+    python_ast = ast.parse(python_source)
+    assert ast_executor(python_ast) == 2
+    assert ast_executor(python_ast, step_size=1) == 2
+
+
+def test_ast_executor_take_after_where():
+    python_source = ("Where(EventDataset('tests/scalars_and_vectors_tree_file.root', 'tree'),"
+                     + ' lambda row: row.int_branch != -1)'
+                     + '.Select(lambda row: row.int_branch).Take(2)')
+    python_ast = ast.parse(python_source)
+    assert ast_executor(python_ast).tolist() == [0, 5]
+
+
+def test_ast_executor_histogram():
+    python_source = ("EventDataset(['tests/vectors_tree_file.root',"
+                     + " 'tests/scalars_and_vectors_tree_file.root'], 'tree')"
+                     + '.Histogram(lambda row: row.int_vector_branch, [-5, 0, 5, 15])')
+    python_ast = ast.parse(python_source)
+    assert ast_executor(python_ast).tolist() == [2, 4, 2]
+    assert ast_executor(python_ast, step_size=1).tolist() == [2, 4, 2]
+    assert ast_executor(python_ast, n_workers=2, step_size=1).tolist() == [2, 4, 2]
+
+
+def test_ast_executor_histogram_weights():
+    python_source = ("EventDataset('tests/scalars_and_vectors_tree_file.root', 'tree')"
+                     + '.Histogram(lambda row: row.int_vector_branch, 3, 0, 9,'
+                     + ' lambda row: row.int_branch)')
+    python_ast = ast.parse(python_source)
+    assert ast_executor(python_ast).tolist() == [0, -2, 5]
+    assert ast_executor(python_ast, step_size=2).tolist() == [0, -2, 5]
+
+
+def test_ast_executor_order_by_vector_branch():
+    python_source = ("Select(EventDataset('tests/scalars_and_vectors_tree_file.root', 'tree'),"
+                     + ' lambda row: row.int_vector_branch.{})')
+    assert (ast_executor(ast.parse(python_source.format('OrderByDescending(lambda x: x)')))
+            .tolist() == [[], [4, 3, -2], [6]])
+    assert (ast_executor(ast.parse(python_source.format('OrderBy(lambda x: x).Take(2)')))
+            .tolist() == [[], [-2, 3], [6]])
+
+
+def test_ast_executor_top_k():
+    python_source = ("Select(EventDataset(['tests/vectors_tree_file.root',"
+                     + " 'tests/scalars_and_vectors_tree_file.root'], 'tree'),"
+                     + ' lambda row: row.int_vector_branch.Sum())'
+                     + '.OrderByDescending(lambda total: total)')
+    python_ast = ast.parse(python_source + '.Take(3)')
+    assert ast_executor(python_ast).tolist() == [13, 6, 5]
+    assert ast_executor(python_ast, step_size=1).tolist() == [13, 6, 5]
+    assert ast_executor(python_ast, n_workers=2, step_size=1).tolist() == [13, 6, 5]
+    python_ast = ast.parse(python_source)
+    assert ast_executor(python_ast, step_size=1).tolist() == [13, 6, 5, 4, 0, 0]
+
+
+def test_ast_executor_take_after_where_chunks():
+    dataset_source = "EventDataset('tests/scalars_and_vectors_tree_file.root', 'tree')"
+    for python_source in [dataset_source + '.Where(lambda row: row.int_branch != -1)'
+                          + '.Select(lambda row: row.int_branch).Take(1)',
+                          dataset_source + '.Where(lambda row: row.int_branch != -1).Skip(1)',
+                          dataset_source + '.Where(lambda row: row.int_branch != 0).First()',
+                          dataset_source + '.Where(lambda row: row.int_branch != 0)'
+                          + '.Take(1).Count()']:
+        with pytest.raises(ValueError):
+            ast_executor(ast.parse(python_source), step_size=1)
+    python_source = dataset_source + '.Select(lambda row: row.int_branch).Take(2).Count()'
+    assert ast_executor(ast.parse(python_source), step_size=1) == 2
+
+
+def test_ast_executor_ordered_projection_chunks():
+    dataset_source = ("EventDataset(['tests/vectors_tree_file.root',"
+                      + " 'tests/scalars_and_vectors_tree_file.root'], 'tree')"
+                      + '.OrderByDescending(lambda row: row.int_vector_branch.Sum())')
+    for query_source, expected in [('.Select(lambda row: row.int_vector_branch).Take(2)',
+                                    [[13], [6]]),
+                                   ('.Take(2).Select(lambda row: row.int_vector_branch.Count())',
+                                    [1, 1]),
+                                   ('.Select(lambda row: row.int_vector_branch.Sum())',
+                                    [13, 6, 5, 4, 0, 0])]:
+        python_ast = ast.parse(dataset_source + query_source)
+        assert ast_executor(python_ast).tolist() == expected
+        assert ast_executor(python_ast, step_size=1).tolist() == expected
+        assert ast_executor(python_ast, n_workers=2, step_size=1).tolist() == expected
+    with pytest.raises(ValueError):
+        ast_executor(ast.parse(dataset_source + '.Take(2).Count()'), step_size=1)
+
+
+def test_ast_executor_first():
+    python_source = ("Select(EventDataset('tests/vectors_tree_file.root', 'tree'),"
+                     + ' lambda row: row.int_vector_branch).Skip(1).First()')
+    python_ast = ast.parse(python_source)
+    assert ast_executor(python_ast).tolist() == [-1, 2, 3]
+
+
+def test_ast_executor_nested_take_skip_first():
+    python_source = ("Select(EventDataset('tests/vectors_tree_file.root', 'tree'),"
+                     + ' lambda row: row.int_vector_branch.{})')
+    assert ast_executor(ast.parse(python_source.format('Take(2)'))).tolist() == [[], [-1, 2], [13]]
+    assert ast_executor(ast.parse(python_source.format('Skip(1)'))).tolist() == [[], [2, 3], []]
+    assert ast_executor(ast.parse(python_source.format('First()'))).tolist() == [None, -1, 13]
+
+
+def test_ast_executor_output_root(tmp_path):
+    python_source = ("Select(EventDataset('tests/scalars_and_vectors_tree_file.root', 'tree'),"
+                     + " lambda row: {'ints': row.int_branch, 'vectors': row.int_vector_branch})")
+    python_ast = ast.parse(python_source)
+    path = str(tmp_path / 'output.root')
+    assert ast_executor(python_ast, output='root', output_path=path, step_size=1) == path
+    with uproot.open(path) as root_file:
+        assert root_file['tree']['ints'].array().tolist() == [0, -1, 5]
+        assert root_file['tree']['vectors'].array().tolist() == [[], [-2, 3, 4], [6]]
+
+
+def test_ast_executor_output_root_top_k(tmp_path):
+    python_source = ("EventDataset('tests/scalars_tree_file.root', 'tree')"
+                     + '.OrderByDescending(lambda row: row.int_branch).Take(1)'
+                     + '.Select(lambda row: row.int_branch)')
+    python_ast = ast.parse(python_source)
+    path = str(tmp_path / 'output.root')
+    assert ast_executor(python_ast, output='root', output_path=path, step_size=1) == path
+    with uproot.open(path) as root_file:
+        assert root_file['tree']['value'].array().tolist() == [0]
+
+
+def test_ast_executor_output_root_n_workers(tmp_path):
+    python_source = ("Select(EventDataset(['tests/vectors_tree_file.root',"
+                     + " 'tests/scalars_and_vectors_tree_file.root'], 'tree'),"
+                     + ' lambda row: row.int_vector_branch)')
+    python_ast = ast.parse(python_source)
+    path = str(tmp_path / 'output.root')
+    assert ast_executor(python_ast, output='root', output_path=path, step_size=2,
+                        n_workers=2) == path
+    with uproot.open(path) as root_file:
+        assert (root_file['tree']['value'].array().tolist()
+                == [[], [-1, 2, 3], [13], [], [-2, 3, 4], [6]])
+
+
+def test_ast_executor_output_parquet(tmp_path):
+    parquet = pytest.importorskip('pyarrow.parquet')
+    python_source = ("Select(EventDataset('tests/vectors_tree_file.root', 'tree'),"
+                     + ' lambda row: row.int_vector_branch)')
+    python_ast = ast.parse(python_source)
+    path = str(tmp_path / 'output.parquet')
+    ast_executor(python_ast, output='parquet', output_path=path, row_group_size=2)
+    assert parquet.read_table(path).column('').to_pylist() == [[], [-1, 2, 3], [13]]
+    assert parquet.ParquetFile(path).num_row_groups == 2
+
+
+def test_ast_executor_output_reduction(tmp_path):
+    python_source = "EventDataset('tests/vectors_tree_file.root', 'tree').Count()"
+    python_ast = ast.parse(python_source)
+    with pytest.raises(ValueError):
+        ast_executor(python_ast, output='root', output_path=str(tmp_path / 'output.root'))
+
+
+def test_ast_executor_profiler():
+    python_source = ("EventDataset('tests/vectors_tree_file.root', 'tree')"
+                     + '.Where(lambda row: row.int_vector_branch.Count() > 0)'
+                     + '.Select(lambda row: row.int_vector_branch.Where(lambda x: x > 0))')
+    python_ast = ast.parse(python_source)
+    profiler = QueryProfiler(trace_memory=False)
+    assert ast_executor(python_ast, profiler=profiler).tolist() == [[2, 3], [13]]
+    report = profiler.report()
+    assert 'translation' in report['stages']
+    assert 'read' in report['stages']
+    assert 'total' in report['stages']
+    where_nodes = [node for node in report['nodes']
+                   if node['operator'] == 'Where' and node['depth'] == 0]
+    assert where_nodes[0]['events_in'] == 3
+    assert where_nodes[0]['events_out'] == 2
+    assert report['branches']['int_vector_branch']['bytes'] > 0
+
+
+def test_ast_executor_profiler_count_branches():
+    python_source = ("EventDataset('tests/scalars_tree_file.root', 'tree')"
+                     + '.Where(lambda row: row.int_branch < 0).Count()')
+    python_ast = ast.parse(python_source)
+    profiler = QueryProfiler(trace_memory=False)
+    assert ast_executor(python_ast, profiler=profiler) == 1
+    assert list(profiler.report()['branches']) == ['int_branch']
+
+
+def test_ast_executor_count_reads_no_branches():
+    python_source = "EventDataset('tests/scalars_tree_file.root', 'tree').Count()"
+    python_ast = ast.parse(python_source)
+    for step_size in (None, 1, '1 MB'):
+        profiler = QueryProfiler(trace_memory=False)
+        assert ast_executor(python_ast, step_size=step_size, profiler=profiler) == 2
+        assert len(profiler.report()['branches']) == 0
+    assert ast_executor(python_ast) == 2
+    assert ast_executor(python_ast, step_size=1) == 2
+
+
+def test_ast_executor_count_n_workers():
+    python_source = ("EventDataset(['tests/scalars_tree_file.root',"
+                     + " 'tests/scalars_and_vectors_tree_file.root'], 'tree').Count()")
+    assert ast_executor(ast.parse(python_source), n_workers=2) == 5
+
+
+def test_ast_executor_profiler_step_size():
+    python_source = ("Select(EventDataset('tests/vectors_tree_file.root', 'tree'),"
+                     + ' lambda row: row.int_vector_branch)')
+    python_ast = ast.parse(python_source)
+    profiler = QueryProfiler(trace_memory=False)
+    chunks = list(ast_executor(python_ast, step_size=1, profiler=profiler))
+    assert len(chunks) == 3
+    assert 'total' in profiler.report()['stages']
+
+
+def test_ast_executor_fused_select_where_chain():
+    python_source = ("EventDataset('tests/scalars_and_vectors_tree_file.root', 'tree')"
+                     + '.Where(lambda row: row.int_vector_branch.Count() > 0)'
+                     + ".Select(lambda row: {'n': row.int_branch, 'v': row.int_vector_branch})"
+                     + '.Where(lambda r: r.v.Count() > 1)'
+                     + '.Select(lambda r: r.n + r.v.Count())')
+    python_ast = ast.parse(python_source)
+    assert ast_executor(python_ast).tolist() == [2]
+
+
+def test_ast_executor_non_finite_constant():
+    python_source = ("EventDataset('tests/scalars_tree_file.root', 'tree')"
+                     + '.Select(lambda row: row.int_branch * (1e308 * 10))')
+    python_ast = ast.parse(python_source)
+    result = ast_executor(python_ast).tolist()
+    assert math.isnan(result[0])
+    assert result[1] == float('-inf')
+
+
+def test_ast_executor_where_chain_with_empty_max():
+    python_source = ("EventDataset('tests/scalars_and_vectors_tree_file.root', 'tree')"
+                     + '.Where(lambda row: row.int_vector_branch.Count() > 0)'
+                     + '.Where(lambda row: row.int_vector_branch.Max() > 3)'
+                     + '.Select(lambda row: row.int_vector_branch)')
+    python_ast = ast.parse(python_source)
+    assert ast_executor(python_ast).tolist() == [[-2, 3, 4], [6]]
+
+
+def test_ast_executor_numba_backend(tmp_path, monkeypatch):
+    pytest.importorskip('numba')
+    monkeypatch.setattr(kernel_cache, 'directory', str(tmp_path))
+    python_source = ("EventDataset('tests/scalars_and_vectors_tree_file.root', 'tree')"
+                     + '.Where(lambda row: max(row.int_branch, 0) == 0)'
+                     + ".Select(lambda row: {'sign': 1 if row.int_branch > 0 else -1,"
+                     + " 'v': row.int_vector_branch.Select(lambda x: x if x > 0"
+                     + ' else row.int_branch)})')
+    python_ast = ast.parse(python_source)
+    assert ast_executor(python_ast, backend='numba').tolist() == [{'sign': -1, 'v': []},
+                                                                  {'sign': -1,
+                                                                   'v': [-1, 3, 4]}]
+
+
+def test_ast_executor_file_source():
+    python_source = ("EventDataset('tests/scalars_tree_file.root', 'tree')"
+                     + '.Select(lambda row: row.int_branch)')
+    python_ast = ast.parse(python_source)
+    for file_source in ('memmap', 'file'):
+        assert ast_executor(python_ast, file_source=file_source,
+                            read_options={'num_workers': 2}).tolist() == [0, -1]
+        assert [chunk.tolist() for chunk in ast_executor(python_ast, step_size=1,
+                                                         file_source=file_source)] == [[0], [-1]]
+    with pytest.raises(ValueError):
+        ast_executor(python_ast, file_source='mmap')
+
+
+def test_ast_executor_unknown_backend():
+    python_source = "EventDataset('tests/scalars_tree_file.root', 'tree')"
+    python_ast = ast.parse(python_source)
+    with pytest.raises(ValueError):
+        ast_executor(python_ast, backend='cuda')
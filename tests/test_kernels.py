@@ -0,0 +1,64 @@
+import ast
+import os
+import stat
+
+import pytest
+
+import awkward as ak
+
+from func_adl_uproot.kernels import KernelCache, kernel_source, needs_kernel
+
+
+def expression(source):
+    return ast.parse(source, mode='eval').body
+
+
+def test_needs_kernel():
+    assert needs_kernel(expression('a if b else c'))
+    assert needs_kernel(expression('max(e.x, 0) + 1'))
+    assert not needs_kernel(expression('e.x * 2 > 1'))
+
+
+def test_kernel_source():
+    source, leaves = kernel_source(expression('e.x * 2 if e.x > j.y else abs(e.x)'))
+    assert source.endswith('def kernel(field0, field1):\n'
+                           + '    return ((field0 * 2) if (field0 > field1) else abs(field0))\n')
+    assert [ast.dump(leaf) for leaf in leaves] == [ast.dump(expression('e.x')),
+                                                   ast.dump(expression('j.y'))]
+
+
+def test_no_kernel_source():
+    assert kernel_source(expression('e.x * 2')) is None
+    assert kernel_source(expression("e.x if e.y else 'a'")) is None
+    assert kernel_source(expression('e.x.Count() if e.y else 0')) is None
+    assert kernel_source(expression('max(1, 2)')) is None
+
+
+def test_kernel_cache(tmp_path):
+    pytest.importorskip('numba')
+    kernel_cache = KernelCache(str(tmp_path))
+    source, _ = kernel_source(expression('x * 2 if x > 1 else -x'))
+    kernel = kernel_cache.get(source)
+    assert kernel_cache.get(source) is kernel
+    assert kernel(ak.Array([[1, 2], [], [3]])).tolist() == [[-1, 4], [], [6]]
+    assert len(list(tmp_path.iterdir())) >= 1
+
+
+def test_kernel_cache_rewrites_modified_module(tmp_path):
+    pytest.importorskip('numba')
+    source, _ = kernel_source(expression('x * 2 if x > 1 else -x'))
+    KernelCache(str(tmp_path)).get(source)
+    for path in tmp_path.glob('*.py'):
+        path.write_text(u'kernel = None\n')
+    kernel = KernelCache(str(tmp_path)).get(source)
+    assert kernel(ak.Array([1, 2])).tolist() == [-1, 4]
+
+
+def test_kernel_cache_directory_permissions(tmp_path):
+    pytest.importorskip('numba')
+    if os.name != 'posix':
+        pytest.skip('POSIX permissions are required')
+    directory = tmp_path / 'kernels'
+    source, _ = kernel_source(expression('x * 3 if x > 1 else -x'))
+    KernelCache(str(directory)).get(source)
+    assert stat.S_IMODE(directory.stat().st_mode) & 0o077 == 0
@@ -0,0 +1,88 @@
+import os
+import shutil
+
+import pytest
+import uproot
+
+from func_adl_uproot.metadata import MetadataCache, find_tree_name, num_entries
+
+
+def test_tree_metadata():
+    cache = MetadataCache()
+    metadata = cache.tree_metadata('tests/scalars_and_vectors_tree_file.root', 'tree')
+    assert metadata.num_entries == 3
+    assert metadata.branches == ('int_branch', 'int_vector_branch')
+    assert metadata.entry_offsets[0] == 0
+    assert metadata.entry_offsets[-1] == 3
+
+
+def test_tree_schema():
+    cache = MetadataCache()
+    schema = cache.tree_schema('tests/scalars_tree_file.root', 'tree')
+    assert list(schema.fields.keys())[:2] == ['int_branch', 'long_branch']
+    assert cache.tree_schema('tests/scalars_tree_file.root', 'tree') is schema
+
+
+def test_metadata_cache_hit():
+    cache = MetadataCache()
+    assert cache.tree_names('tests/scalars_tree_file.root') == ('tree',)
+    assert cache.tree_names('tests/scalars_tree_file.root') == ('tree',)
+    assert cache.tree_metadata('tests/scalars_tree_file.root', 'tree;1').num_entries == 2
+    assert cache.tree_metadata('tests/scalars_tree_file.root', 'tree').num_entries == 2
+    info = cache.info()
+    assert info.hits == 2
+    assert info.misses == 2
+    assert info.currsize == 2
+
+
+def test_metadata_cache_eviction():
+    cache = MetadataCache(maxsize=1)
+    cache.tree_names('tests/scalars_tree_file.root')
+    cache.tree_names('tests/vectors_tree_file.root')
+    cache.tree_names('tests/scalars_tree_file.root')
+    info = cache.info()
+    assert info.hits == 0
+    assert info.misses == 3
+    assert info.currsize == 1
+
+
+def test_metadata_cache_invalidated_by_modification(tmp_path):
+    path = str(tmp_path / 'tree_file.root')
+    shutil.copy('tests/scalars_tree_file.root', path)
+    cache = MetadataCache()
+    assert cache.tree_metadata(path, 'tree').num_entries == 2
+    shutil.copy('tests/scalars_and_vectors_tree_file.root', path)
+    os.utime(path, (0, 0))
+    assert cache.tree_metadata(path, 'tree').num_entries == 3
+    assert cache.info().misses == 2
+
+
+def test_metadata_cache_negative_size():
+    with pytest.raises(ValueError):
+        MetadataCache(maxsize=-1)
+
+
+def test_find_tree_name():
+    assert find_tree_name('tests/vectors_tree_file.root') == 'tree'
+
+
+def test_num_entries():
+    assert num_entries('tests/vectors_tree_file.root', 'tree') == 3
+
+
+def test_metadata_uproot_options(monkeypatch):
+    open_options = []
+    uproot_open = uproot.open
+
+    def recording_open(path, **options):
+        open_options.append(options)
+        return uproot_open(path, **options)
+
+    monkeypatch.setattr(uproot, 'open', recording_open)
+    uproot_options = {'file_handler': uproot.MemmapSource}
+    cache = MetadataCache()
+    assert cache.tree_names('tests/scalars_tree_file.root', uproot_options) == ('tree',)
+    assert cache.tree_metadata('tests/scalars_tree_file.root', 'tree',
+                               uproot_options).num_entries == 2
+    cache.tree_schema('tests/scalars_tree_file.root', 'tree', uproot_options)
+    assert open_options == [uproot_options] * 3
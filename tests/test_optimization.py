@@ -0,0 +1,152 @@
+import ast
+
+import qastle
+
+from func_adl_uproot.optimization import (eliminate_common_subexpressions, fold_constants,
+                                          fuse_linq_operators, optimize)
+
+
+def assert_folded(initial_source, final_source):
+    python_ast = fold_constants(ast.parse(initial_source))
+    assert ast.dump(python_ast) == ast.dump(ast.parse(final_source))
+
+
+def assert_fused(initial_source, final_source):
+    python_ast = fuse_linq_operators(qastle.insert_linq_nodes(ast.parse(initial_source)))
+    assert ast.dump(python_ast) == ast.dump(qastle.insert_linq_nodes(ast.parse(final_source)))
+
+
+def count_nodes(python_ast, node_type):
+    return len([node for node in ast.walk(python_ast) if isinstance(node, node_type)])
+
+
+def test_fold_arithmetic():
+    assert_folded('1 + 2 * 3', '7')
+    assert_folded('-(2 - 5)', '3')
+    assert_folded('x + 2 * 3', 'x + 6')
+    assert_folded('2 ** 0.5', repr(2 ** 0.5))
+
+
+def test_no_fold_non_finite():
+    assert_folded('x * (1e308 * 10)', 'x * (1e308 * 10)')
+    assert_folded('1e308 * 10 - 1e308 * 10', '1e308 * 10 - 1e308 * 10')
+    assert_folded('-(1e308 * 10)', '-(1e308 * 10)')
+
+
+def test_fold_comparisons_and_booleans():
+    assert_folded('1 < 2 < 3', 'True')
+    assert_folded('x and (1 > 2)', 'x and False')
+    assert_folded('not (1 == 1)', 'False')
+    assert_folded('True or False', 'True')
+    assert_folded("'a' == 'a'", 'True')
+
+
+def test_fold_conditional():
+    assert_folded('x if 2 > 1 else y', 'x')
+    assert_folded('x if 0 else y', 'y')
+
+
+def test_no_fold():
+    assert_folded('1 / 0', '1 / 0')
+    assert_folded('2 ** 1000', '2 ** 1000')
+    assert_folded("'a' * 3", "'a' * 3")
+    assert_folded('x + y', 'x + y')
+
+
+def test_eliminate_common_subexpressions():
+    python_ast = eliminate_common_subexpressions(
+        qastle.insert_linq_nodes(ast.parse('lambda e: (e.a * e.b) + (e.a * e.b) / 2')))
+    assert count_nodes(python_ast, ast.BinOp) == 3
+    assert count_nodes(python_ast, ast.Lambda) == 2
+
+
+def test_eliminate_nested_common_subexpressions():
+    python_ast = eliminate_common_subexpressions(
+        ast.parse('lambda e: (abs(e.a + 1), abs(e.a + 1), e.a + 1)'))
+    assert count_nodes(python_ast, ast.Call) == 3
+    assert count_nodes(python_ast, ast.BinOp) == 1
+
+
+def test_eliminate_common_subexpressions_in_inner_lambda():
+    python_ast = eliminate_common_subexpressions(
+        ast.parse('lambda e: (lambda x: (x * 2, x * 2))(e)'))
+    outer_lambda = python_ast.body[0].value
+    assert not getattr(outer_lambda.body.func, 'is_binding', False)
+    assert getattr(outer_lambda.body.func.body.func, 'is_binding', False)
+
+
+def test_eliminate_common_subexpressions_avoids_used_names():
+    python_ast = eliminate_common_subexpressions(ast.parse('lambda _cse0: -_cse0 + -_cse0'))
+    assert '_cse1' in [node.id for node in ast.walk(python_ast) if isinstance(node, ast.Name)]
+
+
+def test_no_common_subexpressions():
+    python_source = 'lambda e: e.a + e.b'
+    python_ast = eliminate_common_subexpressions(ast.parse(python_source))
+    assert ast.dump(python_ast) == ast.dump(ast.parse(python_source))
+
+
+def test_common_subexpressions_distinguish_constant_types():
+    python_source = 'lambda e: (e.a + 1, e.a + 1.0, e.a + True)'
+    python_ast = eliminate_common_subexpressions(ast.parse(python_source))
+    assert ast.dump(python_ast) == ast.dump(ast.parse(python_source))
+
+
+def test_eliminate_many_common_subexpressions():
+    terms = ['(abs(e.a * ' + str(i) + ') + abs(e.a * ' + str(i) + '))' for i in range(50)]
+    python_ast = eliminate_common_subexpressions(ast.parse('lambda e: ' + ' + '.join(terms)))
+    assert len([node for node in ast.walk(python_ast)
+                if isinstance(node, ast.Name) and node.id == 'abs']) == 50
+
+
+def test_optimize():
+    python_ast = optimize(ast.parse('lambda e: abs(e.a * (1 + 1)) + abs(e.a * 2)'))
+    assert count_nodes(python_ast, ast.Lambda) == 2
+    assert count_nodes(python_ast, ast.Call) == 2
+
+
+def test_fuse_wheres():
+    assert_fused('data.Where(lambda e: e.x > 0).Where(lambda f: f.y < 1)',
+                 'data.Where(lambda e: e.x > 0 and e.y < 1)')
+    assert_fused('data.Where(lambda e: e.x > 0 and e.z).Where(lambda f: f.y < 1)',
+                 'data.Where(lambda e: e.x > 0 and e.z and e.y < 1)')
+
+
+def test_fuse_selects():
+    assert_fused("data.Select(lambda e: {'a': e.x, 'b': e.y}).Select(lambda r: r.a + r['b'])",
+                 'data.Select(lambda e: e.x + e.y)')
+    assert_fused('data.Select(lambda e: (e.x, e.y)).Select(lambda r: r[1])',
+                 'data.Select(lambda e: e.y)')
+    assert_fused("data.Select(lambda e: {'a': e.x, 'b': e.y}).Select(lambda r: r[1])",
+                 'data.Select(lambda e: e.y)')
+    assert_fused("data.Select(lambda e: {'a': e.x}).Select(lambda r: r)",
+                 "data.Select(lambda e: {'a': e.x})")
+
+
+def test_fuse_where_after_select():
+    assert_fused("data.Where(lambda e: e.x > 0).Select(lambda e: {'a': e.y})"
+                 + '.Where(lambda r: r.a < 1).Select(lambda r: r.a)',
+                 'data.Where(lambda e: e.x > 0 and e.y < 1).Select(lambda e: e.y)')
+
+
+def test_no_fuse_where_after_computed_select():
+    assert_fused('data.Select(lambda e: e.x * 2).Where(lambda r: r > 1)',
+                 'data.Select(lambda e: e.x * 2).Where(lambda r: r > 1)')
+    assert_fused("data.Select(lambda e: {'a': e.x.Count(), 'b': e.y}).Where(lambda r: r.a > 1)",
+                 "data.Select(lambda e: {'a': e.x.Count(), 'b': e.y}).Where(lambda r: r.a > 1)")
+    assert_fused("data.Select(lambda e: {'a': e.x.Count(), 'b': e.y}).Where(lambda r: r.b > 1)",
+                 "data.Where(lambda e: e.y > 1).Select(lambda e: {'a': e.x.Count(), 'b': e.y})")
+
+
+def test_no_fuse_wheres_with_index():
+    assert_fused('data.Where(lambda e: e.jets.Count() > 0).Where(lambda e: e.jets[0] > 1)',
+                 'data.Where(lambda e: e.jets.Count() > 0).Where(lambda e: e.jets[0] > 1)')
+    assert_fused('data.Where(lambda e: e.jets.Count() > 0).Where(lambda e: e.jets.First() > 1)',
+                 'data.Where(lambda e: e.jets.Count() > 0).Where(lambda e: e.jets.First() > 1)')
+    assert_fused('data.Where(lambda e: e.jets.Count() > 0).Where(lambda e: e.jets.Max() > 1)',
+                 'data.Where(lambda e: e.jets.Count() > 0).Where(lambda e: e.jets.Max() > 1)')
+
+
+def test_no_fuse_with_name_capture():
+    assert_fused('data.Select(lambda e: e.x).Select(lambda r: r.Select(lambda e: e + r))',
+                 'data.Select(lambda e: e.x).Select(lambda r: r.Select(lambda e: e + r))')
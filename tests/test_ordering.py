@@ -0,0 +1,37 @@
+import awkward as ak
+import numpy as np
+
+from func_adl_uproot.executor import reduce_partial_results
+from func_adl_uproot.ordering import _partial_argsort, top_k_indices, top_k_partial
+
+
+def test_top_k_indices_jagged_matches_partial_sort():
+    rows = [[3, 1, 2, 1, 5], [], [4], [2, 2, 7, 0, 2, 9], [1, 8]]
+    keys = ak.Array(rows)
+    for count in range(0, 7):
+        for ascending in (True, False):
+            indices = top_k_indices(keys, count, 1, ascending).tolist()
+            for row, row_indices in zip(rows, indices):
+                values = np.asarray(row, dtype=np.int64)
+                if count < len(values):
+                    expected = _partial_argsort(values, count, ascending).tolist()
+                else:
+                    expected = ak.argsort(values, ascending=ascending).tolist()
+                assert row_indices == expected
+
+
+def test_top_k_indices_flat_matches_full_sort():
+    values = np.array([3, 1, 2, 1, 5, 2, 2, 0])
+    for count in range(0, len(values)):
+        for ascending in (True, False):
+            expected = ak.argsort(values, ascending=ascending).tolist()[:count]
+            assert top_k_indices(ak.Array(values), count, 0, ascending).tolist() == expected
+
+
+def test_merge_top_k_without_count():
+    chunks = [np.array([3, 1, 2]), np.array([1, 5]), np.array([2, 0, 4]), np.array([1])]
+    partials = [top_k_partial(ak.Array(chunk * 10), ak.Array(chunk), None, False)
+                for chunk in chunks]
+    result = reduce_partial_results((('top_k', None, False), None), partials)
+    expected = -np.sort(-np.concatenate(chunks), kind='stable') * 10
+    assert result.tolist() == expected.tolist()
@@ -0,0 +1,95 @@
+import ast
+import json
+import pickle
+
+import pytest
+import uproot
+
+from func_adl_uproot import ast_executor
+from func_adl_uproot.planning import (WorkUnit, cluster_bytes, merge_work_unit_results,
+                                      plan_work_units, run_work_unit)
+
+from benchmarks.ntuples import generate_ntuple
+
+
+@pytest.fixture
+def ntuple_path(tmp_path):
+    return generate_ntuple(str(tmp_path / 'flat.root'), 'flat', 100, 2, chunk_size=25)
+
+
+def test_plan_work_units_target_events(ntuple_path):
+    python_ast = ast.parse("EventDataset('" + ntuple_path + "', 'tree')")
+    work_units = plan_work_units(python_ast, target_events=40)
+    assert [(work_unit.entry_start, work_unit.entry_stop)
+            for work_unit in work_units] == [(0, 50), (50, 100)]
+    assert all(work_unit.path == ntuple_path and work_unit.tree_name == 'tree'
+               for work_unit in work_units)
+
+
+def test_plan_work_units_target_bytes(ntuple_path):
+    python_ast = ast.parse("EventDataset('" + ntuple_path + "', 'tree')"
+                           + '.Select(lambda e: e.flat_0)')
+    n_bytes = cluster_bytes(ntuple_path, 'tree', ['flat_0'], [0, 25, 50, 75, 100])
+    assert len(n_bytes) == 4
+    work_units = plan_work_units(python_ast, target_bytes=n_bytes[0] + 1)
+    assert [(work_unit.entry_start, work_unit.entry_stop)
+            for work_unit in work_units] == [(0, 50), (50, 100)]
+    assert len(plan_work_units(python_ast)) == 1
+
+
+def test_plan_work_units_file_source(ntuple_path, monkeypatch):
+    open_options = []
+    uproot_open = uproot.open
+
+    def recording_open(path, **options):
+        open_options.append(options)
+        return uproot_open(path, **options)
+
+    monkeypatch.setattr(uproot, 'open', recording_open)
+    python_ast = ast.parse("EventDataset('" + ntuple_path + "')")
+    work_units = plan_work_units(python_ast, target_bytes=1, file_source='memmap')
+    assert len(work_units) == 4
+    assert len(open_options) == 3
+    assert all(options['file_handler'] is uproot.MemmapSource for options in open_options)
+
+
+def test_plan_work_units_multiple_files():
+    python_ast = ast.parse("EventDataset(['tests/scalars_tree_file.root',"
+                           + " 'tests/scalars_tree_file.root'], 'tree')")
+    assert len(plan_work_units(python_ast, target_events=1)) == 2
+
+
+def test_plan_work_units_invalid():
+    with pytest.raises(ValueError):
+        plan_work_units(ast.parse("EventDataset('tests/scalars_tree_file.root', 'tree')"
+                                  + '.Take(1)'))
+    with pytest.raises(ValueError):
+        plan_work_units(ast.parse("EventDataset('tests/scalars_tree_file.root', 'tree')"),
+                        target_events=0)
+
+
+def test_run_and_merge_work_units(ntuple_path):
+    python_source = ("EventDataset('" + ntuple_path + "', 'tree')"
+                     + '.Where(lambda e: e.flat_0 > 0).Select(lambda e: e.flat_1)')
+    work_units = plan_work_units(ast.parse(python_source), target_events=25)
+    assert len(work_units) == 4
+    results = [run_work_unit(pickle.loads(pickle.dumps(work_unit))) for work_unit in work_units]
+    merged = merge_work_unit_results(work_units[0].query, results)
+    assert merged.tolist() == ast_executor(ast.parse(python_source)).tolist()
+
+
+def test_run_and_merge_work_units_reduction(ntuple_path):
+    python_source = "EventDataset('" + ntuple_path + "', 'tree').Count()"
+    work_units = plan_work_units(ast.parse(python_source), target_events=30)
+    results = [run_work_unit(json.loads(json.dumps(work_unit))) for work_unit in work_units]
+    assert merge_work_unit_results(work_units[0].query, results) == 100
+    assert isinstance(WorkUnit(*json.loads(json.dumps(work_units[0]))), WorkUnit)
+
+
+def test_run_and_merge_work_units_top_k(ntuple_path):
+    python_source = ("EventDataset('" + ntuple_path + "', 'tree')"
+                     + '.Select(lambda e: e.flat_0).OrderByDescending(lambda x: x).Take(5)')
+    work_units = plan_work_units(ast.parse(python_source), target_events=25)
+    results = [run_work_unit(work_unit) for work_unit in work_units]
+    merged = merge_work_unit_results(work_units[0].query, results)
+    assert merged.tolist() == ast_executor(ast.parse(python_source)).tolist()
@@ -0,0 +1,76 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import awkward as ak
+
+import uproot
+
+import func_adl_uproot
+from func_adl_uproot.profiling import QueryProfiler, count_elements
+
+
+def test_query_profiler_exported():
+    assert func_adl_uproot.QueryProfiler is QueryProfiler
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason='Submodules are imported eagerly')
+def test_query_profiler_export_is_lazy():
+    script = ('import sys, func_adl_uproot\n'
+              + 'func_adl_uproot.QueryProfiler\n'
+              + "print(' '.join(sorted(sys.modules)))\n")
+    project_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.check_output([sys.executable, '-c', script], cwd=project_directory,
+                                     universal_newlines=True)
+    module_names = output.split()
+    assert 'func_adl_uproot.profiling' in module_names
+    assert 'func_adl_uproot.translation' not in module_names
+    assert 'QueryProfiler' in func_adl_uproot.__all__
+
+
+def test_count_elements():
+    array = ak.Array([[1, 2], [], [3]])
+    assert count_elements(array, 0) == 3
+    assert count_elements(array, 1) == 3
+
+
+def test_profiler_call_self_time():
+    profiler = QueryProfiler(trace_memory=False)
+    result = profiler.call(0, 'Select', 0,
+                           lambda: profiler.call(1, 'Where', 1, lambda x: x + 1, 1))
+    assert result == 2
+    report = profiler.report()
+    assert [node['operator'] for node in report['nodes']] == ['Where', 'Select']
+    assert report['nodes'][1]['self_time'] <= report['nodes'][1]['time']
+    assert report['nodes'][0]['calls'] == 1
+
+
+def test_profiler_filter_counts():
+    profiler = QueryProfiler(trace_memory=False)
+    events = ak.Array([1, 2, 3, 4])
+    result = profiler.filter(0, 0, events, lambda e: e[e > 2])
+    assert result.tolist() == [3, 4]
+    assert profiler.nodes[0]['events_in'] == 4
+    assert profiler.nodes[0]['events_out'] == 2
+
+
+def test_profiler_record_read():
+    profiler = QueryProfiler(trace_memory=False)
+    with uproot.open('tests/scalars_tree_file.root') as root_file:
+        profiler.record_read(root_file['tree'], ['int_branch'], None, None)
+    assert profiler.branches['int_branch']['baskets'] == 1
+    assert profiler.branches['int_branch']['bytes'] > 0
+
+
+def test_profiler_report_json():
+    profiler = QueryProfiler()
+    profiler.start()
+    with profiler.stage('read'):
+        pass
+    profiler.stop()
+    report = json.loads(profiler.to_json())
+    assert set(report['stages'].keys()) == {'read', 'total'}
+    assert report['peak_memory'] is not None
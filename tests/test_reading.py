@@ -0,0 +1,98 @@
+import pytest
+
+import numpy as np
+
+import awkward as ak
+
+import uproot
+
+from func_adl_uproot.reading import (compose_entry_range, entry_ranges, iterate_events,
+                                     read_events, source_options, surviving_entry_ranges)
+
+
+files = ['tests/vectors_tree_file.root', 'tests/scalars_and_vectors_tree_file.root']
+
+
+def test_compose_entry_range():
+    assert compose_entry_range(None, None, 0, None) == (0, None)
+    assert compose_entry_range(None, None, 1, 4) == (1, 4)
+    assert compose_entry_range(2, None, 1, 4) == (3, 6)
+    assert compose_entry_range(2, 5, 1, 4) == (3, 5)
+    assert compose_entry_range(2, 3, 5, None) == (3, 3)
+
+
+def test_entry_ranges():
+    assert list(entry_ranges(files, 'tree')) == [(files[0], 0, 3), (files[1], 0, 3)]
+    assert list(entry_ranges(files, 'tree', 2, 4)) == [(files[0], 2, 3), (files[1], 0, 1)]
+    assert list(entry_ranges(files, 'tree', 3)) == [(files[1], 0, 3)]
+    assert list(entry_ranges(files, 'tree', entry_stop=3)) == [(files[0], 0, 3)]
+
+
+def test_entry_ranges_negative():
+    with pytest.raises(ValueError):
+        list(entry_ranges(files, 'tree', -1))
+
+
+def test_surviving_entry_ranges():
+    mask = np.array([True] + [False] * 19 + [True] * 2 + [False] * 18)
+    assert surviving_entry_ranges(mask, 0, [0, 10, 20, 30, 40]) == [(0, 10), (20, 30)]
+    assert surviving_entry_ranges(mask, 10, [0, 10, 20, 30, 40, 50]) == [(10, 20), (30, 40)]
+    assert surviving_entry_ranges(mask[:0], 0, [0, 10]) == []
+
+
+def write_clustered_file(path):
+    with uproot.recreate(path) as root_file:
+        for cluster in range(4):
+            branches = {'x': np.arange(cluster * 10, cluster * 10 + 10, dtype=np.int32),
+                        'y': np.arange(cluster * 10, cluster * 10 + 10, dtype=np.float64)}
+            if cluster == 0:
+                root_file['tree'] = branches
+            else:
+                root_file['tree'].extend(branches)
+
+
+def test_read_events_predicate(tmp_path, monkeypatch):
+    path = str(tmp_path / 'clustered.root')
+    write_clustered_file(path)
+    read_ranges = []
+    original_arrays = uproot.behaviors.TBranch.HasBranches.arrays
+
+    def arrays(self, *args, **kwargs):
+        read_ranges.append((kwargs.get('filter_name'),
+                            kwargs.get('entry_start'),
+                            kwargs.get('entry_stop')))
+        return original_arrays(self, *args, **kwargs)
+
+    monkeypatch.setattr(uproot.behaviors.TBranch.HasBranches, 'arrays', arrays)
+    events = read_events([path], 'tree', filter_name=['x', 'y'],
+                         predicate=lambda events: (events.x < 2) | (events.x > 37),
+                         predicate_branches=['x'])
+    assert events.fields == ['x', 'y']
+    assert events.x.tolist() == [0, 1, 38, 39]
+    assert events.y.tolist() == [0.0, 1.0, 38.0, 39.0]
+    assert read_ranges == [(['x'], 0, 40), (['y'], 0, 10), (['y'], 30, 40)]
+
+
+def test_iterate_events_predicate(tmp_path):
+    path = str(tmp_path / 'clustered.root')
+    write_clustered_file(path)
+    chunks = list(iterate_events([path], 'tree', 20, filter_name=['x', 'y'],
+                                 predicate=lambda events: events.x % 15 == 0,
+                                 predicate_branches=['x']))
+    assert [chunk.y.tolist() for chunk in chunks] == [[0.0, 15.0], [30.0]]
+    assert ak.concatenate(chunks).fields == ['x', 'y']
+
+
+def test_source_options():
+    assert source_options() == {}
+    assert source_options('memmap')['file_handler'] is uproot.MemmapSource
+    assert source_options('file', {'num_workers': 2}) == {
+        'file_handler': uproot.MultithreadedFileSource, 'num_workers': 2}
+    with pytest.raises(ValueError):
+        source_options('mmap')
+
+
+def test_read_events_file_source():
+    events = read_events(['tests/scalars_tree_file.root'], 'tree', ['int_branch'],
+                         entry_start=1, uproot_options=source_options('file'))
+    assert events.int_branch.tolist() == [-1]
@@ -0,0 +1,95 @@
+import ast
+import os
+import shutil
+
+import pytest
+
+import awkward as ak
+
+import func_adl_uproot
+from func_adl_uproot import ast_executor, generate_function
+from func_adl_uproot.results import ResultCache, load_array, save_array
+
+
+where_source = ("EventDataset('tests/scalars_and_vectors_tree_file.root', 'tree')"
+                + '.Where(lambda e: e.int_vector_branch.Count() > 0)')
+
+
+def test_result_cache_exported():
+    assert func_adl_uproot.ResultCache is ResultCache
+    assert 'ResultCache' in func_adl_uproot.__all__
+
+
+def test_save_load_array(tmp_path):
+    array = ak.Array([{'a': 1, 'b': [1.5]}, {'a': 2, 'b': []}])
+    path = str(tmp_path / 'array.npz')
+    with open(path, 'wb') as array_file:
+        array_file.write(save_array(array[1:]))
+    assert load_array(path).tolist() == [{'a': 2, 'b': []}]
+
+
+def test_result_cache_prefix_reuse(tmp_path):
+    result_cache = ResultCache(str(tmp_path))
+    python_ast = ast.parse(where_source + '.Select(lambda e: e.int_branch)')
+    assert ast_executor(python_ast, result_cache=result_cache).tolist() == [-1, 5]
+    assert result_cache.info().hits == 0
+    assert result_cache.info().misses == 2
+    assert ast_executor(python_ast, result_cache=result_cache).tolist() == [-1, 5]
+    assert result_cache.info().hits == 1
+    python_ast = ast.parse(where_source + '.Select(lambda e: e.int_vector_branch)')
+    assert ast_executor(python_ast, result_cache=result_cache).tolist() == [[-2, 3, 4], [6]]
+    assert result_cache.info().hits == 2
+    assert result_cache.info().misses == 3
+
+
+def test_result_cache_option_predicate(tmp_path):
+    result_cache = ResultCache(str(tmp_path))
+    python_ast = ast.parse("EventDataset('tests/scalars_and_vectors_tree_file.root', 'tree')"
+                           + '.Where(lambda e: e.int_vector_branch.Max() > 3)'
+                           + '.Select(lambda e: e.int_branch)')
+    assert ast_executor(python_ast).tolist() == [-1, 5]
+    assert ast_executor(python_ast, result_cache=result_cache).tolist() == [-1, 5]
+    assert ast_executor(python_ast, result_cache=result_cache).tolist() == [-1, 5]
+    assert result_cache.info().hits == 1
+
+
+def test_result_cache_generate_function(tmp_path):
+    result_cache = ResultCache(str(tmp_path))
+    python_ast = ast.parse(where_source + '.Select(lambda e: e.int_branch)')
+    function = generate_function(python_ast, result_cache=result_cache)
+    assert function().tolist() == [-1, 5]
+    assert function(entry_start=2).tolist() == [5]
+    assert len(list(function(step_size=1))) == 3
+    assert result_cache.info().misses == 4
+    assert function(entry_start=2).tolist() == [5]
+    assert result_cache.info().hits == 1
+
+
+def test_result_cache_invalidated_by_modification(tmp_path):
+    path = str(tmp_path / 'tree_file.root')
+    shutil.copy('tests/scalars_and_vectors_tree_file.root', path)
+    result_cache = ResultCache(str(tmp_path / 'cache'))
+    python_ast = ast.parse("Select(EventDataset('" + path.replace('\\', '/') + "', 'tree'),"
+                           + ' lambda e: e.int_branch)')
+    assert ast_executor(python_ast, result_cache=result_cache).tolist() == [0, -1, 5]
+    shutil.copy('tests/scalars_tree_file.root', path)
+    os.utime(path, (0, 0))
+    assert ast_executor(python_ast, result_cache=result_cache).tolist() == [0, -1]
+    assert result_cache.info().hits == 0
+
+
+def test_result_cache_eviction(tmp_path):
+    result_cache = ResultCache(str(tmp_path), max_bytes=0)
+    python_ast = ast.parse(where_source + '.Select(lambda e: e.int_branch)')
+    ast_executor(python_ast, result_cache=result_cache)
+    assert result_cache.info().currbytes == 0
+    result_cache = ResultCache(str(tmp_path))
+    ast_executor(python_ast, result_cache=result_cache)
+    assert result_cache.info().currbytes > 0
+    result_cache.clear()
+    assert result_cache.info().currbytes == 0
+
+
+def test_result_cache_negative_size(tmp_path):
+    with pytest.raises(ValueError):
+        ResultCache(str(tmp_path), max_bytes=-1)
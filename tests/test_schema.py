@@ -0,0 +1,40 @@
+import pytest
+
+from func_adl_uproot.schema import (ListType, RecordType, ScalarType, field_type, parse_schema,
+                                    parse_type, read_schema)
+
+
+def test_parse_type():
+    assert parse_type('int32') == ScalarType('int32')
+    assert parse_type('var * float64') == ListType(ScalarType('float64'))
+    assert parse_type('var * 3 * bool') == ListType(ListType(ScalarType('bool')))
+    assert parse_type({'pt': 'float32'}) == RecordType([('pt', ScalarType('float32'))])
+
+
+def test_parse_type_unsupported():
+    with pytest.raises(ValueError):
+        parse_type('option * int32')
+    with pytest.raises(TypeError):
+        parse_type(1)
+
+
+def test_parse_schema():
+    assert parse_schema({'a': 'int32'}) == RecordType([('a', ScalarType('int32'))])
+    assert parse_schema(None) is None
+
+
+def test_read_schema():
+    assert read_schema('tests/scalars_and_vectors_tree_file.root', 'tree') == RecordType(
+        [('int_branch', ScalarType('int32')),
+         ('int_vector_branch', ListType(ScalarType('int32')))])
+
+
+def test_field_type():
+    record_type = RecordType([('pt', ScalarType('float32'))])
+    assert field_type(record_type, 'pt') == ScalarType('float32')
+    assert field_type(ListType(record_type), 'pt') == ListType(ScalarType('float32'))
+    assert field_type(None, 'pt') is None
+    with pytest.raises(NameError):
+        field_type(record_type, 'eta')
+    with pytest.raises(TypeError):
+        field_type(ScalarType('float32'), 'pt')
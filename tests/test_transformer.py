@@ -1,8 +1,13 @@
 import ast
 
+import pytest
+
 import qastle
 
 from func_adl_uproot import python_ast_to_python_source
+from func_adl_uproot.linq import insert_linq_nodes
+from func_adl_uproot.schema import parse_schema
+from func_adl_uproot.transformer import PythonSourceGeneratorTransformer
 
 
 def assert_identical_source(python_source):
@@ -23,7 +28,7 @@ def assert_equivalent_source(python_source):
 
 
 def assert_modified_source(initial_source, final_source):
-    python_ast = qastle.insert_linq_nodes(ast.parse(initial_source))
+    python_ast = insert_linq_nodes(ast.parse(initial_source))
     rep = python_ast_to_python_source(python_ast)
     assert rep == final_source
 
@@ -81,6 +86,10 @@ def test_binary_ops():
 def test_boolean_ops():
     assert_modified_source('True and False', 'np.logical_and(True, False)')
     assert_modified_source('True or False', 'np.logical_or(True, False)')
+    assert_modified_source('True and False and True',
+                           'np.logical_and(True, np.logical_and(False, True))')
+    assert_modified_source('True or False or True or False',
+                           'np.logical_or(np.logical_or(True, False), np.logical_or(True, False))')
 
 
 def test_comparison_ops():
@@ -100,6 +109,7 @@ def test_comparison_ops():
 
 def test_conditional():
     assert_identical_source('(1 if True else 0)')
+    assert_modified_source('1 if abs else 0', 'np.where(abs, 1, 0)')
 
 
 def test_subscripts():
@@ -118,6 +128,14 @@ def test_subscripts():
     assert_modified_source('abs[1:4:2]',
                            ('(abs[abs.fields[1:4:2]]'
                             + ' if isinstance(abs, ak.Array) else abs[1:4:2])'))
+    assert_modified_source('abs()[0]',
+                           ('(lambda value, index: (value[value.fields[index]]'
+                            + ' if isinstance(value, ak.Array) else value[index]))(abs(), 0)'))
+    assert_modified_source('abs[abs():]',
+                           ('(lambda value, index: (value[value.fields[index]]'
+                            + ' if isinstance(value, ak.Array) else value[index]))'
+                            + '(abs, slice(abs(), None, None))'))
+    assert_identical_source('[1, 2][0]')
 
 
 def test_attribute():
@@ -134,3 +152,79 @@ def test_call():
     assert_identical_source('abs()')
     assert_identical_source('abs(1)')
     assert_identical_source('abs(1, 2)')
+
+
+def test_reductions():
+    assert_modified_source('abs.Count()', 'len(abs)')
+    assert_modified_source('abs.Sum()', 'ak.sum(abs, axis=None)')
+    assert_modified_source('abs.Min()', 'ak.min(abs, axis=None)')
+    assert_modified_source('abs.Max()', 'ak.max(abs, axis=None)')
+    assert_modified_source('abs.Aggregate(1, lambda acc, x: acc * x)',
+                           '(lambda result: 1 * result)(ak.prod(abs, axis=None))')
+
+
+def test_aggregate_unsupported_combiner():
+    with pytest.raises(NotImplementedError):
+        python_ast_to_python_source(
+            qastle.insert_linq_nodes(ast.parse('abs.Aggregate(0, lambda acc, x: acc - x)')))
+
+
+def test_take_skip_first():
+    assert_modified_source('abs.Take(2)', 'abs[:2]')
+    assert_modified_source('abs.Skip(2)', 'abs[2:]')
+    assert_modified_source('abs.First()', 'abs[0]')
+
+
+schema = parse_schema({'int_branch': 'int32', 'int_vector_branch': 'var * int32'})
+
+
+def get_typed_rep(python_source):
+    python_ast = insert_linq_nodes(ast.parse("EventDataset('f.root', 'tree')" + python_source))
+    return PythonSourceGeneratorTransformer(schema).get_rep(python_ast)
+
+
+def test_typed_select():
+    rep = get_typed_rep('.Select(lambda e: (e.int_branch, e.int_vector_branch))'
+                        + '.Select(lambda t: t[1].Count())')
+    assert 'ak.Array' not in rep
+    assert "t['1']" in rep
+
+
+def test_typed_histogram():
+    rep = get_typed_rep('.Histogram(lambda e: e.int_vector_branch, 10, 0, 5)')
+    assert rep.startswith('histogram_counts(')
+    assert rep.endswith(', 10, low=0, high=5)')
+    rep = get_typed_rep('.Histogram(lambda e: e.int_branch, [0, 1], lambda e: e.int_branch)')
+    assert 'weighted=True' in rep
+    with pytest.raises(TypeError):
+        get_typed_rep('.Histogram(1, [0, 1])')
+    with pytest.raises(ValueError):
+        get_typed_rep('.Histogram(lambda e: e.int_branch, 3)')
+    with pytest.raises(NotImplementedError):
+        get_typed_rep('.Select(lambda e: e.int_vector_branch.Histogram(lambda x: x, [0, 1]))')
+
+
+def test_typed_order_by():
+    rep = get_typed_rep('.Select(lambda e: e.int_vector_branch.OrderByDescending(lambda x: x))')
+    assert 'ak.argsort(' in rep
+    assert 'axis=1, ascending=False' in rep
+    rep = get_typed_rep('.Select(lambda e: e.int_vector_branch.OrderBy(lambda x: x).Take(2))')
+    assert 'top_k_indices(' in rep
+    assert ', 2, 1, True)' in rep
+    with pytest.raises(TypeError):
+        get_typed_rep('.OrderBy(lambda e: e.int_vector_branch)')
+
+
+def test_typed_errors():
+    with pytest.raises(NameError):
+        get_typed_rep('.Select(lambda e: e.float_branch)')
+    with pytest.raises(TypeError):
+        get_typed_rep('.Select(lambda e: e.int_branch.Select(lambda x: x))')
+    with pytest.raises(TypeError):
+        get_typed_rep('.Where(lambda e: e.int_vector_branch > 1)')
+    with pytest.raises(TypeError):
+        get_typed_rep('.Select(lambda e: e.int_branch[0])')
+    with pytest.raises(IndexError):
+        get_typed_rep('.Select(lambda e: (e.int_branch,)).Select(lambda t: t[1])')
+    with pytest.raises(TypeError):
+        get_typed_rep('.Sum()')
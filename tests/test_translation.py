@@ -1,6 +1,8 @@
 import ast
+import logging
+import types
 
-from func_adl_uproot import generate_function
+from func_adl_uproot import generate_code, generate_function, generate_python_source, query_cache
 
 
 def test_generate_function_string():
@@ -45,3 +47,92 @@ def test_generate_function_override_file_and_tree():
                                                                          'float_branch',
                                                                          'double_branch',
                                                                          'bool_branch']
+
+
+def test_generate_function_cached():
+    query_cache.clear()
+    first_function = generate_function(ast.parse("EventDataset('tests/scalars_tree_file.root')"))
+    second_function = generate_function("(call EventDataset  'tests/scalars_tree_file.root')")
+    assert second_function is first_function
+    assert query_cache.info().hits == 1
+    assert query_cache.info().misses == 1
+
+
+def test_generate_function_cached_slice():
+    query_cache.clear()
+    python_ast = ast.parse("EventDataset('tests/scalars_tree_file.root', 'tree')"
+                           + '.Select(lambda row: row[1:3])')
+    assert generate_function(python_ast)().fields == ['long_branch', 'float_branch']
+    assert generate_function(python_ast) is generate_function(python_ast)
+    assert query_cache.info().misses == 1
+
+
+def test_generate_function_uncached():
+    query_cache.clear()
+    python_ast = ast.parse("EventDataset('tests/scalars_tree_file.root')")
+    assert generate_function(python_ast, use_cache=False) is not generate_function(python_ast)
+    assert query_cache.info().misses == 1
+
+
+def test_generate_function_logger(caplog):
+    python_ast = ast.parse("EventDataset('tests/scalars_tree_file.root')")
+    for use_cache in (True, False):
+        caplog.clear()
+        with caplog.at_level(logging.INFO, logger='func_adl_uproot'):
+            generate_function(python_ast, use_cache=use_cache)()
+        assert [record.name for record in caplog.records] == ['func_adl_uproot.translation']
+
+
+def test_generate_function_many_repeated_terms():
+    python_ast = ast.parse("EventDataset('tests/scalars_tree_file.root', 'tree')"
+                           + '.Select(lambda row: '
+                           + ' + '.join('abs(row.int_branch * ' + str(index) + ')'
+                                        + ' * abs(row.int_branch * ' + str(index) + ')'
+                                        for index in range(300))
+                           + ')')
+    expected = sum(index * index for index in range(300))
+    assert generate_function(python_ast, use_cache=False)().tolist() == [0, expected]
+
+
+def test_generate_function_name():
+    python_ast = ast.parse("EventDataset('tests/scalars_tree_file.root', 'tree')")
+    function = generate_function(python_ast, function_name='other_query')
+    assert function.__name__ == 'other_query'
+
+
+def test_generate_python_source_branch_filter():
+    python_source = ("Select(EventDataset('tests/scalars_tree_file.root', 'tree'),"
+                     + ' lambda row: row.int_branch)')
+    python_ast = ast.parse(python_source)
+    assert "filter_name=['int_branch']" in generate_python_source(python_ast)
+
+
+def test_generate_function_step_size():
+    python_source = "EventDataset()"
+    python_ast = ast.parse(python_source)
+    function = generate_function(python_ast)
+    chunks = list(function('tests/scalars_tree_file.root', 'tree', step_size=1))
+    assert len(chunks) == 2
+    assert all(chunk.fields == ['int_branch',
+                                'long_branch',
+                                'float_branch',
+                                'double_branch',
+                                'bool_branch'] for chunk in chunks)
+
+
+def test_generate_code():
+    python_ast = ast.parse("EventDataset('tests/scalars_tree_file.root', 'tree')"
+                           + '.Select(lambda row: row.int_branch * 2)')
+    code = generate_code(python_ast)
+    assert isinstance(code, types.CodeType)
+    namespace = {}
+    exec(code, namespace)
+    assert namespace['run_query']().tolist() == [0, -2]
+
+
+def test_generate_function_deeply_nested():
+    python_ast = ast.parse("EventDataset('tests/scalars_tree_file.root', 'tree')"
+                           + '.Select(lambda row: row.int_branch)'
+                           + '.Select(lambda value: value + 1)' * 300)
+    assert '(' * 300 in generate_python_source(python_ast)
+    assert generate_function(python_ast, use_cache=False)().tolist() == [300, 299]
@@ -0,0 +1,59 @@
+import pytest
+
+import awkward as ak
+
+import uproot
+
+from func_adl_uproot.writing import rechunk, write_chunks
+
+
+def test_rechunk():
+    chunks = [ak.Array([1, 2, 3]), ak.Array([]), ak.Array([4, 5, 6, 7])]
+    assert [chunk.tolist() for chunk in rechunk(chunks, 2)] == [[1, 2], [3, 4], [5, 6], [7]]
+    assert [chunk.tolist() for chunk in rechunk(chunks, None)] == [[1, 2, 3], [], [4, 5, 6, 7]]
+    with pytest.raises(ValueError):
+        list(rechunk(chunks, 0))
+
+
+def test_write_parquet(tmp_path):
+    parquet = pytest.importorskip('pyarrow.parquet')
+    path = str(tmp_path / 'output.parquet')
+    chunks = [ak.Array([{'x': 1, 'y': [1.5]}]), ak.Array([{'x': 2, 'y': []}])]
+    assert write_chunks(chunks, 'parquet', path) == path
+    assert parquet.read_table(path).to_pylist() == [{'x': 1, 'y': [1.5]}, {'x': 2, 'y': []}]
+
+
+def test_write_root(tmp_path):
+    path = str(tmp_path / 'output.root')
+    chunks = [ak.Array([{'x': 1, 'y': [1.5]}]), ak.Array([{'x': 2, 'y': []}])]
+    write_chunks(chunks, 'root', path, compression='zlib')
+    with uproot.open(path) as root_file:
+        assert root_file['tree']['x'].array().tolist() == [1, 2]
+        assert root_file['tree']['y'].array().tolist() == [[1.5], []]
+
+
+def test_write_root_compression_level(tmp_path):
+    path = str(tmp_path / 'output.root')
+    write_chunks([ak.Array([1, 2, 3])], 'root', path, compression='lzma', compression_level=4)
+    with uproot.open(path) as root_file:
+        assert root_file.file.compression == uproot.LZMA(4)
+    with pytest.raises(ValueError):
+        write_chunks([ak.Array([1])], 'root', path, compression_level=4)
+
+
+def test_write_no_chunks(tmp_path):
+    path = tmp_path / 'output.root'
+    assert write_chunks(iter([]), 'root', str(path)) is None
+    assert not path.exists()
+
+
+def test_write_root_non_record(tmp_path):
+    path = str(tmp_path / 'output.root')
+    write_chunks([ak.Array([1, 2, 3])], 'root', path, row_group_size=2)
+    with uproot.open(path) as root_file:
+        assert root_file['tree']['value'].array().tolist() == [1, 2, 3]
+
+
+def test_write_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        write_chunks([], 'csv', str(tmp_path / 'output.csv'))